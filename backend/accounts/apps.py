@@ -4,4 +4,6 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
-    verbose_name = 'Telegram Accounts Management'
\ No newline at end of file
+    verbose_name = 'Telegram Accounts Management'
+    def ready(self):
+        from . import signals  # noqa: F401
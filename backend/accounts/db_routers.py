@@ -1,9 +1,16 @@
 class TelegramRouter:
     """
     Router for Telegram account models to use PostgreSQL database.
+
+    allow_migrate keeps these models off the default alias, so migrations that touch them
+    through model operations are only recorded by `manage.py migrate`. The base schema comes
+    from init.sql; from 0006 on, account migrations change it with idempotent RunSQL without
+    model hints (wrapped in SeparateDatabaseAndState), which is applied on whichever alias
+    is migrated - the plain `migrate` in docker-compose included.
     """
     telegram_app = 'accounts'
-    telegram_models = {'TelegramAccount', 'AccountAuditLog', 'GlobalAppSettings'}
+    # Все связанные между собой модели в одной БД, иначе select_related и JOIN между ними невозможны
+    telegram_models = {'TelegramAccount', 'AccountAuditLog', 'SecurityCheck', 'GlobalAppSettings', 'ProxyServer', 'TaskQueue', 'TaskQueueItem', 'AccountTombstone'}
 
     def db_for_read(self, model, **hints):
         if model._meta.app_label == self.telegram_app and model.__name__ in self.telegram_models:
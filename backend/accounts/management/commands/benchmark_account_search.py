@@ -0,0 +1,88 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+TABLE = 'bench_account_search'
+SEARCH_COLUMNS = ['phone_number', 'employee_id', 'employee_fio', 'account_note']
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure account search (case-insensitive substring match over phone, employee id, '
+        'FIO and note) on a temporary table with and without pg_trgm GIN indexes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Number of synthetic accounts')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per search term')
+        parser.add_argument('--database', default='telegram_db')
+        parser.add_argument('terms', nargs='*', default=['7916123', 'EMP-0004', 'Иванов', 'резерв'])
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        # Временная таблица живет только в этой транзакции, рабочие данные не затрагиваются
+        with transaction.atomic(using=options['database']), connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            self._fill(cursor, options['rows'])
+
+            before = self._measure(cursor, options['terms'], options['repeat'])
+
+            started = time.perf_counter()
+            for column in SEARCH_COLUMNS:
+                cursor.execute(
+                    f'CREATE INDEX ON {TABLE} USING gin (UPPER({column}) gin_trgm_ops)'
+                )
+            cursor.execute(f'ANALYZE {TABLE}')
+            self.stdout.write(f'Trigram indexes built in {time.perf_counter() - started:.2f}s')
+
+            after = self._measure(cursor, options['terms'], options['repeat'])
+            transaction.set_rollback(True, using=options['database'])
+
+        self.stdout.write(f'\n{"term":<16}{"rows":>8}{"seq scan, ms":>16}{"trgm, ms":>12}{"speedup":>10}')
+        for term in options['terms']:
+            matched, plain = before[term]
+            _, indexed = after[term]
+            self.stdout.write(
+                f'{term:<16}{matched:>8}{plain * 1000:>16.1f}{indexed * 1000:>12.1f}{plain / indexed:>9.1f}x'
+            )
+
+    def _fill(self, cursor, rows):
+        cursor.execute(f'''
+            CREATE TEMP TABLE {TABLE} (
+                id bigint PRIMARY KEY,
+                phone_number varchar(20),
+                employee_id varchar(50),
+                employee_fio varchar(255),
+                account_note text
+            ) ON COMMIT DROP
+        ''')
+        cursor.execute(f'''
+            INSERT INTO {TABLE}
+            SELECT
+                n,
+                '+79' || lpad((n * 7919 % 1000000000)::text, 9, '0'),
+                'EMP-' || lpad(n::text, 7, '0'),
+                (ARRAY['Иванов', 'Петров', 'Сидоров', 'Кузнецов', 'Смирнов'])[n % 5 + 1]
+                    || ' ' || md5(n::text),
+                CASE WHEN n % 50 = 0 THEN 'резервный аккаунт ' || n ELSE md5((n * 31)::text) END
+            FROM generate_series(1, %s) AS n
+        ''', [rows])
+        cursor.execute(f'ANALYZE {TABLE}')
+        self.stdout.write(f'Generated {rows} accounts')
+
+    def _measure(self, cursor, terms, repeat):
+        # Тот же вид условия, что строит icontains в Django
+        condition = ' OR '.join(f'UPPER({column}::text) LIKE UPPER(%s)' for column in SEARCH_COLUMNS)
+        sql = f'SELECT id FROM {TABLE} WHERE {condition}'
+        results = {}
+        for term in terms:
+            params = [f'%{term}%'] * len(SEARCH_COLUMNS)
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                matched = len(cursor.fetchall())
+                timings.append(time.perf_counter() - started)
+            results[term] = (matched, min(timings))
+        return results
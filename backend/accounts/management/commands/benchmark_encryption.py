@@ -0,0 +1,111 @@
+import base64
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from accounts.services.encryption import EncryptionService, Keyring, AESGCM
+
+
+def sample_row():
+    """Типичные значения зашифрованных полей одного аккаунта"""
+    return {
+        'api_id': '12345678',
+        'api_hash': os.urandom(16).hex(),
+        # StringSession: символ версии + base64 от DC, адреса и 256-байтного auth key
+        'session_data': ('1' + base64.urlsafe_b64encode(os.urandom(263)).decode('utf-8')).encode('utf-8'),
+        'recovery_email': 'employee@example.com',
+        'phone_code_hash': os.urandom(9).hex(),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare storage size and decrypt cost of legacy JSON and binary envelope formats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Number of synthetic accounts')
+
+    def handle(self, *args, **options):
+        encryptor = EncryptionService()
+        rows = [sample_row() for _ in range(options['rows'])]
+
+        legacy = [self._encrypt_legacy(encryptor, row) for row in rows]
+        binary = [
+            {field: encryptor.encrypt_field(value) for field, value in row.items()}
+            for row in rows
+        ]
+
+        fields_count = len(rows) * len(rows[0])
+
+        started = time.perf_counter()
+        for row in legacy:
+            for field, value in row.items():
+                plaintext = encryptor.decrypt_data(json.loads(value.decode('utf-8')))
+                if field == 'session_data':
+                    base64.urlsafe_b64decode(plaintext)
+        legacy_us = (time.perf_counter() - started) / fields_count * 1e6
+
+        started = time.perf_counter()
+        for row in binary:
+            for value in row.values():
+                encryptor.decrypt_field(value)
+        binary_us = (time.perf_counter() - started) / fields_count * 1e6
+
+        legacy_bytes = sum(len(value) for row in legacy for value in row.values()) / len(rows)
+        binary_bytes = sum(len(value) for row in binary for value in row.values()) / len(rows)
+
+        self.stdout.write(f'Rows: {len(rows)}')
+        self.stdout.write(f'{"format":<10}{"bytes/row":>12}{"us/decrypt":>14}')
+        self.stdout.write(f'{"legacy":<10}{legacy_bytes:>12.0f}{legacy_us:>14.2f}')
+        self.stdout.write(f'{"binary":<10}{binary_bytes:>12.0f}{binary_us:>14.2f}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Binary envelope: {legacy_bytes / binary_bytes:.2f}x smaller, {legacy_us / binary_us:.2f}x faster to decrypt'
+        ))
+
+        self._benchmark_backends(rows)
+        self._benchmark_construction(len(rows))
+
+    def _benchmark_backends(self, rows):
+        """Стоимость одного поля в двоичном конверте для каждого backend"""
+        backends = ['pycryptodome'] + (['cryptography'] if AESGCM is not None else [])
+        values = [value for row in rows for value in row.values()]
+
+        self.stdout.write('')
+        self.stdout.write(f'{"backend":<14}{"us/encrypt":>12}{"us/decrypt":>12}')
+        for backend in backends:
+            encryptor = EncryptionService(keyring=Keyring({1: 'benchmark-key'}, 1, backend))
+
+            started = time.perf_counter()
+            envelopes = [encryptor.encrypt_field(value) for value in values]
+            encrypt_us = (time.perf_counter() - started) / len(values) * 1e6
+
+            started = time.perf_counter()
+            for envelope in envelopes:
+                encryptor.decrypt_field(envelope)
+            decrypt_us = (time.perf_counter() - started) / len(values) * 1e6
+
+            self.stdout.write(f'{backend:<14}{encrypt_us:>12.2f}{decrypt_us:>12.2f}')
+
+    def _benchmark_construction(self, iterations):
+        """EncryptionService() с общим набором ключей против сборки ключей при каждом создании"""
+        started = time.perf_counter()
+        for _ in range(iterations):
+            EncryptionService(keyring=Keyring.from_settings())
+        uncached_us = (time.perf_counter() - started) / iterations * 1e6
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            EncryptionService()
+        cached_us = (time.perf_counter() - started) / iterations * 1e6
+
+        self.stdout.write('')
+        self.stdout.write(f'EncryptionService(): {uncached_us:.2f} us without keyring cache, {cached_us:.2f} us cached')
+
+    @staticmethod
+    def _encrypt_legacy(encryptor, row):
+        encrypted = {}
+        for field, value in row.items():
+            if field == 'session_data':
+                value = base64.urlsafe_b64encode(value).decode('utf-8')
+            encrypted[field] = json.dumps(encryptor.encrypt_data(value)).encode('utf-8')
+        return encrypted
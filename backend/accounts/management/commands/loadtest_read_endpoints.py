@@ -0,0 +1,112 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = [
+    '/api/accounts/?limit=100',
+    '/api/audit-logs/',
+    '/api/tasks/',
+    '/api/security-alerts/',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the hot read endpoints of one or more running backends '
+        '(e.g. WSGI gunicorn vs ASGI uvicorn with the same worker count) and report requests/s and latency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True,
+            help='name=base_url, e.g. wsgi=http://localhost:8000 (repeat to compare several backends)'
+        )
+        parser.add_argument('--username', required=True, help='Superuser the requests are made as')
+        parser.add_argument('--concurrency', type=int, default=32, help='Simultaneous clients')
+        parser.add_argument('--duration', type=float, default=20, help='Seconds per target')
+        parser.add_argument('--warmup', type=float, default=3, help='Seconds of unmeasured load before each run')
+        parser.add_argument('--path', action='append', dest='paths', help='Endpoint to request (repeatable)')
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, base_url = target.partition('=')
+            if not sep:
+                raise CommandError(f'Expected name=base_url, got {target}')
+            targets.append((name, base_url.rstrip('/')))
+        paths = options['paths'] or DEFAULT_PATHS
+
+        session = self._create_session(options['username'])
+        try:
+            results = []
+            for name, base_url in targets:
+                self.stdout.write(f'{name}: {options["concurrency"]} clients, {options["duration"]:.0f}s')
+                cookies = {settings.SESSION_COOKIE_NAME: session.session_key}
+                self._run(base_url, paths, cookies, options['concurrency'], options['warmup'])
+                results.append((name, self._run(base_url, paths, cookies, options['concurrency'], options['duration'])))
+        finally:
+            session.delete()
+
+        self.stdout.write(f'\n{"target":<12}{"req/s":>10}{"p50, ms":>10}{"p99, ms":>10}{"max, ms":>10}{"errors":>8}')
+        for name, (count, elapsed, latencies, errors) in results:
+            if not latencies:
+                self.stdout.write(f'{name:<12}{"-":>10}{"-":>10}{"-":>10}{"-":>10}{errors:>8}')
+                continue
+            percentiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f'{name:<12}{count / elapsed:>10.1f}{percentiles[49] * 1000:>10.1f}'
+                f'{percentiles[98] * 1000:>10.1f}{max(latencies) * 1000:>10.1f}{errors:>8}'
+            )
+
+    def _create_session(self, username):
+        """Сессия суперпользователя в БД, чтобы не проходить форму входа; удаляется после теста"""
+        user = get_user_model().objects.filter(username=username, is_superuser=True).first()
+        if user is None:
+            raise CommandError(f'Superuser {username} not found')
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session
+
+    def _run(self, base_url, paths, cookies, concurrency, duration):
+        deadline = time.monotonic() + duration
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+
+        def client(offset):
+            http = requests.Session()
+            http.cookies.update(cookies)
+            # За nginx запросы приходят с X-Forwarded-Proto, без него сработает редирект на https
+            http.headers['X-Forwarded-Proto'] = 'https'
+            own, failed, index = [], 0, offset
+            while time.monotonic() < deadline:
+                url = base_url + paths[index % len(paths)]
+                index += 1
+                started = time.perf_counter()
+                try:
+                    response = http.get(url, allow_redirects=False, timeout=30)
+                    ok = response.status_code == 200
+                except requests.RequestException:
+                    ok = False
+                if ok:
+                    own.append(time.perf_counter() - started)
+                else:
+                    failed += 1
+            with lock:
+                latencies.extend(own)
+                errors[0] += failed
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(client, range(concurrency)))
+        elapsed = time.monotonic() - started
+        return len(latencies), elapsed, latencies, errors[0]
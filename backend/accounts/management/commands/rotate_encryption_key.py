@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.services.key_rotation import KeyRotation
+from accounts.services.session_manager import ThreadLocalDBConnection
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-encrypt all account fields with the current ENCRYPTION_KEY. '
+        'Set the new key as ENCRYPTION_KEY with a higher ENCRYPTION_KEY_VERSION and keep '
+        'the old one in ENCRYPTION_PREVIOUS_KEYS until rotation completes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Accounts per transaction')
+        parser.add_argument('--rows-per-second', type=float, default=200, help='Throttle, 0 to disable')
+        parser.add_argument('--restart', action='store_true', help='Ignore saved checkpoint and start from the beginning')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many accounts need re-encryption')
+
+    def handle(self, *args, **options):
+        rotation = KeyRotation(
+            batch_size=options['batch_size'],
+            rows_per_second=options['rows_per_second'] or None
+        )
+
+        try:
+            missing = rotation.missing_key_versions()
+            if missing:
+                raise CommandError(
+                    f'No keys configured for versions {missing}: add them to ENCRYPTION_PREVIOUS_KEYS'
+                )
+
+            pending = rotation.session_manager.count_stale_encryption()
+            self.stdout.write(f'Target key version {rotation.key_version}, {pending} accounts to re-encrypt')
+            if options['dry_run'] or not pending:
+                return
+
+            checkpoint = rotation.load_checkpoint()
+            if options['restart'] or checkpoint.get('completed'):
+                rotation.reset_checkpoint()
+            elif checkpoint['last_id']:
+                self.stdout.write(f'Resuming after account id {checkpoint["last_id"]}')
+
+            def on_batch(checkpoint, rotated):
+                self.stdout.write(f'Re-encrypted {checkpoint["rotated"]} accounts (last id {checkpoint["last_id"]})')
+
+            result = rotation.run(on_batch=on_batch)
+        finally:
+            ThreadLocalDBConnection.close_all()
+
+        remaining = rotation.session_manager.count_stale_encryption()
+        if remaining:
+            self.stdout.write(self.style.WARNING(
+                f'Rotation finished with {remaining} accounts left (undecryptable or locked), see logs'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Rotation completed: {result["rotated"]} accounts re-encrypted in {result["passes"]} passes. '
+                f'Previous keys can be removed from ENCRYPTION_PREVIOUS_KEYS'
+            ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from accounts.services.telegram_worker import TelegramWorker
+
+
+class Command(BaseCommand):
+    help = 'Run asyncio worker for Telegram account checks (TELEGRAM_CHECK_BACKEND=worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--name', help='Worker name (defaults to host:pid)')
+        parser.add_argument('--max-inflight', type=int, help='Maximum concurrent account operations')
+
+    def handle(self, *args, **options):
+        worker = TelegramWorker(name=options['name'], max_inflight=options['max_inflight'])
+        self.stdout.write(f'Starting Telegram worker {worker.name}, max in-flight {worker.max_inflight}')
+        worker.run()
+        self.stdout.write(self.style.SUCCESS('Telegram worker stopped'))
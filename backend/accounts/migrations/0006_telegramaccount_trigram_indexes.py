@@ -0,0 +1,52 @@
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Модели аккаунтов не мигрируются на default (см. db_routers), поэтому схема меняется
+# идемпотентным SQL, который выполняется на том алиасе, который мигрируется
+TRIGRAM_INDEXES_SQL = '''
+CREATE INDEX IF NOT EXISTS "tg_acc_phone_trgm" ON "telegram_accounts" USING gin ((UPPER("phone_number")) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "tg_acc_employee_id_trgm" ON "telegram_accounts" USING gin ((UPPER("employee_id")) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "tg_acc_employee_fio_trgm" ON "telegram_accounts" USING gin ((UPPER("employee_fio")) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "tg_acc_note_trgm" ON "telegram_accounts" USING gin ((UPPER("account_note")) gin_trgm_ops);
+'''
+
+DROP_TRIGRAM_INDEXES_SQL = '''
+DROP INDEX IF EXISTS "tg_acc_phone_trgm";
+DROP INDEX IF EXISTS "tg_acc_employee_id_trgm";
+DROP INDEX IF EXISTS "tg_acc_employee_fio_trgm";
+DROP INDEX IF EXISTS "tg_acc_note_trgm";
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_proxyserver_taskqueue_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunSQL(TRIGRAM_INDEXES_SQL, DROP_TRIGRAM_INDEXES_SQL)],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='telegramaccount',
+                    index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('phone_number'), name='gin_trgm_ops'), name='tg_acc_phone_trgm'),
+                ),
+                migrations.AddIndex(
+                    model_name='telegramaccount',
+                    index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('employee_id'), name='gin_trgm_ops'), name='tg_acc_employee_id_trgm'),
+                ),
+                migrations.AddIndex(
+                    model_name='telegramaccount',
+                    index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('employee_fio'), name='gin_trgm_ops'), name='tg_acc_employee_fio_trgm'),
+                ),
+                migrations.AddIndex(
+                    model_name='telegramaccount',
+                    index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('account_note'), name='gin_trgm_ops'), name='tg_acc_note_trgm'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,88 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
+
+
+SECURITY_CHECKS_SQL = '''
+CREATE TABLE IF NOT EXISTS "security_checks" (
+    "id" bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    "has_security_alert" boolean NOT NULL,
+    "alert_message" text NOT NULL,
+    "last_security_check" timestamp with time zone NOT NULL,
+    "is_latest" boolean NOT NULL,
+    "account_id" bigint NOT NULL
+        CONSTRAINT "security_checks_account_id_dc7ae6e9_fk_telegram_accounts_id"
+        REFERENCES "telegram_accounts" ("id") DEFERRABLE INITIALLY DEFERRED
+);
+CREATE UNIQUE INDEX IF NOT EXISTS "sec_check_one_latest_per_account" ON "security_checks" ("account_id") WHERE "is_latest";
+CREATE INDEX IF NOT EXISTS "security_checks_account_id_dc7ae6e9" ON "security_checks" ("account_id");
+CREATE INDEX IF NOT EXISTS "sec_check_latest_alert_idx" ON "security_checks" ("has_security_alert", "last_security_check") WHERE "is_latest";
+CREATE INDEX IF NOT EXISTS "sec_check_account_idx" ON "security_checks" ("account_id", "last_security_check");
+'''
+
+def move_security_info(apps, schema_editor):
+    """Переносит security_info из device_params в таблицу security_checks"""
+    TelegramAccount = apps.get_model('accounts', 'TelegramAccount')
+    SecurityCheck = apps.get_model('accounts', 'SecurityCheck')
+    db_alias = schema_editor.connection.alias
+
+    accounts = (
+        TelegramAccount.objects.using(db_alias)
+        .filter(device_params__has_key='security_info')
+        .only('id', 'device_params')
+    )
+    checks, updated = [], []
+    for account in accounts.iterator(chunk_size=500):
+        security_info = account.device_params.pop('security_info') or {}
+        checked_at = security_info.get('last_security_check')
+        checks.append(SecurityCheck(
+            account_id=account.id,
+            has_security_alert=bool(security_info.get('has_security_alert')),
+            alert_message=security_info.get('alert_message') or '',
+            last_security_check=(parse_datetime(checked_at) if checked_at else None) or now(),
+            is_latest=True
+        ))
+        updated.append(account)
+
+    SecurityCheck.objects.using(db_alias).bulk_create(checks, batch_size=500)
+    TelegramAccount.objects.using(db_alias).bulk_update(updated, ['device_params'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_telegramaccount_trigram_indexes'),
+    ]
+
+    operations = [
+        # Идемпотентный SQL выполняется на мигрируемом алиасе (см. db_routers)
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunSQL(SECURITY_CHECKS_SQL, 'DROP TABLE IF EXISTS "security_checks";')],
+            state_operations=[
+                migrations.CreateModel(
+                    name='SecurityCheck',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('has_security_alert', models.BooleanField(default=False)),
+                        ('alert_message', models.TextField(blank=True, default='')),
+                        ('last_security_check', models.DateTimeField()),
+                        ('is_latest', models.BooleanField(default=True)),
+                        ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='security_checks', to='accounts.telegramaccount')),
+                    ],
+                    options={
+                        'db_table': 'security_checks',
+                        'ordering': ['-last_security_check'],
+                        'indexes': [
+                            models.Index(condition=models.Q(('is_latest', True)), fields=['has_security_alert', 'last_security_check'], name='sec_check_latest_alert_idx'),
+                            models.Index(fields=['account', 'last_security_check'], name='sec_check_account_idx'),
+                        ],
+                        'constraints': [
+                            models.UniqueConstraint(condition=models.Q(('is_latest', True)), fields=('account',), name='sec_check_one_latest_per_account'),
+                        ],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(move_security_info, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+TASK_QUEUE_ITEMS_SQL = '''
+CREATE TABLE IF NOT EXISTS "task_queue_items" (
+    "id" bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    "status" varchar(20) NOT NULL,
+    "outcome" jsonb NULL,
+    "started_at" timestamp with time zone NULL,
+    "finished_at" timestamp with time zone NULL,
+    "duration_ms" integer NULL,
+    "account_id" bigint NULL,
+    "task_id" bigint NOT NULL
+        CONSTRAINT "task_queue_items_task_id_e1d770bd_fk_task_queue_id"
+        REFERENCES "task_queue" ("id") DEFERRABLE INITIALLY DEFERRED
+);
+CREATE INDEX IF NOT EXISTS "task_queue_items_account_id_555ad9fd" ON "task_queue_items" ("account_id");
+CREATE INDEX IF NOT EXISTS "task_queue_items_task_id_e1d770bd" ON "task_queue_items" ("task_id");
+CREATE INDEX IF NOT EXISTS "task_item_status_idx" ON "task_queue_items" ("task_id", "status", "id");
+CREATE INDEX IF NOT EXISTS "task_item_account_idx" ON "task_queue_items" ("account_id", "finished_at");
+'''
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_securitycheck'),
+    ]
+
+    operations = [
+        # Идемпотентный SQL выполняется на мигрируемом алиасе (см. db_routers)
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunSQL(TASK_QUEUE_ITEMS_SQL, 'DROP TABLE IF EXISTS "task_queue_items";')],
+            state_operations=[
+                migrations.CreateModel(
+                    name='TaskQueueItem',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('status', models.CharField(choices=[('success', 'Успешно'), ('error', 'Ошибка'), ('parked', 'Ожидает FloodWait')], max_length=20)),
+                        ('outcome', models.JSONField(blank=True, null=True)),
+                        ('started_at', models.DateTimeField(blank=True, null=True)),
+                        ('finished_at', models.DateTimeField(blank=True, null=True)),
+                        ('duration_ms', models.IntegerField(blank=True, null=True)),
+                        ('account', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='accounts.telegramaccount')),
+                        ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='accounts.taskqueue')),
+                    ],
+                    options={
+                        'db_table': 'task_queue_items',
+                        'ordering': ['id'],
+                        'indexes': [
+                            models.Index(fields=['task', 'status', 'id'], name='task_item_status_idx'),
+                            models.Index(fields=['account', 'finished_at'], name='task_item_account_idx'),
+                        ],
+                    },
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_taskqueueitem'),
+    ]
+
+    operations = [
+        # Идемпотентный SQL выполняется на мигрируемом алиасе (см. db_routers)
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'ALTER TABLE "task_queue" ADD COLUMN IF NOT EXISTS "celery_task_id" varchar(255) NULL;',
+                    'ALTER TABLE "task_queue" DROP COLUMN IF EXISTS "celery_task_id";',
+                ),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='taskqueue',
+                    name='celery_task_id',
+                    field=models.CharField(blank=True, help_text='ID задачи Celery для отзыва при отмене', max_length=255, null=True),
+                ),
+            ],
+        ),
+    ]
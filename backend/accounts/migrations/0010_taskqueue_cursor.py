@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_taskqueue_celery_task_id'),
+    ]
+
+    operations = [
+        # Идемпотентный SQL выполняется на мигрируемом алиасе (см. db_routers)
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'ALTER TABLE "task_queue" ADD COLUMN IF NOT EXISTS "cursor" integer DEFAULT 0 NOT NULL CHECK ("cursor" >= 0);',
+                    'ALTER TABLE "task_queue" DROP COLUMN IF EXISTS "cursor";',
+                ),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='taskqueue',
+                    name='cursor',
+                    field=models.PositiveIntegerField(default=0, help_text='Позиция в account_ids, до которой групповая задача обработана'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,70 @@
+import django.utils.timezone
+from datetime import timedelta
+from django.db import migrations, models
+from django.utils.timezone import now
+
+CHECK_INTERVAL = timedelta(hours=24)
+
+
+def spread_next_checks(apps, schema_editor):
+    """
+    Распределяет первые плановые проверки по суткам: недавно проверенные аккаунты
+    равномерно в течение интервала, давно не проверенные - сразу, самые старые первыми.
+    """
+    TelegramAccount = apps.get_model('accounts', 'TelegramAccount')
+    db_alias = schema_editor.connection.alias
+    current = now()
+
+    accounts = list(
+        TelegramAccount.objects.using(db_alias)
+        .filter(account_status='active')
+        .only('id', 'last_ping', 'created_at')
+        .order_by('id')
+    )
+    fresh = [account for account in accounts if account.last_ping and current - account.last_ping < CHECK_INTERVAL]
+    step = CHECK_INTERVAL / max(len(fresh), 1)
+    for position, account in enumerate(fresh):
+        account.next_check_at = current + step * position
+    for account in accounts:
+        if not (account.last_ping and current - account.last_ping < CHECK_INTERVAL):
+            account.next_check_at = (account.last_ping or account.created_at) + CHECK_INTERVAL
+
+    TelegramAccount.objects.using(db_alias).bulk_update(accounts, ['next_check_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_taskqueue_cursor'),
+    ]
+
+    operations = [
+        # Идемпотентный SQL выполняется на мигрируемом алиасе (см. db_routers)
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    '''
+                    ALTER TABLE "telegram_accounts" ADD COLUMN IF NOT EXISTS "next_check_at" timestamp with time zone DEFAULT now() NOT NULL;
+                    ALTER TABLE "telegram_accounts" ALTER COLUMN "next_check_at" DROP DEFAULT;
+                    CREATE INDEX IF NOT EXISTS "tg_acc_next_check_idx" ON "telegram_accounts" ("next_check_at") WHERE "account_status" = 'active';
+                    ''',
+                    '''
+                    DROP INDEX IF EXISTS "tg_acc_next_check_idx";
+                    ALTER TABLE "telegram_accounts" DROP COLUMN IF EXISTS "next_check_at";
+                    ''',
+                ),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='telegramaccount',
+                    name='next_check_at',
+                    field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Следующая плановая проверка'),
+                ),
+                migrations.AddIndex(
+                    model_name='telegramaccount',
+                    index=models.Index(condition=models.Q(('account_status', 'active')), fields=['next_check_at'], name='tg_acc_next_check_idx'),
+                ),
+            ],
+        ),
+        migrations.RunPython(spread_next_checks, migrations.RunPython.noop),
+    ]
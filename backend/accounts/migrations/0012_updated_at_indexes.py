@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_telegramaccount_next_check_at'),
+    ]
+
+    operations = [
+        # Идемпотентный SQL выполняется на мигрируемом алиасе (см. db_routers)
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    '''
+                    CREATE INDEX IF NOT EXISTS "tg_acc_updated_idx" ON "telegram_accounts" ("updated_at", "id");
+                    CREATE INDEX IF NOT EXISTS "audit_log_created_idx" ON "account_audit_log" ("created_at");
+                    CREATE INDEX IF NOT EXISTS "task_queue_updated_idx" ON "task_queue" ("updated_at");
+                    ''',
+                    '''
+                    DROP INDEX IF EXISTS "tg_acc_updated_idx";
+                    DROP INDEX IF EXISTS "audit_log_created_idx";
+                    DROP INDEX IF EXISTS "task_queue_updated_idx";
+                    ''',
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='telegramaccount',
+                    index=models.Index(fields=['updated_at', 'id'], name='tg_acc_updated_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='accountauditlog',
+                    index=models.Index(fields=['created_at'], name='audit_log_created_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='taskqueue',
+                    index=models.Index(fields=['updated_at'], name='task_queue_updated_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_updated_at_indexes'),
+    ]
+
+    operations = [
+        # Идемпотентный SQL выполняется на мигрируемом алиасе (см. db_routers)
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    '''
+                    CREATE TABLE IF NOT EXISTS "account_tombstones" (
+                        "id" bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+                        "account_id" bigint NOT NULL,
+                        "deleted_at" timestamp with time zone NOT NULL
+                    );
+                    CREATE INDEX IF NOT EXISTS "acc_tombstone_deleted_idx" ON "account_tombstones" ("deleted_at");
+                    ''',
+                    'DROP TABLE IF EXISTS "account_tombstones";',
+                ),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name='AccountTombstone',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('account_id', models.BigIntegerField()),
+                        ('deleted_at', models.DateTimeField(auto_now_add=True)),
+                    ],
+                    options={
+                        'db_table': 'account_tombstones',
+                        'indexes': [models.Index(fields=['deleted_at'], name='acc_tombstone_deleted_idx')],
+                    },
+                ),
+            ],
+        ),
+    ]
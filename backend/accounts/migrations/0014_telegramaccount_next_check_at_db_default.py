@@ -0,0 +1,29 @@
+import django.db.models.functions.datetime
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_accounttombstone'),
+    ]
+
+    operations = [
+        # Идемпотентный SQL выполняется на мигрируемом алиасе (см. db_routers)
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'ALTER TABLE "telegram_accounts" ALTER COLUMN "next_check_at" SET DEFAULT now();',
+                    'ALTER TABLE "telegram_accounts" ALTER COLUMN "next_check_at" DROP DEFAULT;',
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='telegramaccount',
+                    name='next_check_at',
+                    field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), default=django.utils.timezone.now, verbose_name='Следующая плановая проверка'),
+                ),
+            ],
+        ),
+    ]
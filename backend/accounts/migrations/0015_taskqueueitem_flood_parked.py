@@ -0,0 +1,16 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_telegramaccount_next_check_at_db_default'),
+    ]
+
+    operations = [
+        # FloodWait во время проверки записывался статусом flood, которого нет в STATUS_CHOICES
+        migrations.RunSQL(
+            "UPDATE \"task_queue_items\" SET \"status\" = 'parked' WHERE \"status\" = 'flood';",
+            migrations.RunSQL.noop,
+        ),
+    ]
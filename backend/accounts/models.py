@@ -1,4 +1,7 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Now, Upper
+from django.utils import timezone
 
 
 class GlobalAppSettings(models.Model):
@@ -89,6 +92,8 @@ class TelegramAccount(models.Model):
     activity_status = models.CharField(max_length=20, choices=ACTIVITY_STATUS_CHOICES, default='active', verbose_name='Статус активности')
     device_params = models.JSONField(default=dict, blank=True, null=True, verbose_name='Параметры устройства')
     proxy = models.ForeignKey(ProxyServer, on_delete=models.SET_NULL, blank=True, null=True, verbose_name='Прокси-сервер', related_name='accounts')
+    # db_default - для записей, создаваемых сырым SQL (SessionManager.save_account_session)
+    next_check_at = models.DateTimeField(default=timezone.now, db_default=Now(), verbose_name='Следующая плановая проверка')
     
     # Безопасность
     encryption_version = models.IntegerField(default=1)
@@ -106,6 +111,16 @@ class TelegramAccount(models.Model):
             models.Index(fields=['employee_fio']),
             models.Index(fields=['last_ping']),
             models.Index(fields=['activity_status']),
+            # Поминутный планировщик выбирает активные аккаунты с наступившим next_check_at
+            models.Index(fields=['next_check_at'], condition=models.Q(account_status='active'), name='tg_acc_next_check_idx'),
+            # Валидатор условного GET (MAX(updated_at)) и выборка изменений по (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='tg_acc_updated_idx'),
+            # Триграммные индексы для поиска по подстроке: icontains в Postgres
+            # сравнивает UPPER(поле), поэтому индексируется то же выражение
+            GinIndex(OpClass(Upper('phone_number'), name='gin_trgm_ops'), name='tg_acc_phone_trgm'),
+            GinIndex(OpClass(Upper('employee_id'), name='gin_trgm_ops'), name='tg_acc_employee_id_trgm'),
+            GinIndex(OpClass(Upper('employee_fio'), name='gin_trgm_ops'), name='tg_acc_employee_fio_trgm'),
+            GinIndex(OpClass(Upper('account_note'), name='gin_trgm_ops'), name='tg_acc_note_trgm'),
         ]
 
     def __str__(self):
@@ -136,6 +151,21 @@ class TelegramAccount(models.Model):
             return 'red'
 
 
+class AccountTombstone(models.Model):
+    """Отметка об удаленном аккаунте для выборки изменений (/api/accounts/changes/)"""
+    account_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'account_tombstones'
+        indexes = [
+            models.Index(fields=['deleted_at'], name='acc_tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} deleted at {self.deleted_at}"
+
+
 class AccountAuditLog(models.Model):
     account = models.ForeignKey(TelegramAccount, on_delete=models.CASCADE)
     action_type = models.CharField(max_length=50)
@@ -147,11 +177,48 @@ class AccountAuditLog(models.Model):
     class Meta:
         db_table = 'account_audit_log'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='audit_log_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.action_type} for {self.account.phone_number}"
 
 
+class SecurityCheck(models.Model):
+    """
+    Результат проверки безопасности аккаунта, одна строка на проверку.
+    Последняя проверка аккаунта помечена is_latest, по ней строится список угроз.
+    """
+    account = models.ForeignKey(TelegramAccount, on_delete=models.CASCADE, related_name='security_checks')
+    has_security_alert = models.BooleanField(default=False)
+    alert_message = models.TextField(blank=True, default='')
+    last_security_check = models.DateTimeField()
+    is_latest = models.BooleanField(default=True)
+
+    class Meta:
+        db_table = 'security_checks'
+        ordering = ['-last_security_check']
+        indexes = [
+            models.Index(
+                fields=['has_security_alert', 'last_security_check'],
+                condition=models.Q(is_latest=True),
+                name='sec_check_latest_alert_idx'
+            ),
+            models.Index(fields=['account', 'last_security_check'], name='sec_check_account_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['account'],
+                condition=models.Q(is_latest=True),
+                name='sec_check_one_latest_per_account'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id}: {'alert' if self.has_security_alert else 'ok'} at {self.last_security_check}"
+
+
 class TaskQueue(models.Model):
     """Очередь задач для проверки аккаунтов"""
     TASK_TYPE_CHOICES = [
@@ -175,9 +242,11 @@ class TaskQueue(models.Model):
     parameters = models.JSONField(default=dict, blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     progress = models.IntegerField(default=0, help_text='Прогресс в процентах')
+    cursor = models.PositiveIntegerField(default=0, help_text='Позиция в account_ids, до которой групповая задача обработана')
     result = models.JSONField(blank=True, null=True)
     error_message = models.TextField(blank=True, null=True)
     created_by = models.CharField(max_length=100, blank=True, null=True)
+    celery_task_id = models.CharField(max_length=255, blank=True, null=True, help_text='ID задачи Celery для отзыва при отмене')
     started_at = models.DateTimeField(blank=True, null=True)
     completed_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -190,7 +259,37 @@ class TaskQueue(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['task_type']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['updated_at'], name='task_queue_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_task_type_display()} - {self.status}"
+
+
+class TaskQueueItem(models.Model):
+    """Результат групповой задачи по одному аккаунту"""
+    STATUS_CHOICES = [
+        ('success', 'Успешно'),
+        ('error', 'Ошибка'),
+        ('parked', 'Ожидает FloodWait'),
+    ]
+
+    task = models.ForeignKey(TaskQueue, on_delete=models.CASCADE, related_name='items')
+    # В задаче может оказаться уже удаленный аккаунт, поэтому без ограничения в БД
+    account = models.ForeignKey(TelegramAccount, on_delete=models.CASCADE, blank=True, null=True, db_constraint=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    outcome = models.JSONField(blank=True, null=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    duration_ms = models.IntegerField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'task_queue_items'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['task', 'status', 'id'], name='task_item_status_idx'),
+            models.Index(fields=['account', 'finished_at'], name='task_item_account_idx'),
         ]
 
     def __str__(self):
-        return f"{self.get_task_type_display()} - {self.status}"
\ No newline at end of file
+        return f"{self.task_id}/{self.account_id}: {self.status}"
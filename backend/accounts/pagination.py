@@ -0,0 +1,223 @@
+import base64
+import hashlib
+import json
+import logging
+from datetime import timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware, now
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+COUNT_CACHE_PREFIX = 'tg:count'
+
+
+def as_utc(value):
+    """Столбцы TIMESTAMP из init.sql читаются без часового пояса, в них хранится UTC"""
+    if value is not None and is_naive(value):
+        return make_aware(value, timezone.utc)
+    return value
+
+
+def estimated_count(queryset):
+    """
+    Число строк без COUNT(*) на каждый запрос: для всей таблицы - оценка
+    планировщика Postgres (reltuples), для выборки с фильтрами - COUNT,
+    закешированный в Redis на ACCOUNT_COUNT_CACHE_TTL секунд.
+    """
+    model = queryset.model
+    if not queryset.query.where:
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] > 0:
+            return row[0]
+
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    key = f'{COUNT_CACHE_PREFIX}:{model._meta.db_table}:' + hashlib.sha1(f'{sql}{params}'.encode('utf-8')).hexdigest()
+    try:
+        cached = get_redis().get(key)
+        if cached is not None:
+            return int(cached)
+    except Exception as e:
+        logger.warning(f"Count cache unavailable: {e}")
+        return queryset.count()
+
+    count = queryset.count()
+    try:
+        get_redis().set(key, count, ex=settings.ACCOUNT_COUNT_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Count cache unavailable: {e}")
+    return count
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset-пагинация: следующая страница выбирается условием по (поле сортировки, id),
+    а не OFFSET, поэтому она стабильна при вставках и не замедляется к концу списка.
+    Если opt_in, включается параметрами limit или cursor; без них список отдается целиком, как раньше.
+    Поле сортировки берется из view.get_sort_field() и должно быть в view.keyset_fields.
+    """
+    limit_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    default_limit = 100
+    max_limit = 1000
+    opt_in = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self._enabled(request):
+            return None
+        page_queryset = self._page_queryset(queryset, request, view)
+        self.count = estimated_count(queryset)
+        return self._set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """То же для async-view: страница читается async-запросом ORM"""
+        if not self._enabled(request):
+            return None
+        page_queryset = self._page_queryset(queryset, request, view)
+        # Оценка числа строк идет через курсор и Redis, у которых нет async API
+        self.count = await sync_to_async(estimated_count)(queryset)
+        return self._set_page([obj async for obj in page_queryset])
+
+    def _enabled(self, request):
+        params = request.query_params
+        return not (self.opt_in and self.limit_query_param not in params and self.cursor_query_param not in params)
+
+    def _page_queryset(self, queryset, request, view):
+        params = request.query_params
+        self.request = request
+        self.limit = self._get_limit(params)
+        self.sort = view.get_sort_field()
+        field = self.sort.lstrip('-')
+        if field not in view.keyset_fields:
+            raise ValidationError({'sort_by': f'Пагинация не поддерживает сортировку по {field}'})
+        self.field = field
+        self.descending = self.sort.startswith('-')
+        self.is_datetime = view.keyset_fields[field] == 'datetime'
+
+        # NULL всегда в конце, id - уникальный второй ключ сортировки
+        ordering = F(field).desc(nulls_last=True) if self.descending else F(field).asc(nulls_last=True)
+        queryset = queryset.order_by(ordering, '-id' if self.descending else 'id')
+
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(self._decode_cursor(cursor)))
+        return queryset[:self.limit + 1]
+
+    def _set_page(self, page):
+        self.has_next = len(page) > self.limit
+        self.page = page[:self.limit]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self._next_link(),
+            'results': data
+        })
+
+    def _get_limit(self, params):
+        try:
+            limit = int(params.get(self.limit_query_param, self.default_limit))
+        except ValueError:
+            raise ValidationError({'limit': 'Должно быть целым числом'})
+        return max(1, min(limit, self.max_limit))
+
+    def _after(self, position):
+        value, last_id = position
+        id_after = Q(id__lt=last_id) if self.descending else Q(id__gt=last_id)
+        if value is None:
+            return Q(**{f'{self.field}__isnull': True}) & id_after
+
+        lookup = 'lt' if self.descending else 'gt'
+        return (
+            Q(**{f'{self.field}__{lookup}': value})
+            | (Q(**{self.field: value}) & id_after)
+            | Q(**{f'{self.field}__isnull': True})
+        )
+
+    def _next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        cursor = self._encode_cursor(getattr(last, self.field), last.id)
+
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def _encode_cursor(self, value, last_id):
+        if value is not None and self.is_datetime:
+            value = as_utc(value).isoformat()
+        payload = json.dumps({'s': self.sort, 'v': value, 'id': last_id})
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def _decode_cursor(self, cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            value, last_id = payload['v'], int(payload['id'])
+            sort = payload['s']
+        except (ValueError, KeyError, TypeError):
+            raise ValidationError({self.cursor_query_param: 'Некорректный курсор'})
+
+        if sort != self.sort:
+            raise ValidationError({self.cursor_query_param: 'Курсор получен для другой сортировки'})
+        if value is not None and self.is_datetime:
+            value = as_utc(parse_datetime(value))
+        return value, last_id
+
+
+class SecurityAlertPagination(KeysetPagination):
+    """Список угроз всегда постраничный"""
+    opt_in = False
+
+
+class TaskItemPagination(KeysetPagination):
+    """Результаты задачи всегда постраничные"""
+    opt_in = False
+    default_limit = 200
+
+
+class AccountChangesPagination(KeysetPagination):
+    """
+    Изменения для синхронизации: строки по возрастанию (updated_at, id) после курсора since.
+    Курсор следующего опроса отдается всегда, но последняя страница не сдвигает его дальше
+    момента запроса минус view.changes_overlap: строка, закоммиченная позже со временем
+    раньше этого момента, придет в следующем опросе (повторы клиент применяет как upsert).
+    """
+    cursor_query_param = 'since'
+    opt_in = False
+    default_limit = 500
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.position = None
+        self.horizon = (now() - view.changes_overlap, 0)
+        page_queryset = self._page_queryset(queryset, request, view)
+        return self._set_page([obj async for obj in page_queryset])
+
+    def _decode_cursor(self, cursor):
+        self.position = super()._decode_cursor(cursor)
+        if self.position[0] is None:
+            raise ValidationError({'since': 'Некорректный курсор'})
+        return self.position
+
+    def get_cursor(self):
+        if self.page:
+            last = self.page[-1]
+            position = (as_utc(getattr(last, self.field)), last.id)
+        else:
+            position = self.position or self.horizon
+        if not self.has_next:
+            position = min(position, self.horizon)
+        return self._encode_cursor(*position)
@@ -1,5 +1,18 @@
 from rest_framework import serializers
-from .models import TelegramAccount, AccountAuditLog, GlobalAppSettings, TaskQueue, ProxyServer
+from .models import TelegramAccount, AccountAuditLog, SecurityCheck, GlobalAppSettings, TaskQueue, TaskQueueItem, ProxyServer
+
+
+class SparseFieldsMixin:
+    """Оставляет только поля из параметра запроса fields=a,b,c (если он передан)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request else None
+        if requested:
+            allowed = {name.strip() for name in requested.split(',') if name.strip()}
+            for name in set(self.fields) - allowed:
+                self.fields.pop(name)
 
 
 class GlobalAppSettingsSerializer(serializers.ModelSerializer):
@@ -19,7 +32,7 @@ class ProxyServerSerializer(serializers.ModelSerializer):
         }
 
 
-class TelegramAccountSerializer(serializers.ModelSerializer):
+class TelegramAccountSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     health_indicator = serializers.CharField(read_only=True)
     proxy_details = ProxyServerSerializer(source='proxy', read_only=True)
     
@@ -47,6 +60,25 @@ class AccountAuditLogSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+class SecurityAlertSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='account_id', read_only=True)
+    phone_number = serializers.CharField(source='account.phone_number', read_only=True)
+    employee_fio = serializers.CharField(source='account.employee_fio', read_only=True, allow_null=True)
+    employee_id = serializers.CharField(source='account.employee_id', read_only=True, allow_null=True)
+    account_status = serializers.CharField(source='account.account_status', read_only=True)
+    activity_status = serializers.CharField(source='account.activity_status', read_only=True)
+    last_ping = serializers.DateTimeField(source='account.last_ping', read_only=True, allow_null=True)
+
+    class Meta:
+        model = SecurityCheck
+        fields = [
+            'id', 'phone_number', 'employee_fio', 'employee_id',
+            'has_security_alert', 'alert_message', 'last_security_check',
+            'account_status', 'activity_status', 'last_ping'
+        ]
+        read_only_fields = fields
+
+
 class TaskQueueSerializer(serializers.ModelSerializer):
     account_phone = serializers.CharField(source='account.phone_number', read_only=True, allow_null=True)
     
@@ -60,6 +92,18 @@ class TaskQueueSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
+class TaskQueueItemSerializer(serializers.ModelSerializer):
+    account_phone = serializers.CharField(source='account.phone_number', read_only=True, allow_null=True)
+
+    class Meta:
+        model = TaskQueueItem
+        fields = [
+            'id', 'account', 'account_phone', 'status', 'outcome',
+            'started_at', 'finished_at', 'duration_ms'
+        ]
+        read_only_fields = fields
+
+
 class BulkActionSerializer(serializers.Serializer):
     account_ids = serializers.ListField(
         child=serializers.IntegerField(),
@@ -0,0 +1,49 @@
+import re
+
+from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+PHONE_QUERY_RE = re.compile(r'^\+?[\d\s()-]+$')
+
+# Поля поиска; по UPPER(поле) построены триграммные GIN-индексы, поэтому
+# и поиск по цифрам телефона идет через icontains
+SEARCH_FIELDS = ['phone_number', 'employee_id', 'employee_fio', 'account_note']
+
+# Совпадение по префиксу номера выше любого совпадения по подстроке (similarity не больше 1)
+PHONE_PREFIX_RANK = 1.0
+
+
+def is_phone_query(term):
+    return bool(PHONE_QUERY_RE.match(term)) and sum(ch.isdigit() for ch in term) >= 3
+
+
+def search_accounts(queryset, term):
+    """
+    Поиск аккаунтов с оценкой релевантности (аннотация search_rank).
+    Текст ищется по подстроке во всех полях поиска. Запрос из цифр дополнительно
+    ищется по префиксу номера телефона без учета форматирования, такие совпадения идут первыми.
+    """
+    term = term.strip()
+    if not term:
+        return queryset
+
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f'{field}__icontains': term})
+
+    rank = Greatest(
+        Coalesce(TrigramSimilarity('phone_number', term), Value(0.0)),
+        Coalesce(TrigramSimilarity('employee_id', term), Value(0.0)),
+        Coalesce(TrigramWordSimilarity(term, 'employee_fio'), Value(0.0)),
+        Coalesce(TrigramWordSimilarity(term, 'account_note'), Value(0.0)),
+    )
+
+    if is_phone_query(term):
+        digits = re.sub(r'\D', '', term)
+        # Номер, набранный с форматированием, ищется и как подстрока из одних цифр
+        condition |= Q(phone_number__icontains=digits)
+        phone_prefix = Q(phone_number__istartswith=digits) | Q(phone_number__istartswith=f'+{digits}')
+        rank = rank + Case(When(phone_prefix, then=Value(PHONE_PREFIX_RANK)), default=Value(0.0))
+
+    return queryset.filter(condition).annotate(search_rank=rank)
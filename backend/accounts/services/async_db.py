@@ -0,0 +1,155 @@
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import models, transaction
+from django.utils.timezone import now
+
+from ..models import TelegramAccount, AccountAuditLog, SecurityCheck
+from .response_cache import bump_generation
+
+logger = logging.getLogger(__name__)
+
+try:
+    from psycopg.types.json import Jsonb
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # psycopg 3 нужен только asyncio-воркеру
+    Jsonb = None
+    AsyncConnectionPool = None
+
+
+class OrmAccountWriter:
+    """Запись состояния аккаунта и журнала аудита через Django ORM (поток на каждый запрос)"""
+
+    async def save_account(self, account, fields):
+        await sync_to_async(account.save)(update_fields=[*fields, 'updated_at'])
+
+    async def create_audit_log(self, account, action_type, action_details, performed_by='Система'):
+        await sync_to_async(AccountAuditLog.objects.using('telegram_db').create)(
+            account=account,
+            action_type=action_type,
+            action_details=action_details,
+            performed_by=performed_by
+        )
+
+    async def record_security_check(self, account, has_security_alert, alert_message, checked_at):
+        await sync_to_async(self._record_security_check)(account, has_security_alert, alert_message, checked_at)
+
+    def _record_security_check(self, account, has_security_alert, alert_message, checked_at):
+        with transaction.atomic(using='telegram_db'):
+            # Блокировка аккаунта не дает двум проверкам одновременно стать последними
+            TelegramAccount.objects.using('telegram_db').select_for_update().filter(pk=account.pk).values('pk').first()
+            SecurityCheck.objects.using('telegram_db').filter(account_id=account.pk, is_latest=True).update(is_latest=False)
+            SecurityCheck.objects.using('telegram_db').create(
+                account_id=account.pk,
+                has_security_alert=has_security_alert,
+                alert_message=alert_message or '',
+                last_security_check=checked_at,
+                is_latest=True
+            )
+
+    async def close(self):
+        pass
+
+
+class PsycopgAccountWriter:
+    """
+    Запись состояния аккаунта и журнала аудита асинхронным драйвером psycopg 3.
+    Запросы выполняются на event loop без переходов в потоки,
+    соединения берутся из пула, открытого на этом loop.
+    """
+
+    def __init__(self, alias='telegram_db', pool_size=None):
+        self.alias = alias
+        self.pool_size = int(pool_size or settings.TELEGRAM_ASYNC_DB_POOL_SIZE)
+        self._pool = None
+        self._lock = asyncio.Lock()
+
+    def _conninfo(self):
+        db = settings.DATABASES[self.alias]
+        params = {
+            'dbname': db['NAME'],
+            'user': db['USER'],
+            'password': db['PASSWORD'],
+            'host': db['HOST'],
+            'port': db['PORT'],
+        }
+        return ' '.join(f"{key}='{value}'" for key, value in params.items() if value)
+
+    async def _get_pool(self):
+        if self._pool is None:
+            async with self._lock:
+                if self._pool is None:
+                    pool = AsyncConnectionPool(self._conninfo(), min_size=1, max_size=self.pool_size, open=False)
+                    await pool.open()
+                    self._pool = pool
+        return self._pool
+
+    async def _execute(self, query, params):
+        pool = await self._get_pool()
+        async with pool.connection() as conn:
+            await conn.execute(query, params)
+
+    async def save_account(self, account, fields):
+        account.updated_at = now()
+        columns, values = [], []
+        for name in [*fields, 'updated_at']:
+            field = TelegramAccount._meta.get_field(name)
+            value = getattr(account, field.attname)
+            columns.append(f'"{field.column}" = %s')
+            values.append(Jsonb(value) if isinstance(field, models.JSONField) and value is not None else value)
+
+        await self._execute(
+            f'UPDATE {TelegramAccount._meta.db_table} SET {", ".join(columns)} WHERE id = %s',
+            [*values, account.pk]
+        )
+        # Сырой SQL не вызывает сигналы моделей, кеш списков сбрасывается явно
+        await sync_to_async(bump_generation, thread_sensitive=False)()
+
+    async def create_audit_log(self, account, action_type, action_details, performed_by='Система'):
+        await self._execute(
+            f'INSERT INTO {AccountAuditLog._meta.db_table} '
+            '(account_id, action_type, action_details, performed_by, created_at) '
+            'VALUES (%s, %s, %s, %s, %s)',
+            [
+                account.pk,
+                action_type,
+                Jsonb(action_details) if action_details is not None else None,
+                performed_by,
+                now()
+            ]
+        )
+
+    async def record_security_check(self, account, has_security_alert, alert_message, checked_at):
+        pool = await self._get_pool()
+        async with pool.connection() as conn, conn.transaction():
+            # Блокировка аккаунта не дает двум проверкам одновременно стать последними
+            await conn.execute(
+                f'SELECT 1 FROM {TelegramAccount._meta.db_table} WHERE id = %s FOR UPDATE', [account.pk]
+            )
+            await conn.execute(
+                f'UPDATE {SecurityCheck._meta.db_table} SET is_latest = false '
+                'WHERE account_id = %s AND is_latest',
+                [account.pk]
+            )
+            await conn.execute(
+                f'INSERT INTO {SecurityCheck._meta.db_table} '
+                '(account_id, has_security_alert, alert_message, last_security_check, is_latest) '
+                'VALUES (%s, %s, %s, %s, true)',
+                [account.pk, has_security_alert, alert_message or '', checked_at]
+            )
+        await sync_to_async(bump_generation, thread_sensitive=False)()
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+
+def get_account_writer():
+    """Асинхронный writer, если установлен psycopg 3, иначе запись через ORM"""
+    if AsyncConnectionPool is None:
+        logger.warning("psycopg 3 is not installed, account writes will go through the Django ORM")
+        return OrmAccountWriter()
+    return PsycopgAccountWriter()
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.timezone import now
+
+from ..models import TelegramAccount
+from .session_manager import SessionManager, CHECK_FIELDS
+from .flood_registry import FloodRegistry
+from .rate_limiter import acquire_connect_slot
+from .client_pool import has_pooled_client
+from .async_db import OrmAccountWriter
+from .cancellation import TaskCancelled
+
+logger = logging.getLogger(__name__)
+
+DIRECT_EGRESS = 'direct'
+
+
+def egress_key(account):
+    """Ключ исходящего канала аккаунта: прокси или прямое подключение"""
+    if account.proxy_id:
+        return f'proxy:{account.proxy_id}'
+    return DIRECT_EGRESS
+
+
+class BulkChecker:
+    """
+    Параллельная проверка аккаунтов на одном event loop.
+    Ограничивает общее число одновременных проверок и число проверок через
+    один прокси. Интервалы между подключениями через один IP выдерживает
+    распределенный RateLimiter; токен на подключение ожидается до занятия общего
+    слота, поэтому пауза перед подключением через один прокси не держит слот,
+    нужный аккаунтам других прокси.
+    При отмене задачи (cancel_token) новые проверки не начинаются,
+    а уже начатые завершаются; результаты отмененных аккаунтов не возвращаются.
+    """
+
+    def __init__(self, concurrency=None, per_proxy_concurrency=None, on_result=None, writer=None, semaphore=None,
+                 cancel_token=None):
+        self.concurrency = int(concurrency or settings.TELEGRAM_BULK_CONCURRENCY)
+        self.per_proxy_concurrency = int(per_proxy_concurrency or settings.TELEGRAM_BULK_PER_PROXY_CONCURRENCY)
+        self.on_result = on_result
+        self.writer = writer or OrmAccountWriter()
+        self.session_manager = SessionManager()
+        self.flood_registry = FloodRegistry()
+        # Общий семафор позволяет asyncio-воркеру ограничить проверки сразу всех заданий
+        self._shared_semaphore = semaphore
+        self.cancel_token = cancel_token
+        self._global_semaphore = None
+        self._egress_semaphores = {}
+
+    def _egress_semaphore(self, key):
+        if key not in self._egress_semaphores:
+            self._egress_semaphores[key] = asyncio.Semaphore(self.per_proxy_concurrency)
+        return self._egress_semaphores[key]
+
+    def _load_accounts(self, account_ids):
+        accounts = TelegramAccount.objects.using('telegram_db').select_related('proxy').filter(id__in=account_ids)
+        return {account.id: account for account in accounts}
+
+    def _load_sessions(self, account_ids):
+        """Сессии и ключи приложения для всех аккаунтов пачками, без recovery_email и phone_code_hash"""
+        return {
+            data['id']: data
+            for data in self.session_manager.load_account_sessions(account_ids=account_ids, fields=CHECK_FIELDS)
+        }
+
+    async def run(self, account_ids):
+        """Проверяет аккаунты и возвращает результаты в исходном порядке"""
+        self._global_semaphore = self._shared_semaphore or asyncio.Semaphore(self.concurrency)
+
+        accounts = await sync_to_async(self._load_accounts)(account_ids)
+        ready, parked = await sync_to_async(self.flood_registry.partition, thread_sensitive=False)(accounts.values())
+        sessions = await sync_to_async(self._load_sessions)(ready)
+        logger.info(
+            f"Bulk check of {len(account_ids)} accounts: concurrency={self.concurrency}, "
+            f"per_proxy={self.per_proxy_concurrency}, parked={len(parked)}"
+        )
+
+        results = await asyncio.gather(*[
+            self._check_one(account_id, accounts.get(account_id), sessions.get(account_id), parked.get(account_id))
+            for account_id in account_ids
+        ])
+        return [item for item in results if item is not None]
+
+    async def _check_one(self, account_id, account, account_data, not_before=None):
+        from ..tasks import parked_result
+
+        started_at = None
+        if account is None:
+            item = {'account_id': account_id, 'error': 'Аккаунт не найден'}
+        elif not_before:
+            item = {'account_id': account_id, 'result': parked_result(not_before)}
+        else:
+            key = egress_key(account)
+            async with self._egress_semaphore(key):
+                try:
+                    connect_slot_acquired = await self._reserve_connect_slot(account, account_data)
+                except TaskCancelled:
+                    return None
+                async with self._global_semaphore:
+                    if self.cancel_token and await self.cancel_token.is_cancelled():
+                        return None
+                    started_at = now()
+                    try:
+                        result = await self.check_account(account, account_data, connect_slot_acquired)
+                        item = {'account_id': account_id, 'result': result}
+                    except TaskCancelled:
+                        return None
+                    except Exception as e:
+                        logger.error(f"Error checking account {account_id}: {e}", exc_info=True)
+                        item = {'account_id': account_id, 'error': str(e)}
+
+        item['started_at'] = started_at
+        item['finished_at'] = now()
+
+        if self.on_result:
+            await self.on_result(item)
+        return item
+
+    async def _reserve_connect_slot(self, account, account_data):
+        """Ждет токен rate limiter, если проверке понадобится новое подключение"""
+        if not account_data or 'error' in account_data or not account_data['session_data']:
+            return False
+        if has_pooled_client(account.phone_number, account_data['session_hash']):
+            return False
+        await acquire_connect_slot(account.proxy_id, account_data['api_id'])
+        return True
+
+    async def check_account(self, account, account_data, connect_slot_acquired=False):
+        from ..tasks import check_account_async
+
+        if account_data is None:
+            raise ValueError(f"Account {account.phone_number} not found")
+        if 'error' in account_data:
+            raise ValueError(account_data['error'])
+
+        if not account_data['session_data']:
+            account.activity_status = 'dead'
+            account.last_ping = now()
+            await self.writer.save_account(account, ['activity_status', 'last_ping'])
+            return {'status': 'error', 'message': 'Сессия не найдена'}
+
+        return await check_account_async(
+            account, account_data, writer=self.writer, connect_slot_acquired=connect_slot_acquired
+        )
@@ -0,0 +1,83 @@
+import asyncio
+import contextvars
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CANCEL_KEY_PREFIX = 'tg:task:cancel'
+CANCEL_KEY_TTL = 24 * 3600
+
+# Токен отмены текущей групповой задачи; задачи asyncio наследуют его из контекста
+current_cancel_token = contextvars.ContextVar('current_cancel_token', default=None)
+
+
+class TaskCancelled(BaseException):
+    """
+    Задача отменена пользователем. Наследуется от BaseException, как asyncio.CancelledError,
+    чтобы общие except Exception в проверке аккаунта не приняли отмену за ошибку аккаунта.
+    """
+
+
+def cancel_key(task_id):
+    return f'{CANCEL_KEY_PREFIX}:{task_id}'
+
+
+def request_cancel(task_id):
+    get_redis().set(cancel_key(task_id), 1, ex=CANCEL_KEY_TTL)
+
+
+def is_cancel_requested(task_id):
+    try:
+        return bool(get_redis().exists(cancel_key(task_id)))
+    except Exception as e:
+        logger.warning(f"Could not read cancellation flag for task {task_id}: {e}")
+        return False
+
+
+class CancellationToken:
+    """
+    Флаг отмены задачи из Redis. Сотни параллельных проверок спрашивают его постоянно,
+    поэтому Redis опрашивается не чаще раза в check_interval секунд.
+    """
+
+    def __init__(self, task_id, check_interval=1.0):
+        self.task_id = task_id
+        self.check_interval = check_interval
+        self.cancelled = False
+        self._checked_at = None
+
+    async def is_cancelled(self):
+        if self.cancelled:
+            return True
+        if self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval:
+            self._checked_at = time.monotonic()
+            if await sync_to_async(is_cancel_requested, thread_sensitive=False)(self.task_id):
+                logger.info(f"Task {self.task_id} cancellation requested")
+                self.cancelled = True
+        return self.cancelled
+
+    async def raise_if_cancelled(self):
+        if await self.is_cancelled():
+            raise TaskCancelled(self.task_id)
+
+    async def sleep(self, seconds):
+        """Ожидание, которое прерывается отменой не позже чем через check_interval"""
+        deadline = time.monotonic() + seconds
+        while (remaining := deadline - time.monotonic()) > 0:
+            await self.raise_if_cancelled()
+            await asyncio.sleep(min(remaining, self.check_interval))
+        await self.raise_if_cancelled()
+
+
+async def cancellable_sleep(seconds):
+    """asyncio.sleep, прерываемый отменой текущей групповой задачи (если она есть)"""
+    token = current_cancel_token.get()
+    if token is None:
+        await asyncio.sleep(seconds)
+    else:
+        await token.sleep(seconds)
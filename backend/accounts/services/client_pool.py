@@ -0,0 +1,277 @@
+import asyncio
+import contextlib
+import logging
+import os
+import socket
+import time
+from collections import OrderedDict, deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .event_loop import is_telegram_loop
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY_PREFIX = 'tg:pool:metrics'
+
+
+class PoolEntry:
+    def __init__(self, client, session_hash):
+        self.client = client
+        self.session_hash = session_hash
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        # Убран из пула, пока им пользовались; закрывается при последнем release
+        self.stale = False
+
+
+class TelegramClientPool:
+    """
+    Пул подключенных TelegramClient, ключ - номер телефона.
+    Клиенты переиспользуются между операциями, простаивающие дольше idle_ttl
+    закрываются, при переполнении вытесняется давно не использованный (LRU).
+    Пул привязан к постоянному event loop процесса.
+    Клиент, который убирают из пула (ошибка, смена сессии), пока им пользуются другие
+    операции, не отключается у них на ходу: он помечается stale и закрывается последним release.
+    """
+
+    def __init__(self, max_size=None, idle_ttl=None):
+        self.max_size = int(max_size or settings.TELEGRAM_CLIENT_POOL_SIZE)
+        self.idle_ttl = float(idle_ttl or settings.TELEGRAM_CLIENT_POOL_IDLE_TTL)
+        self._entries = OrderedDict()
+        # Убранные из пула клиенты, которые еще используются: id(client) -> PoolEntry
+        self._retired = {}
+        self._key_locks = {}
+        self._lock_users = {}
+        self._reaper = None
+        self._latencies = deque(maxlen=500)
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'connects': 0,
+            'reconnects': 0,
+            'evictions': 0,
+            'connect_errors': 0,
+        }
+
+    @contextlib.asynccontextmanager
+    async def _locked(self, key):
+        """Блокировка ключа; она живет, пока у ключа есть клиент или ее кто-то ждет"""
+        lock = self._key_locks.get(key)
+        if lock is None:
+            lock = self._key_locks[key] = asyncio.Lock()
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                self._forget_lock(key)
+
+    def _forget_lock(self, key):
+        if key not in self._entries and key not in self._lock_users:
+            self._key_locks.pop(key, None)
+
+    async def acquire(self, key, session_hash, connect):
+        """
+        Возвращает подключенный клиент для key.
+        connect - корутинная функция, создающая и подключающая новый клиент.
+        """
+        self._ensure_reaper()
+
+        async with self._locked(key):
+            entry = self._entries.get(key)
+
+            if entry and entry.session_hash == session_hash and entry.client.is_connected():
+                self.stats['hits'] += 1
+                self._entries.move_to_end(key)
+                entry.in_use += 1
+                return entry.client
+
+            self.stats['misses'] += 1
+            if entry:
+                # Сессия сменилась или соединение разорвано - подключаемся заново
+                self.stats['reconnects'] += 1
+                await self._retire(key, entry)
+
+            started = time.monotonic()
+            try:
+                client = await connect()
+            except Exception:
+                self.stats['connect_errors'] += 1
+                raise
+            self._record_connect(time.monotonic() - started)
+
+            entry = PoolEntry(client, session_hash)
+            entry.in_use = 1
+            self._entries[key] = entry
+
+        await self._evict_overflow()
+        return client
+
+    def has_client(self, key, session_hash):
+        """Есть ли подключенный клиент key с этой сессией, то есть обойдется ли acquire без подключения"""
+        entry = self._entries.get(key)
+        return bool(entry and entry.session_hash == session_hash and entry.client.is_connected())
+
+    async def release(self, key, client, discard=False):
+        """Возвращает клиент в пул; discard=True убирает его из пула (ошибка, выход из аккаунта)"""
+        entry = self._entries.get(key)
+        if entry is None or entry.client is not client:
+            entry = self._retired.get(id(client))
+        if entry is None:
+            await _disconnect(client)
+            return
+
+        entry.in_use = max(0, entry.in_use - 1)
+        entry.last_used = time.monotonic()
+        if discard or entry.stale:
+            await self._retire(key, entry)
+
+    async def discard(self, key):
+        entry = self._entries.get(key)
+        if entry:
+            await self._retire(key, entry)
+
+    async def evict_idle(self):
+        deadline = time.monotonic() - self.idle_ttl
+        for key, entry in list(self._entries.items()):
+            if entry.in_use == 0 and entry.last_used < deadline:
+                self.stats['evictions'] += 1
+                await self._retire(key, entry)
+
+    async def close_all(self):
+        """Остановка процесса: закрываются все клиенты, включая используемые"""
+        for entry in [*self._entries.values(), *self._retired.values()]:
+            await _disconnect(entry.client)
+        self._entries.clear()
+        self._retired.clear()
+        self._key_locks.clear()
+        self._lock_users.clear()
+
+    async def _evict_overflow(self):
+        for key, entry in list(self._entries.items()):
+            if len(self._entries) <= self.max_size:
+                break
+            if entry.in_use == 0:
+                self.stats['evictions'] += 1
+                await self._retire(key, entry)
+
+    async def _retire(self, key, entry):
+        """Убирает клиент из пула; отключает сразу или, если он занят, после последнего release"""
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+            self._forget_lock(key)
+        if entry.in_use:
+            entry.stale = True
+            self._retired[id(entry.client)] = entry
+            return
+        self._retired.pop(id(entry.client), None)
+        await _disconnect(entry.client)
+
+    def _ensure_reaper(self):
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.get_running_loop().create_task(self._reap_forever())
+
+    async def _reap_forever(self):
+        interval = max(5.0, self.idle_ttl / 4)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict_idle()
+                await sync_to_async(self.publish_metrics, thread_sensitive=False)()
+            except Exception as e:
+                logger.warning(f"Client pool maintenance failed: {e}")
+
+    def _record_connect(self, latency):
+        self.stats['connects'] += 1
+        self._latencies.append(latency)
+
+    def metrics(self):
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1)
+
+        return {
+            **self.stats,
+            'size': len(self._entries),
+            'in_use': sum(1 for entry in self._entries.values() if entry.in_use),
+            'retired': len(self._retired),
+            'max_size': self.max_size,
+            'connect_latency_ms_p50': percentile(0.5),
+            'connect_latency_ms_p95': percentile(0.95),
+            'connect_latency_ms_max': round(latencies[-1] * 1000, 1) if latencies else None,
+        }
+
+    def publish_metrics(self):
+        """Сохраняет метрики процесса в Redis, откуда их собирает API"""
+        key = f'{METRICS_KEY_PREFIX}:{socket.gethostname()}:{os.getpid()}'
+        values = {name: '' if value is None else value for name, value in self.metrics().items()}
+        client = get_redis()
+        client.hset(key, mapping=values)
+        client.expire(key, int(self.idle_ttl) + 120)
+
+
+async def _disconnect(client):
+    try:
+        await client.disconnect()
+    except Exception as e:
+        logger.debug(f"Error disconnecting Telegram client: {e}")
+
+
+_pool = None
+_pool_pid = None
+
+
+def get_client_pool():
+    """Пул процесса; None, если код выполняется не на постоянном event loop"""
+    global _pool, _pool_pid
+    if not is_telegram_loop():
+        return None
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = TelegramClientPool()
+        _pool_pid = os.getpid()
+    return _pool
+
+
+async def open_client(key, session_hash, connect):
+    """Подключенный клиент из пула или новый, если пул недоступен"""
+    pool = get_client_pool()
+    if pool is None:
+        return await connect()
+    return await pool.acquire(key, session_hash, connect)
+
+
+def has_pooled_client(key, session_hash):
+    """Клиент для key уже подключен в пуле процесса"""
+    pool = get_client_pool()
+    return pool is not None and pool.has_client(key, session_hash)
+
+
+async def release_client(key, client, discard=False):
+    """Возвращает клиент, полученный через open_client"""
+    pool = get_client_pool()
+    if pool is None:
+        await _disconnect(client)
+    else:
+        await pool.release(key, client, discard=discard)
+
+
+def collect_pool_metrics():
+    """Метрики пулов всех процессов-воркеров"""
+    client = get_redis()
+    result = {}
+    for key in client.scan_iter(match=f'{METRICS_KEY_PREFIX}:*'):
+        worker = key[len(METRICS_KEY_PREFIX) + 1:]
+        result[worker] = {
+            name: (float(value) if value not in ('', None) else None)
+            for name, value in client.hgetall(key).items()
+        }
+    return result
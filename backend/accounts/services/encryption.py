@@ -1,61 +1,165 @@
 import os
 import base64
 import hashlib
-import json
+import threading
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
 from Crypto.Protocol.KDF import PBKDF2
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:  # cryptography - необязательный, более быстрый backend
+    AESGCM = None
+
+# Двоичный конверт: версия ключа (1 байт) || nonce (12) || ciphertext || tag (16).
+# Старый формат - JSON с base64-полями, всегда начинается с '{'.
+NONCE_SIZE = 12
+TAG_SIZE = 16
+LEGACY_PREFIX = b'{'
+
+
+def normalize_key(key_str):
+    """Приводим ключ к 32 байтам (256 бит) для AES-256"""
+    if isinstance(key_str, bytes):
+        key_bytes = key_str
+    else:
+        key_bytes = key_str.encode('utf-8')
+
+    # Используем SHA256 для получения 32 байт
+    if len(key_bytes) != 32:
+        key_bytes = hashlib.sha256(key_bytes).digest()
+
+    # Если все еще не 32 байта, дополняем
+    if len(key_bytes) < 32:
+        key_bytes = key_bytes.ljust(32, b'\0')
+    elif len(key_bytes) > 32:
+        key_bytes = key_bytes[:32]
+
+    return key_bytes
+
+
+class PycryptodomeCipher:
+    """AES-GCM на PyCryptodome: объект шифра создается на каждый nonce"""
+    name = 'pycryptodome'
+
+    def __init__(self, key):
+        self.key = key
+
+    def encrypt(self, nonce, plaintext):
+        cipher = AES.new(self.key, AES.MODE_GCM, nonce=nonce)
+        ciphertext, tag = cipher.encrypt_and_digest(plaintext)
+        return ciphertext, tag
+
+    def decrypt(self, nonce, ciphertext, tag):
+        cipher = AES.new(self.key, AES.MODE_GCM, nonce=nonce)
+        return cipher.decrypt_and_verify(ciphertext, tag)
+
+
+class CryptographyCipher:
+    """AES-GCM на cryptography: один объект AESGCM переиспользуется для всех вызовов"""
+    name = 'cryptography'
+
+    def __init__(self, key):
+        self.key = key
+        self._aead = AESGCM(key)
+
+    def encrypt(self, nonce, plaintext):
+        sealed = self._aead.encrypt(nonce, plaintext, None)
+        return sealed[:-TAG_SIZE], sealed[-TAG_SIZE:]
+
+    def decrypt(self, nonce, ciphertext, tag):
+        return self._aead.decrypt(nonce, ciphertext + tag, None)
+
+
+def make_cipher(key, backend='auto'):
+    if backend == 'cryptography' or (backend == 'auto' and AESGCM is not None):
+        if AESGCM is None:
+            raise ImproperlyConfigured("ENCRYPTION_BACKEND=cryptography requires the cryptography package")
+        return CryptographyCipher(key)
+    return PycryptodomeCipher(key)
+
+
+class Keyring:
+    """
+    Ключи шифрования по версиям. Новые данные шифруются текущим ключом,
+    расшифровываются ключом той версии, которой были зашифрованы.
+    """
+
+    def __init__(self, keys, current_version, backend='auto'):
+        if current_version not in keys:
+            raise ImproperlyConfigured(f"Encryption key version {current_version} is not configured")
+        # Версия хранится в первом байте конверта и не должна совпадать с '{' старого формата
+        invalid = [version for version in keys if not 0 < version < LEGACY_PREFIX[0]]
+        if invalid:
+            raise ImproperlyConfigured(f"Encryption key versions must be between 1 and {LEGACY_PREFIX[0] - 1}: {invalid}")
+        self.current_version = current_version
+        self._ciphers = {
+            version: make_cipher(normalize_key(key), backend)
+            for version, key in keys.items()
+        }
+
+    @property
+    def versions(self):
+        return sorted(self._ciphers)
+
+    def cipher(self, version=None):
+        try:
+            return self._ciphers[self.current_version if version is None else version]
+        except KeyError:
+            raise ValueError(f"Unknown encryption key version: {version}")
+
+    @classmethod
+    def from_settings(cls):
+        keys = dict(settings.ENCRYPTION_PREVIOUS_KEYS)
+        keys[settings.ENCRYPTION_KEY_VERSION] = settings.ENCRYPTION_KEY
+        return cls(keys, settings.ENCRYPTION_KEY_VERSION, settings.ENCRYPTION_BACKEND)
+
+
+_keyring = None
+_keyring_lock = threading.Lock()
+
+
+def get_keyring():
+    """Общий для процесса набор ключей: ключи хешируются и шифры создаются один раз"""
+    global _keyring
+    if _keyring is None:
+        with _keyring_lock:
+            if _keyring is None:
+                _keyring = Keyring.from_settings()
+    return _keyring
 
 
 class EncryptionService:
     """
     Сервис для шифрования/дешифрования критических данных
     """
-    
-    def __init__(self, master_key=None):
-        if master_key is None:
-            master_key = settings.ENCRYPTION_KEY
-        
-        # Нормализуем ключ до 32 байт
-        self.master_key = self._normalize_key(master_key)
-
-    def _normalize_key(self, key_str):
-        """Приводим ключ к 32 байтам (256 бит) для AES-256"""
-        if isinstance(key_str, bytes):
-            key_bytes = key_str
-        else:
-            key_bytes = key_str.encode('utf-8')
-        
-        # Используем SHA256 для получения 32 байт
-        if len(key_bytes) != 32:
-            key_bytes = hashlib.sha256(key_bytes).digest()
-        
-        # Если все еще не 32 байта, дополняем
-        if len(key_bytes) < 32:
-            key_bytes = key_bytes.ljust(32, b'\0')
-        elif len(key_bytes) > 32:
-            key_bytes = key_bytes[:32]
-            
-        return key_bytes
+
+    def __init__(self, master_key=None, keyring=None):
+        if keyring is None:
+            if master_key is None:
+                keyring = get_keyring()
+            else:
+                keyring = Keyring({1: master_key}, 1)
+
+        self.keyring = keyring
+        self.key_version = keyring.current_version
+        self.master_key = keyring.cipher().key
 
     def encrypt_data(self, plaintext: str) -> dict:
         """Шифрует данные с использованием AES-256-GCM"""
         # Генерируем случайный nonce (96 бит для GCM)
-        nonce = get_random_bytes(12)
-
-        # Создаем cipher
-        cipher = AES.new(self.master_key, AES.MODE_GCM, nonce=nonce)
+        nonce = get_random_bytes(NONCE_SIZE)
 
-        # Шифруем данные
-        ciphertext, tag = cipher.encrypt_and_digest(plaintext.encode('utf-8'))
+        ciphertext, tag = self.keyring.cipher().encrypt(nonce, plaintext.encode('utf-8'))
 
         # Возвращаем все компоненты для хранения
         return {
             'nonce': base64.urlsafe_b64encode(nonce).decode('utf-8'),
             'ciphertext': base64.urlsafe_b64encode(ciphertext).decode('utf-8'),
             'tag': base64.urlsafe_b64encode(tag).decode('utf-8'),
-            'version': 1
+            'version': self.key_version
         }
 
     def decrypt_data(self, encrypted_data: dict) -> str:
@@ -64,13 +168,37 @@ class EncryptionService:
         ciphertext = base64.urlsafe_b64decode(encrypted_data['ciphertext'])
         tag = base64.urlsafe_b64decode(encrypted_data['tag'])
 
-        cipher = AES.new(self.master_key, AES.MODE_GCM, nonce=nonce)
-        plaintext = cipher.decrypt_and_verify(ciphertext, tag)
+        cipher = self.keyring.cipher(encrypted_data.get('version', 1))
+        return cipher.decrypt(nonce, ciphertext, tag).decode('utf-8')
+
+    def encrypt_field(self, plaintext) -> bytes:
+        """Шифрует значение в двоичный конверт для хранения в BYTEA"""
+        if isinstance(plaintext, str):
+            plaintext = plaintext.encode('utf-8')
+
+        nonce = get_random_bytes(NONCE_SIZE)
+        ciphertext, tag = self.keyring.cipher().encrypt(nonce, plaintext)
 
-        return plaintext.decode('utf-8')
+        return bytes([self.key_version]) + nonce + ciphertext + tag
+
+    def decrypt_field(self, envelope: bytes) -> bytes:
+        """Дешифрует двоичный конверт ключом указанной в нем версии"""
+        if len(envelope) < 1 + NONCE_SIZE + TAG_SIZE:
+            raise ValueError("Encrypted envelope is too short")
+
+        nonce = envelope[1:1 + NONCE_SIZE]
+        ciphertext = envelope[1 + NONCE_SIZE:-TAG_SIZE]
+        tag = envelope[-TAG_SIZE:]
+
+        return self.keyring.cipher(envelope[0]).decrypt(nonce, ciphertext, tag)
+
+    @staticmethod
+    def is_legacy(value: bytes) -> bool:
+        """True для значения в старом JSON-формате"""
+        return value[:1] == LEGACY_PREFIX
 
     @staticmethod
     def generate_master_key() -> str:
         """Генерирует мастер-ключ для шифрования"""
         key = base64.urlsafe_b64encode(os.urandom(32)).decode('utf-8')
-        return key
\ No newline at end of file
+        return key
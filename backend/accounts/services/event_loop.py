@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import os
+import threading
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_loop = None
+_loop_pid = None
+_lock = threading.Lock()
+
+
+def _start_loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name='telegram-event-loop', daemon=True)
+    thread.start()
+    logger.info(f"Started persistent Telegram event loop in process {os.getpid()}")
+    return loop
+
+
+def get_telegram_loop():
+    """
+    Постоянный event loop процесса для работы с Telegram.
+    Живет в отдельном потоке, поэтому подключенные клиенты переживают
+    отдельные вызовы и задачи. После fork (prefork-воркер Celery) создается заново.
+    """
+    global _loop, _loop_pid
+    if _loop is None or _loop_pid != os.getpid():
+        with _lock:
+            if _loop is None or _loop_pid != os.getpid():
+                _loop = _start_loop()
+                _loop_pid = os.getpid()
+    return _loop
+
+
+def set_telegram_loop(loop):
+    """Назначает постоянным loop, которым управляет сам процесс (asyncio-воркер)"""
+    global _loop, _loop_pid
+    with _lock:
+        _loop = loop
+        _loop_pid = os.getpid()
+
+
+def is_telegram_loop():
+    """True, если код выполняется на постоянном event loop процесса"""
+    try:
+        return asyncio.get_running_loop() is _loop and _loop_pid == os.getpid()
+    except RuntimeError:
+        return False
+
+
+async def _run_and_cleanup(coro):
+    try:
+        return await coro
+    finally:
+        await sync_to_async(close_old_connections)()
+
+
+def run_on_telegram_loop(coro, timeout=None):
+    """Выполняет корутину на постоянном event loop и блокирует вызывающий поток до результата"""
+    future = asyncio.run_coroutine_threadsafe(_run_and_cleanup(coro), get_telegram_loop())
+    return future.result(timeout)
@@ -0,0 +1,85 @@
+import logging
+from collections import defaultdict
+from itertools import zip_longest
+
+from django.db.models import Avg, Count, Max
+
+from ..models import SecurityCheck, TaskQueueItem, TelegramAccount
+
+logger = logging.getLogger(__name__)
+
+
+def plan_fleet_lanes(accounts, lanes, chunk_size):
+    """
+    Раскладывает аккаунты (пары (id, proxy_id)) по lanes линиям, линию режет на части по chunk_size.
+    Все аккаунты одного прокси попадают в одну линию, поэтому лимит одновременных проверок
+    через прокси не умножается на число линий; прокси распределяются по линиям
+    от больших к меньшим в наименее загруженную, внутри линии аккаунты прокси чередуются.
+    """
+    by_proxy = defaultdict(list)
+    for account_id, proxy_id in accounts:
+        by_proxy[proxy_id].append(account_id)
+    if not by_proxy:
+        return []
+
+    lane_count = max(1, min(lanes, len(by_proxy)))
+    groups = [[] for _ in range(lane_count)]
+    sizes = [0] * lane_count
+    for ids in sorted(by_proxy.values(), key=len, reverse=True):
+        lane = sizes.index(min(sizes))
+        groups[lane].append(ids)
+        sizes[lane] += len(ids)
+
+    plan = []
+    for lane_groups in groups:
+        ids = [account_id for batch in zip_longest(*lane_groups) for account_id in batch if account_id is not None]
+        plan.append([ids[start:start + chunk_size] for start in range(0, len(ids), chunk_size)])
+    return plan
+
+
+def build_fleet_summary(task, lane_results=()):
+    """Сводка здоровья парка после групповой проверки: исходы, время, прокси с ошибками, угрозы"""
+    items = TaskQueueItem.objects.using('telegram_db').filter(task_id=task.id)
+    outcomes = {
+        row['status']: row['count']
+        for row in items.values('status').order_by().annotate(count=Count('id'))
+    }
+    timing = items.aggregate(avg_ms=Avg('duration_ms'), max_ms=Max('duration_ms'))
+    checked = sum(outcomes.values())
+
+    failing_proxies = list(
+        items.filter(status='error')
+        .values('account__proxy_id', 'account__proxy__name')
+        .order_by()
+        .annotate(errors=Count('id'))
+        .order_by('-errors')[:10]
+    )
+
+    accounts_by_status = {
+        row['account_status']: row['count']
+        for row in TelegramAccount.objects.using('telegram_db')
+        .values('account_status').order_by().annotate(count=Count('id'))
+    }
+    security_alerts = SecurityCheck.objects.using('telegram_db').filter(
+        is_latest=True, has_security_alert=True
+    ).count()
+
+    return {
+        'total': len(task.account_ids),
+        'done': checked,
+        **outcomes,
+        'completed': checked - outcomes.get('error', 0),
+        'unchecked': len(task.account_ids) - checked,
+        'deferred': (task.parameters or {}).get('deferred', 0),
+        'lanes': len(lane_results),
+        'avg_duration_ms': round(timing['avg_ms']) if timing['avg_ms'] is not None else None,
+        'max_duration_ms': timing['max_ms'],
+        'failing_proxies': [
+            {'proxy_id': row['account__proxy_id'], 'name': row['account__proxy__name'], 'errors': row['errors']}
+            for row in failing_proxies
+        ],
+        'fleet': {
+            'accounts_by_status': accounts_by_status,
+            'security_alerts': security_alerts,
+        },
+    }
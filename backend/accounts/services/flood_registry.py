@@ -0,0 +1,117 @@
+import logging
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+ACCOUNTS_KEY = 'tg:flood:accounts'
+EGRESS_KEY = 'tg:flood:egress'
+DIRECT_EGRESS = 'direct'
+
+
+def _egress_member(proxy_id):
+    return str(proxy_id) if proxy_id else DIRECT_EGRESS
+
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc) if timestamp else None
+
+
+class FloodRegistry:
+    """
+    Реестр аккаунтов и прокси, "припаркованных" после FloodWait.
+    Для каждого хранится момент, раньше которого к нему нельзя обращаться
+    (sorted set в Redis: member - id, score - unix time "not before").
+    """
+
+    def __init__(self, client=None):
+        self.redis = client or get_redis()
+
+    def park_account(self, account_id, seconds):
+        not_before = time.time() + seconds
+        self.redis.zadd(ACCOUNTS_KEY, {str(account_id): not_before}, gt=True)
+        logger.info(f"Account {account_id} parked for {seconds} seconds")
+        return not_before
+
+    def park_egress(self, proxy_id, seconds):
+        not_before = time.time() + seconds
+        self.redis.zadd(EGRESS_KEY, {_egress_member(proxy_id): not_before}, gt=True)
+        logger.info(f"Egress {_egress_member(proxy_id)} parked for {seconds} seconds")
+        return not_before
+
+    def account_not_before(self, account_id):
+        score = self.redis.zscore(ACCOUNTS_KEY, str(account_id))
+        return score if score and score > time.time() else None
+
+    def egress_not_before(self, proxy_id):
+        score = self.redis.zscore(EGRESS_KEY, _egress_member(proxy_id))
+        return score if score and score > time.time() else None
+
+    def partition(self, accounts):
+        """
+        Делит аккаунты на готовые к проверке и припаркованные за один запрос к Redis.
+        accounts - итерируемое из объектов с полями id и proxy_id (или пар (id, proxy_id)).
+        Возвращает (ready_ids, {account_id: not_before}).
+        """
+        pairs = [
+            (item.id, item.proxy_id) if hasattr(item, 'id') else tuple(item)
+            for item in accounts
+        ]
+        if not pairs:
+            return [], {}
+
+        current = time.time()
+        egress_members = sorted({_egress_member(proxy_id) for _, proxy_id in pairs})
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zremrangebyscore(ACCOUNTS_KEY, '-inf', current)
+        pipe.zremrangebyscore(EGRESS_KEY, '-inf', current)
+        pipe.zmscore(ACCOUNTS_KEY, [str(account_id) for account_id, _ in pairs])
+        pipe.zmscore(EGRESS_KEY, egress_members)
+        _, _, account_scores, egress_scores = pipe.execute()
+
+        egress_parked = dict(zip(egress_members, egress_scores))
+        ready, parked = [], {}
+        for (account_id, proxy_id), account_score in zip(pairs, account_scores):
+            not_before = max(account_score or 0, egress_parked.get(_egress_member(proxy_id)) or 0)
+            if not_before > current:
+                parked[account_id] = not_before
+            else:
+                ready.append(account_id)
+        return ready, parked
+
+    def parked_capacity(self, total_accounts=None):
+        """Сводка по припаркованной части парка аккаунтов"""
+        current = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zcount(ACCOUNTS_KEY, f'({current}', '+inf')
+        pipe.zrangebyscore(EGRESS_KEY, f'({current}', '+inf', withscores=True)
+        pipe.zrangebyscore(ACCOUNTS_KEY, f'({current}', '+inf', start=0, num=1, withscores=True)
+        parked_accounts, parked_egress, next_release = pipe.execute()
+
+        summary = {
+            'parked_accounts': parked_accounts,
+            'parked_egress': [
+                {'egress': member, 'not_before': _to_datetime(score)}
+                for member, score in parked_egress
+            ],
+            'next_account_release': _to_datetime(next_release[0][1]) if next_release else None,
+        }
+        if total_accounts is not None:
+            summary['total_accounts'] = total_accounts
+            summary['parked_ratio'] = round(parked_accounts / total_accounts, 4) if total_accounts else 0.0
+        return summary
+
+
+def park_after_flood(account_id, proxy_id, seconds):
+    """Паркует аккаунт на время FloodWait и ненадолго притормаживает его исходящий IP"""
+    try:
+        registry = FloodRegistry()
+        registry.park_account(account_id, seconds)
+        registry.park_egress(proxy_id, min(seconds, settings.TELEGRAM_FLOOD_EGRESS_COOLDOWN))
+    except Exception as e:
+        logger.error(f"Failed to park account {account_id} after FloodWait: {e}")
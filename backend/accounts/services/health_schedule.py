@@ -0,0 +1,97 @@
+import logging
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils.timezone import now
+
+from ..models import TelegramAccount
+from .flood_registry import FloodRegistry
+
+logger = logging.getLogger(__name__)
+
+# Пачка берется с запасом, чтобы накопившиеся просроченные проверки рассасывались
+CATCH_UP_FACTOR = 1.5
+# Разброс следующей проверки, чтобы проверки не собирались обратно в одно окно
+JITTER = 0.1
+# Пороги health_indicator: yellow - нет активности дольше суток, red - дольше недели
+YELLOW_AFTER = timedelta(days=1)
+RED_AFTER = timedelta(days=7)
+
+
+def check_interval():
+    return timedelta(hours=settings.HEALTH_CHECK_INTERVAL_HOURS)
+
+
+def next_check_time(current, interval=None):
+    interval = interval or check_interval()
+    return current + interval * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+def after_flood_wait(not_before):
+    """Проверка припаркованного аккаунта - в течение 10 минут после окончания FloodWait"""
+    return datetime.fromtimestamp(not_before, tz=timezone.utc) + timedelta(seconds=random.uniform(0, 600))
+
+
+def batch_size(active_count):
+    """Сколько аккаунтов проверять за минуту, чтобы весь парк проходил за интервал"""
+    minutes = check_interval().total_seconds() / 60
+    return min(settings.HEALTH_CHECK_MAX_BATCH, max(1, math.ceil(active_count * CATCH_UP_FACTOR / minutes)))
+
+
+def check_risk(current):
+    """
+    Очередность проверки по риску: dead/flood, затем без активности (gray),
+    red и yellow по health_indicator; здоровые (green) последними
+    """
+    return Case(
+        When(~Q(activity_status='active'), then=Value(0)),
+        When(last_ping__isnull=True, then=Value(1)),
+        When(last_ping__lt=current - RED_AFTER, then=Value(2)),
+        When(last_ping__lt=current - YELLOW_AFTER, then=Value(3)),
+        default=Value(4),
+        output_field=IntegerField(),
+    )
+
+
+def claim_due_accounts(limit, current=None):
+    """
+    Забирает до limit активных аккаунтов с наступившим next_check_at. Первыми идут
+    самые рискованные (check_risk), внутри группы - дольше всех без активности,
+    затем самые просроченные: next_check_at после проверки ставится с разбросом
+    и по нему одному нельзя судить о состоянии аккаунта.
+    Забранным сразу назначается следующая проверка через интервал, поэтому пересекающиеся
+    запуски планировщика не берут их повторно. Припаркованные после FloodWait аккаунты
+    переносятся на окончание ожидания. Возвращает список пар (id, proxy_id) для проверки.
+    """
+    current = current or now()
+    with transaction.atomic(using='telegram_db'):
+        due = list(
+            TelegramAccount.objects.using('telegram_db')
+            .select_for_update(skip_locked=True)
+            .filter(account_status='active', next_check_at__lte=current)
+            .annotate(check_risk=check_risk(current))
+            .order_by('check_risk', F('last_ping').asc(nulls_first=True), 'next_check_at')
+            .values_list('id', 'proxy_id')[:limit]
+        )
+        if not due:
+            return []
+
+        ready_ids, parked = FloodRegistry().partition(due)
+        ready = set(ready_ids)
+        rescheduled = [
+            TelegramAccount(
+                id=account_id,
+                next_check_at=next_check_time(current) if account_id in ready else after_flood_wait(parked[account_id])
+            )
+            for account_id, _ in due
+        ]
+        # bulk_update не трогает updated_at: перенос проверки не меняет данные аккаунта
+        TelegramAccount.objects.using('telegram_db').bulk_update(rescheduled, ['next_check_at'], batch_size=500)
+
+    if parked:
+        logger.info(f"Health check: {len(parked)} due accounts deferred until FloodWait expires")
+    return [(account_id, proxy_id) for account_id, proxy_id in due if account_id in ready]
@@ -0,0 +1,67 @@
+import json
+import logging
+import uuid
+
+import redis.asyncio as aioredis
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+JOBS_KEY = 'tg:worker:jobs'
+PROCESSING_KEY_PREFIX = 'tg:worker:processing'
+
+
+def enqueue_job(job_type, **payload):
+    """Ставит задание в очередь asyncio-воркера и возвращает его id"""
+    job_id = uuid.uuid4().hex
+    get_redis().lpush(JOBS_KEY, json.dumps({'id': job_id, 'type': job_type, **payload}))
+    logger.info(f"Enqueued {job_type} job {job_id} for Telegram worker")
+    return job_id
+
+
+class AsyncJobQueue:
+    """
+    Очередь заданий воркера на списках Redis.
+    Взятое задание атомарно переносится в список "в работе" конкретного воркера
+    и удаляется оттуда после выполнения, поэтому при падении воркера
+    задания не теряются и возвращаются в очередь при его перезапуске.
+    """
+
+    def __init__(self, worker_name, max_connections=20):
+        # Сотни одновременных подтверждений ждут свободное соединение, а не открывают новые
+        pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL, max_connections=max_connections, decode_responses=True
+        )
+        self.redis = aioredis.Redis(connection_pool=pool)
+        self.processing_key = f'{PROCESSING_KEY_PREFIX}:{worker_name}'
+
+    async def requeue_unfinished(self):
+        count = 0
+        while await self.redis.lmove(self.processing_key, JOBS_KEY, 'RIGHT', 'RIGHT'):
+            count += 1
+        if count:
+            logger.warning(f"Requeued {count} unfinished jobs from {self.processing_key}")
+        return count
+
+    async def fetch(self, timeout=1):
+        """Следующее задание (raw, job) или None, если очередь пуста дольше timeout секунд"""
+        raw = await self.redis.blmove(JOBS_KEY, self.processing_key, timeout, 'RIGHT', 'LEFT')
+        if raw is None:
+            return None
+        try:
+            return raw, json.loads(raw)
+        except ValueError:
+            logger.error(f"Dropping malformed worker job: {raw!r}")
+            await self.ack(raw)
+            return None
+
+    async def ack(self, raw):
+        try:
+            await self.redis.lrem(self.processing_key, 1, raw)
+        except Exception as e:
+            logger.error(f"Failed to acknowledge worker job: {e}")
+
+    async def close(self):
+        await self.redis.aclose()
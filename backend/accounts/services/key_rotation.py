@@ -0,0 +1,85 @@
+import json
+import logging
+import time
+
+from .redis_client import get_redis
+from .session_manager import SessionManager
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_KEY_PREFIX = 'tg:crypto:rotation'
+
+
+class KeyRotation:
+    """
+    Перешифровка всех аккаунтов текущим ключом без остановки сервиса.
+    Аккаунты обрабатываются пачками по id, каждая пачка - короткая транзакция;
+    строки, занятые проверками, пропускаются и добираются следующим проходом.
+    Позиция сохраняется в Redis, прерванная ротация продолжается с нее.
+    """
+
+    def __init__(self, batch_size=200, rows_per_second=None, session_manager=None, redis_client=None):
+        self.batch_size = batch_size
+        self.rows_per_second = rows_per_second
+        self.session_manager = session_manager or SessionManager()
+        self.redis = redis_client or get_redis()
+        self.key_version = self.session_manager.encryptor.key_version
+        self.checkpoint_key = f'{CHECKPOINT_KEY_PREFIX}:{self.key_version}'
+
+    def missing_key_versions(self):
+        """Версии ключей, которыми зашифрованы аккаунты, но которых нет в ENCRYPTION_PREVIOUS_KEYS"""
+        available = set(self.session_manager.encryptor.keyring.versions)
+        return sorted(self.session_manager.encryption_versions_in_use() - available)
+
+    def load_checkpoint(self):
+        raw = self.redis.get(self.checkpoint_key)
+        if raw:
+            return json.loads(raw)
+        return {'last_id': 0, 'rotated': 0, 'passes': 0}
+
+    def save_checkpoint(self, checkpoint):
+        self.redis.set(self.checkpoint_key, json.dumps(checkpoint))
+
+    def reset_checkpoint(self):
+        self.redis.delete(self.checkpoint_key)
+
+    def run(self, on_batch=None):
+        """Перешифровывает аккаунты до конца и возвращает итоговый checkpoint"""
+        checkpoint = self.load_checkpoint()
+        pass_rotated = 0
+
+        while True:
+            started = time.monotonic()
+            last_id, rotated = self.session_manager.reencrypt_batch(
+                checkpoint['last_id'], self.batch_size, skip_locked=True
+            )
+
+            if last_id is None:
+                checkpoint['passes'] += 1
+                # Повторный проход нужен только за строками, пропущенными из-за блокировок
+                if pass_rotated == 0 or self.session_manager.count_stale_encryption() == 0:
+                    checkpoint['last_id'] = 0
+                    checkpoint['completed'] = True
+                    self.save_checkpoint(checkpoint)
+                    return checkpoint
+                checkpoint['last_id'] = 0
+                pass_rotated = 0
+                self.save_checkpoint(checkpoint)
+                continue
+
+            checkpoint['last_id'] = last_id
+            checkpoint['rotated'] += rotated
+            pass_rotated += rotated
+            self.save_checkpoint(checkpoint)
+
+            if on_batch:
+                on_batch(checkpoint, rotated)
+            self._throttle(rotated, time.monotonic() - started)
+
+    def _throttle(self, rows, elapsed):
+        """Держит скорость не выше rows_per_second, чтобы не отнимать БД у проверок"""
+        if not self.rows_per_second or not rows:
+            return
+        delay = rows / self.rows_per_second - elapsed
+        if delay > 0:
+            time.sleep(delay)
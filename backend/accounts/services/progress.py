@@ -0,0 +1,156 @@
+import logging
+import time
+from collections import Counter
+
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from ..models import TaskQueueItem
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_KEY_PREFIX = 'tg:task:progress'
+PROGRESS_KEY_TTL = 7 * 24 * 3600
+
+
+# Аккаунт, получивший FloodWait при проверке, паркуется до окончания ожидания
+OUTCOME_ALIASES = {'flood': 'parked'}
+
+
+def item_outcome(item):
+    """Исход проверки одного аккаунта: success, error, parked (в том числе FloodWait во время проверки)"""
+    if 'error' in item:
+        return 'error'
+    status = item['result'].get('status') or 'success'
+    return OUTCOME_ALIASES.get(status, status)
+
+
+def build_item(task_id, item):
+    started_at, finished_at = item.get('started_at'), item.get('finished_at')
+    return TaskQueueItem(
+        task_id=task_id,
+        account_id=item['account_id'],
+        status=item_outcome(item),
+        outcome={'error': item['error']} if 'error' in item else item['result'],
+        started_at=started_at,
+        finished_at=finished_at,
+        duration_ms=int((finished_at - started_at).total_seconds() * 1000) if started_at and finished_at else None
+    )
+
+
+class ProgressTracker:
+    """
+    Прогресс групповой задачи. Исходы по аккаунтам копятся счетчиками в Redis-хеше
+    tg:task:progress:{id} (виден другим процессам и переживает рестарт воркера).
+    Не чаще раза в flush_interval секунд или flush_items аккаунтов накопленные
+    результаты пачкой пишутся в task_queue_items, а в строке TaskQueue
+    обновляются только progress, result и updated_at.
+    С shared=True задачу обрабатывают несколько воркеров сразу (линии ежедневной
+    проверки), и progress/result считаются по общему хешу в Redis, а не по своей части.
+    """
+
+    def __init__(self, task, total, flush_interval=None, flush_items=None, redis_client=None, shared=False):
+        self.task = task
+        self.total = total
+        self.shared = shared
+        self.flush_interval = flush_interval if flush_interval is not None else settings.TASK_PROGRESS_FLUSH_INTERVAL
+        self.flush_items = flush_items if flush_items is not None else settings.TASK_PROGRESS_FLUSH_ITEMS
+        self.key = f'{PROGRESS_KEY_PREFIX}:{task.id}'
+        self.counters = Counter()
+        self.done = 0
+        self._pending = []
+        self.flushes = 0
+        self._flushed_done = 0
+        self._flushed_at = time.monotonic()
+        self._flushing = False
+        self._redis = redis_client
+        self._owns_redis = redis_client is None
+
+    def restore(self, counters):
+        """Продолжение задачи после перезапуска: исходы уже проверенных аккаунтов"""
+        self.counters.update(counters)
+        self.done = self._flushed_done = sum(counters.values())
+
+    def _get_redis(self):
+        if self._redis is None:
+            # Параллельные проверки ждут свободное соединение, а не открывают новые
+            pool = aioredis.BlockingConnectionPool.from_url(
+                settings.REDIS_URL, max_connections=10, decode_responses=True
+            )
+            self._redis = aioredis.Redis(connection_pool=pool)
+        return self._redis
+
+    async def record(self, item):
+        outcome = item_outcome(item)
+        self._pending.append(build_item(self.task.id, item))
+        self.done += 1
+        self.counters[outcome] += 1
+
+        try:
+            pipe = self._get_redis().pipeline(transaction=False)
+            pipe.hincrby(self.key, 'done', 1)
+            pipe.hincrby(self.key, outcome, 1)
+            pipe.expire(self.key, PROGRESS_KEY_TTL)
+            await pipe.execute()
+        except Exception as e:
+            # Счетчики в памяти остаются точными, Redis нужен только для наблюдения со стороны
+            logger.warning(f"Could not update progress counters for task {self.task.id}: {e}")
+
+        if (
+            self.done - self._flushed_done >= self.flush_items
+            or time.monotonic() - self._flushed_at >= self.flush_interval
+        ):
+            try:
+                await self.flush()
+            except Exception as e:
+                # Результаты остаются в буфере, их запишет следующий сброс
+                logger.warning(f"Could not flush progress for task {self.task.id}: {e}")
+
+    def snapshot(self):
+        return {'total': self.total, 'done': self.done, **self.counters}
+
+    async def shared_snapshot(self):
+        """Счетчики всех воркеров задачи из Redis; при недоступности Redis - только свои"""
+        try:
+            counters = await self._get_redis().hgetall(self.key)
+        except Exception as e:
+            logger.warning(f"Could not read progress counters for task {self.task.id}: {e}")
+            return self.snapshot()
+        return {'total': self.total, **{field: int(value) for field, value in counters.items()}}
+
+    async def flush(self):
+        # Результаты приходят из параллельных проверок, одновременно идет только один сброс
+        if self._flushing or self.done == self._flushed_done:
+            return
+        self._flushing = True
+        try:
+            await self._write()
+        finally:
+            self._flushing = False
+
+    async def _write(self):
+        done = self.done
+        # Результаты снимаются с буфера только после записи: при ошибке БД их запишет следующий сброс,
+        # а пришедшие во время записи остаются в буфере
+        items = list(self._pending)
+        snapshot = await self.shared_snapshot() if self.shared else self.snapshot()
+        self.task.progress = min(100, int((snapshot.get('done', 0) / self.total) * 100)) if self.total else 100
+        self.task.result = snapshot
+        await sync_to_async(self._persist)(items)
+        del self._pending[:len(items)]
+        self.flushes += 1
+        self._flushed_done = done
+        self._flushed_at = time.monotonic()
+
+    def _persist(self, items):
+        with transaction.atomic(using='telegram_db'):
+            TaskQueueItem.objects.using('telegram_db').bulk_create(items, batch_size=1000)
+            self.task.save(update_fields=['progress', 'result', 'updated_at'])
+
+    async def close(self):
+        if self._redis is not None and self._owns_redis:
+            await self._redis.aclose()
+            self._redis = None
+
@@ -0,0 +1,109 @@
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .redis_client import get_redis
+from .cancellation import cancellable_sleep
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'tg:ratelimit'
+
+# Token bucket с резервированием: токен списывается сразу (баланс может уйти
+# в минус), а скрипт возвращает, сколько секунд нужно подождать до
+# подключения. Так воркеры не опрашивают Redis в цикле и обслуживаются по очереди.
+# KEYS - бакеты, ARGV - пары (rate, capacity) для каждого бакета.
+TOKEN_BUCKET_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2 - 1])
+    local capacity = tonumber(ARGV[i * 2])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate) - 1
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil((capacity - tokens) / rate) + 60)
+    if tokens < 0 then
+        wait = math.max(wait, -tokens / rate)
+    end
+end
+return tostring(wait)
+"""
+
+
+def egress_bucket(proxy_id):
+    """Бакет исходящего IP: прокси-сервер или прямое подключение"""
+    return f'{KEY_PREFIX}:egress:{proxy_id}' if proxy_id else f'{KEY_PREFIX}:egress:direct'
+
+
+def api_bucket(api_id):
+    """Бакет приложения Telegram (GlobalAppSettings.api_id)"""
+    return f'{KEY_PREFIX}:api:{api_id}'
+
+
+class RateLimiter:
+    """
+    Распределенный ограничитель частоты подключений к Telegram.
+    Состояние хранится в Redis, поэтому лимит общий для всех воркеров Celery.
+    """
+
+    def __init__(self, egress_rate=None, egress_burst=None, api_rate=None, api_burst=None):
+        self.egress_rate = float(egress_rate or settings.TELEGRAM_EGRESS_RATE)
+        self.egress_burst = float(egress_burst or settings.TELEGRAM_EGRESS_BURST)
+        self.api_rate = float(api_rate or settings.TELEGRAM_API_ID_RATE)
+        self.api_burst = float(api_burst or settings.TELEGRAM_API_ID_BURST)
+        self._script = None
+
+    def reserve(self, proxy_id=None, api_id=None):
+        """Резервирует токен и возвращает время ожидания в секундах"""
+        keys = [egress_bucket(proxy_id)]
+        args = [self.egress_rate, self.egress_burst]
+        if api_id:
+            keys.append(api_bucket(api_id))
+            args.extend([self.api_rate, self.api_burst])
+
+        try:
+            if self._script is None:
+                self._script = get_redis().register_script(TOKEN_BUCKET_SCRIPT)
+            return float(self._script(keys=keys, args=args))
+        except Exception as e:
+            # Без Redis выдерживаем минимальный интервал в пределах процесса
+            logger.warning(f"Rate limiter unavailable, falling back to local delay: {e}")
+            return 1.0 / self.egress_rate
+
+    def acquire(self, proxy_id=None, api_id=None):
+        """Блокирует поток, пока не будет получен токен на подключение"""
+        wait = self.reserve(proxy_id, api_id)
+        if wait > 0:
+            logger.info(f"Rate limit: waiting {wait:.2f} seconds before connect (proxy={proxy_id or 'direct'}, api_id={api_id})")
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, proxy_id=None, api_id=None):
+        """Асинхронная версия acquire, не блокирует event loop"""
+        wait = await sync_to_async(self.reserve, thread_sensitive=False)(proxy_id, api_id)
+        if wait > 0:
+            logger.info(f"Rate limit: waiting {wait:.2f} seconds before connect (proxy={proxy_id or 'direct'}, api_id={api_id})")
+            # Ожидание внутри групповой задачи прерывается ее отменой
+            await cancellable_sleep(wait)
+        return wait
+
+
+_default_limiter = None
+
+
+def get_rate_limiter():
+    global _default_limiter
+    if _default_limiter is None:
+        _default_limiter = RateLimiter()
+    return _default_limiter
+
+
+async def acquire_connect_slot(proxy_id=None, api_id=None):
+    """Получает токен на подключение к Telegram для прокси и api_id"""
+    return await get_rate_limiter().acquire_async(proxy_id, api_id)
@@ -0,0 +1,59 @@
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'tg:cache:response'
+GENERATION_KEY = 'tg:cache:generation'
+
+
+def bump_generation():
+    """
+    Сдвигает поколение кеша ответов: все закешированные списки становятся недействительными
+    (старые ключи просто истекают по TTL). Вызывается после изменения аккаунтов, прокси и проверок.
+    """
+    try:
+        get_redis().incr(GENERATION_KEY)
+    except Exception as e:
+        logger.warning(f"Could not invalidate response cache: {e}")
+
+
+def cache_key(request, generation):
+    params = sorted(request.query_params.lists())
+    digest = hashlib.sha1(json.dumps([request.path, params]).encode('utf-8')).hexdigest()
+    return f'{CACHE_KEY_PREFIX}:{generation}:{digest}'
+
+
+def make_etag(body):
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def lookup(request):
+    """
+    Закешированный ответ для запроса: (key, {'etag', 'body'} или None).
+    key равен None, если Redis недоступен, - тогда ответ не кешируется.
+    """
+    try:
+        redis = get_redis()
+        key = cache_key(request, redis.get(GENERATION_KEY) or 0)
+        raw = redis.get(key)
+    except Exception as e:
+        logger.warning(f"Response cache unavailable: {e}")
+        return None, None
+    return key, json.loads(raw) if raw else None
+
+
+def store(key, etag, body):
+    try:
+        get_redis().set(
+            key,
+            json.dumps({'etag': etag, 'body': body.decode('utf-8')}),
+            ex=settings.RESPONSE_CACHE_TTL
+        )
+    except Exception as e:
+        logger.warning(f"Could not store cached response: {e}")
@@ -7,10 +7,23 @@ from datetime import datetime
 from django.db import connections, transaction
 from django.db.utils import DEFAULT_DB_ALIAS
 from .encryption import EncryptionService
+from .response_cache import bump_generation
 from ..models import GlobalAppSettings, ProxyServer
 
 logger = logging.getLogger(__name__)
 
+# Зашифрованные поля аккаунта и их столбцы в telegram_accounts
+ENCRYPTED_COLUMNS = {
+    'api_id': 'encrypted_api_id',
+    'api_hash': 'encrypted_api_hash',
+    'session_data': 'encrypted_session',
+    'recovery_email': 'encrypted_recovery_email',
+    'phone_code_hash': 'encrypted_phone_code_hash',
+}
+SESSION_FIELDS = tuple(ENCRYPTED_COLUMNS)
+# Для проверки аккаунта достаточно сессии и ключей приложения
+CHECK_FIELDS = ('api_id', 'api_hash', 'session_data')
+
 
 class ThreadLocalDBConnection:
     """Хранилище для соединений с базой данных, специфичных для потока"""
@@ -74,30 +87,25 @@ class SessionManager:
             
             logger.info(f"Using global settings: API ID={settings.api_id}")
             
-            encrypted_api_id = self.encryptor.encrypt_data(str(settings.api_id))
-            encrypted_api_hash = self.encryptor.encrypt_data(settings.api_hash)
+            encrypted_api_id = self.encryptor.encrypt_field(str(settings.api_id))
+            encrypted_api_hash = self.encryptor.encrypt_field(settings.api_hash)
             
             if session_data:
-                encrypted_session = self.encryptor.encrypt_data(
-                    base64.urlsafe_b64encode(session_data).decode('utf-8')
-                )
+                # StringSession уже в base64 - шифруем как есть, без повторного кодирования
+                encrypted_session = self.encryptor.encrypt_field(session_data)
                 session_hash = hashlib.sha256(session_data).hexdigest()
                 logger.debug(f"Session hash generated: {session_hash[:20]}...")
             else:
-                encrypted_session = self.encryptor.encrypt_data('')
+                encrypted_session = self.encryptor.encrypt_field(b'')
                 session_hash = ''
             
-            if recovery_email:
-                encrypted_recovery_email = self.encryptor.encrypt_data(recovery_email)
-            else:
-                encrypted_recovery_email = self.encryptor.encrypt_data('')
+            encrypted_recovery_email = self.encryptor.encrypt_field(recovery_email or '')
             
             if phone_code_hash is not None:
-                encrypted_phone_code_hash = self.encryptor.encrypt_data(phone_code_hash)
-                encrypted_phone_code_hash_bytes = json.dumps(encrypted_phone_code_hash).encode('utf-8')
+                encrypted_phone_code_hash = self.encryptor.encrypt_field(phone_code_hash)
                 logger.debug(f"Phone code hash encrypted, length: {len(phone_code_hash)}")
             else:
-                encrypted_phone_code_hash_bytes = None
+                encrypted_phone_code_hash = None
                 logger.debug("No phone code hash to save")
 
             db = self._get_db()
@@ -107,9 +115,9 @@ class SessionManager:
                     phone_number, employee_id, employee_fio, account_note,
                     encrypted_api_id, encrypted_api_hash,
                     encrypted_session, encrypted_recovery_email,
-                    encrypted_phone_code_hash,
+                    encrypted_phone_code_hash, encryption_version,
                     session_hash, session_updated_at, account_status, activity_status
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 ON CONFLICT (phone_number) DO UPDATE SET
                     employee_id = EXCLUDED.employee_id,
                     employee_fio = EXCLUDED.employee_fio,
@@ -119,6 +127,7 @@ class SessionManager:
                     encrypted_session = EXCLUDED.encrypted_session,
                     encrypted_recovery_email = EXCLUDED.encrypted_recovery_email,
                     encrypted_phone_code_hash = EXCLUDED.encrypted_phone_code_hash,
+                    encryption_version = EXCLUDED.encryption_version,
                     session_hash = EXCLUDED.session_hash,
                     session_updated_at = EXCLUDED.session_updated_at,
                     account_status = EXCLUDED.account_status,
@@ -131,17 +140,20 @@ class SessionManager:
                     employee_id,
                     employee_fio,
                     account_note,
-                    json.dumps(encrypted_api_id).encode('utf-8'),
-                    json.dumps(encrypted_api_hash).encode('utf-8'),
-                    json.dumps(encrypted_session).encode('utf-8'),
-                    json.dumps(encrypted_recovery_email).encode('utf-8'),
-                    encrypted_phone_code_hash_bytes,
+                    encrypted_api_id,
+                    encrypted_api_hash,
+                    encrypted_session,
+                    encrypted_recovery_email,
+                    encrypted_phone_code_hash,
+                    self.encryptor.key_version,
                     session_hash,
                     datetime.now(),
                     account_status,
                     'active'
                 ))
 
+            # Сырой SQL не вызывает сигналы моделей, кеш списков сбрасывается явно
+            bump_generation()
             logger.info(f"Account session saved successfully for {phone_number}")
             
             self._log_audit(
@@ -176,12 +188,7 @@ class SessionManager:
                 logger.warning(f"No phone code hash found for {phone_number}")
                 raise ValueError(f"No phone code hash found for {phone_number}")
             
-            encrypted_code_hash_bytes = result[0]
-            if isinstance(encrypted_code_hash_bytes, memoryview):
-                encrypted_code_hash_bytes = encrypted_code_hash_bytes.tobytes()
-            
-            encrypted_code_hash = json.loads(encrypted_code_hash_bytes.decode('utf-8'))
-            phone_code_hash = self.encryptor.decrypt_data(encrypted_code_hash)
+            phone_code_hash = self._decrypt_field('phone_code_hash', result[0])
             logger.debug(f"Retrieved phone code hash: {phone_code_hash[:20]}...")
             return phone_code_hash
             
@@ -219,94 +226,112 @@ class SessionManager:
         """
         logger.info(f"Loading account session for {phone_number}")
         
-        query = """
-        SELECT
-            encrypted_api_id,
-            encrypted_api_hash,
-            encrypted_session,
-            encrypted_recovery_email,
-            encrypted_phone_code_hash,
-            session_hash,
-            is_2fa_enabled,
-            account_status
+        rows = list(self._iter_session_rows('phone_number', [phone_number], SESSION_FIELDS))
+        if not rows:
+            logger.error(f"Account {phone_number} not found in database")
+            raise ValueError(f"Account {phone_number} not found")
+
+        try:
+            return self._decode_session_row(rows[0], SESSION_FIELDS)
+        except Exception as e:
+            logger.error(f"Failed to decrypt data for {phone_number}: {type(e).__name__}: {e}", exc_info=True)
+            raise
+
+    def load_account_sessions(self, account_ids=None, phone_numbers=None, fields=SESSION_FIELDS, chunk_size=500):
+        """
+        Пакетная загрузка данных аккаунтов по id или номерам телефонов.
+        Один запрос на chunk_size аккаунтов, дешифруются только поля из fields.
+        Генератор: в памяти одновременно не больше одной пачки строк.
+        Аккаунт, данные которого не удалось дешифровать, отдается с ключом 'error'.
+        """
+        if (account_ids is None) == (phone_numbers is None):
+            raise ValueError("Pass either account_ids or phone_numbers")
+
+        unknown = set(fields) - set(ENCRYPTED_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown session fields: {', '.join(sorted(unknown))}")
+
+        if account_ids is not None:
+            key_column, keys = 'id', list(account_ids)
+        else:
+            key_column, keys = 'phone_number', list(phone_numbers)
+
+        for start in range(0, len(keys), chunk_size):
+            for row in self._iter_session_rows(key_column, keys[start:start + chunk_size], fields):
+                try:
+                    yield self._decode_session_row(row, fields)
+                except Exception as e:
+                    logger.error(f"Failed to decrypt data for {row[1]}: {type(e).__name__}: {e}")
+                    yield {'id': row[0], 'phone_number': row[1], 'error': str(e)}
+
+    def _iter_session_rows(self, key_column, keys, fields):
+        columns = ''.join(f', {ENCRYPTED_COLUMNS[field]}' for field in fields)
+        query = f"""
+        SELECT id, phone_number, session_hash, is_2fa_enabled, account_status{columns}
         FROM telegram_accounts
-        WHERE phone_number = %s
+        WHERE {key_column} = ANY(%s)
         """
 
         db = self._get_db()
         with db.cursor() as cursor:
-            cursor.execute(query, (phone_number,))
-            result = cursor.fetchone()
+            cursor.execute(query, (keys,))
+            rows = cursor.fetchall()
+        return rows
 
-        if not result:
-            logger.error(f"Account {phone_number} not found in database")
-            raise ValueError(f"Account {phone_number} not found")
+    def _decode_session_row(self, row, fields) -> dict:
+        account_id, phone_number, session_hash, is_2fa_enabled, account_status = row[:5]
+        data = {
+            'id': account_id,
+            'phone_number': phone_number,
+            'session_hash': session_hash,
+            'is_2fa_enabled': is_2fa_enabled,
+            'account_status': account_status
+        }
 
-        try:
-            def to_bytes(data):
-                if isinstance(data, memoryview):
-                    return data.tobytes()
-                elif isinstance(data, bytes):
-                    return data
-                else:
-                    return data
-
-            api_id_encrypted = to_bytes(result[0])
-            api_id = int(self.encryptor.decrypt_data(json.loads(api_id_encrypted.decode('utf-8'))))
-            
-            api_hash_encrypted = to_bytes(result[1])
-            api_hash = self.encryptor.decrypt_data(json.loads(api_hash_encrypted.decode('utf-8')))
-            
-            session_encrypted = to_bytes(result[2])
-            if session_encrypted:
-                session_b64 = self.encryptor.decrypt_data(json.loads(session_encrypted.decode('utf-8')))
-                session_data = base64.urlsafe_b64decode(session_b64)
-                logger.debug(f"Session data loaded, length: {len(session_data)} bytes")
-            else:
-                session_data = None
-                logger.debug("No session data found")
+        for field, value in zip(fields, row[5:]):
+            data[field] = self._decrypt_field(field, value)
 
-            recovery_email_encrypted = to_bytes(result[3])
-            recovery_email = self.encryptor.decrypt_data(json.loads(recovery_email_encrypted.decode('utf-8')))
-            
-            phone_code_hash_encrypted = to_bytes(result[4]) if result[4] else None
-            if phone_code_hash_encrypted:
-                phone_code_hash = self.encryptor.decrypt_data(json.loads(phone_code_hash_encrypted.decode('utf-8')))
-                logger.debug(f"Phone code hash loaded: {phone_code_hash[:20]}...")
-            else:
-                phone_code_hash = None
-                logger.debug("No phone code hash loaded")
-            
-            if session_data:
-                current_hash = hashlib.sha256(session_data).hexdigest()
-                if current_hash != result[5]:
-                    logger.warning(f"Session hash mismatch for {phone_number}. Stored: {result[5][:20]}..., Calculated: {current_hash[:20]}...")
-            else:
-                current_hash = ''
-
-            return {
-                'api_id': api_id,
-                'api_hash': api_hash,
-                'session_data': session_data,
-                'recovery_email': recovery_email,
-                'phone_code_hash': phone_code_hash,
-                'session_hash': result[5],
-                'is_2fa_enabled': result[6],
-                'account_status': result[7]
-            }
+        session_data = data.get('session_data')
+        if session_data:
+            current_hash = hashlib.sha256(session_data).hexdigest()
+            if current_hash != session_hash:
+                logger.warning(f"Session hash mismatch for {phone_number}. Stored: {(session_hash or '')[:20]}..., Calculated: {current_hash[:20]}...")
 
-        except Exception as e:
-            logger.error(f"Failed to decrypt data for {phone_number}: {type(e).__name__}: {e}", exc_info=True)
-            raise
+        return data
+
+    def _decrypt_field(self, field, value):
+        if isinstance(value, memoryview):
+            value = value.tobytes()
+        if not value:
+            return None
+
+        if self.encryptor.is_legacy(value):
+            return self._decrypt_legacy_field(field, value)
+
+        plaintext = self.encryptor.decrypt_field(value)
+        if field == 'session_data':
+            return plaintext or None
+        plaintext = plaintext.decode('utf-8')
+        return int(plaintext) if field == 'api_id' else plaintext
+
+    def _decrypt_legacy_field(self, field, value):
+        """Старый формат: JSON с base64-полями, сессия дополнительно в urlsafe base64"""
+        payload = json.loads(value.decode('utf-8'))
+        if field == 'session_data':
+            # delete_session раньше оставлял пустой объект вместо зашифрованной сессии
+            if not payload:
+                return None
+            return base64.urlsafe_b64decode(self.encryptor.decrypt_data(payload)) or None
+
+        plaintext = self.encryptor.decrypt_data(payload)
+        return int(plaintext) if field == 'api_id' else plaintext
 
     def update_session(self, phone_number: str, new_session_data: bytes) -> bool:
         """Обновляет сессию в БД"""
         try:
             logger.info(f"Updating session for {phone_number}")
             
-            encrypted_session = self.encryptor.encrypt_data(
-                base64.urlsafe_b64encode(new_session_data).decode('utf-8')
-            )
+            encrypted_session = self.encryptor.encrypt_field(new_session_data)
             new_hash = hashlib.sha256(new_session_data).hexdigest()
             
             logger.debug(f"New session hash: {new_hash[:20]}...")
@@ -328,11 +353,12 @@ class SessionManager:
             db = self._get_db()
             with db.cursor() as cursor:
                 cursor.execute(query, (
-                    json.dumps(encrypted_session).encode('utf-8'),
+                    encrypted_session,
                     new_hash,
                     phone_number
                 ))
 
+            bump_generation()
             logger.info(f"Session updated successfully for {phone_number}")
             
             self._log_audit(
@@ -355,7 +381,7 @@ class SessionManager:
             query = """
             UPDATE telegram_accounts
             SET
-                encrypted_session = %s,
+                encrypted_session = NULL,
                 encrypted_phone_code_hash = NULL,
                 session_hash = %s,
                 session_updated_at = NOW(),
@@ -367,11 +393,11 @@ class SessionManager:
             db = self._get_db()
             with db.cursor() as cursor:
                 cursor.execute(query, (
-                    json.dumps({}).encode('utf-8'),
                     '',
                     phone_number
                 ))
             
+            bump_generation()
             logger.info(f"Session deleted for {phone_number}")
             
             self._log_audit(
@@ -384,6 +410,95 @@ class SessionManager:
             logger.error(f"Failed to delete session for {phone_number}: {e}")
             return False
 
+    def _stale_encryption_condition(self):
+        """SQL-условие: хотя бы одно поле в старом формате или зашифровано не текущим ключом"""
+        stale_columns = ' OR '.join(
+            f"substring({column} from 1 for 1) <> %(key_version_byte)s" for column in ENCRYPTED_COLUMNS.values()
+        )
+        return f"(encryption_version <> %(key_version)s OR {stale_columns})"
+
+    def _stale_encryption_params(self):
+        return {
+            'key_version': self.encryptor.key_version,
+            'key_version_byte': bytes([self.encryptor.key_version]),
+        }
+
+    def count_stale_encryption(self) -> int:
+        """Число аккаунтов, которые еще нужно перешифровать текущим ключом"""
+        db = self._get_db()
+        with db.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM telegram_accounts WHERE {self._stale_encryption_condition()}",
+                self._stale_encryption_params()
+            )
+            return cursor.fetchone()[0]
+
+    def reencrypt_batch(self, after_id: int = 0, batch_size: int = 200, skip_locked: bool = False):
+        """
+        Перешифровывает пачку аккаунтов (id > after_id) в двоичный конверт текущим ключом.
+        Возвращает (id последнего аккаунта пачки, число перешифрованных) или (None, 0),
+        если перешифровывать больше нечего. С skip_locked строки, заблокированные
+        другими транзакциями, пропускаются и остаются на следующий проход.
+        """
+        columns = list(ENCRYPTED_COLUMNS.values())
+        select_query = f"""
+        SELECT id, {', '.join(columns)}
+        FROM telegram_accounts
+        WHERE id > %(after_id)s AND {self._stale_encryption_condition()}
+        ORDER BY id
+        LIMIT %(batch_size)s
+        FOR UPDATE{' SKIP LOCKED' if skip_locked else ''}
+        """
+        update_query = f"""
+        UPDATE telegram_accounts
+        SET {', '.join(f'{column} = %s' for column in columns)}, encryption_version = %s
+        WHERE id = %s
+        """
+
+        db = self._get_db()
+        with transaction.atomic(using='telegram_db'):
+            with db.cursor() as cursor:
+                cursor.execute(select_query, {
+                    'after_id': after_id,
+                    'batch_size': batch_size,
+                    **self._stale_encryption_params()
+                })
+                rows = cursor.fetchall()
+                if not rows:
+                    return None, 0
+
+                updates = []
+                for row in rows:
+                    try:
+                        values = [
+                            self._reencrypt_value(field, value)
+                            for field, value in zip(ENCRYPTED_COLUMNS, row[1:])
+                        ]
+                    except Exception as e:
+                        # Поврежденную запись пропускаем, чтобы не блокировать миграцию
+                        logger.error(f"Failed to re-encrypt account {row[0]}: {type(e).__name__}: {e}")
+                        continue
+                    updates.append((*values, self.encryptor.key_version, row[0]))
+                if updates:
+                    cursor.executemany(update_query, updates)
+
+        return rows[-1][0], len(updates)
+
+    def encryption_versions_in_use(self) -> set:
+        """Версии ключей, указанные в encryption_version аккаунтов"""
+        db = self._get_db()
+        with db.cursor() as cursor:
+            cursor.execute("SELECT DISTINCT encryption_version FROM telegram_accounts")
+            return {row[0] for row in cursor.fetchall()}
+
+    def _reencrypt_value(self, field, value):
+        plaintext = self._decrypt_field(field, value)
+        if plaintext is None:
+            return None
+        if field == 'api_id':
+            plaintext = str(plaintext)
+        return self.encryptor.encrypt_field(plaintext)
+
     def _log_audit(self, account_phone: str, action_type: str, details: dict):
         """Логирует действия в таблицу аудита"""
         query = """
@@ -0,0 +1,85 @@
+import json
+import logging
+import time
+
+import redis.asyncio as aioredis
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+TASK_EVENTS_CHANNEL = 'tg:tasks:events'
+
+# Поля задачи, которые уходят в события (без тяжелого result)
+TASK_EVENT_FIELDS = ('id', 'task_type', 'status', 'progress', 'account_id', 'error_message')
+
+
+def task_event(task, **extra):
+    event = {field: getattr(task, field) for field in TASK_EVENT_FIELDS}
+    for field in ('started_at', 'completed_at', 'created_at'):
+        value = getattr(task, field)
+        event[field] = value.isoformat() if value else None
+    event.update(extra)
+    return event
+
+
+def publish_task_event(task, **extra):
+    """Публикует состояние задачи в Redis; ошибки Redis не прерывают саму задачу"""
+    try:
+        get_redis().publish(TASK_EVENTS_CHANNEL, json.dumps(task_event(task, **extra), default=str))
+    except Exception as e:
+        logger.warning(f"Could not publish event for task {task.id}: {e}")
+
+
+def format_sse(data, event=None):
+    lines = [f'event: {event}'] if event else []
+    lines.append(f'data: {data}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def stream_task_events(snapshot, duration, heartbeat=15):
+    """
+    Генератор SSE-потока для WSGI: сначала снимок активных задач, затем события из Redis pub/sub.
+    Через duration секунд поток закрывается, EventSource переподключается сам
+    (прокси не держит соединение дольше своего таймаута).
+    """
+    pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(TASK_EVENTS_CHANNEL)
+    try:
+        yield 'retry: 3000\n\n'
+        yield format_sse(json.dumps(snapshot, default=str), event='snapshot')
+
+        deadline = time.monotonic() + duration
+        while (remaining := deadline - time.monotonic()) > 0:
+            message = pubsub.get_message(timeout=min(heartbeat, remaining))
+            if message is None:
+                yield ': ping\n\n'
+                continue
+            yield format_sse(message['data'], event='task')
+    finally:
+        pubsub.close()
+
+
+async def astream_task_events(snapshot, duration, heartbeat=15):
+    """
+    Тот же поток для ASGI. Синхронный генератор Django под ASGI сначала читает целиком
+    (в пуле потоков), поэтому здесь ожидание событий идет через redis.asyncio в event loop.
+    """
+    client = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        await pubsub.subscribe(TASK_EVENTS_CHANNEL)
+        yield 'retry: 3000\n\n'
+        yield format_sse(json.dumps(snapshot, default=str), event='snapshot')
+
+        deadline = time.monotonic() + duration
+        while (remaining := deadline - time.monotonic()) > 0:
+            message = await pubsub.get_message(timeout=min(heartbeat, remaining))
+            if message is None:
+                yield ': ping\n\n'
+                continue
+            yield format_sse(message['data'], event='task')
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
@@ -8,6 +8,7 @@ import datetime
 from datetime import timezone
 from telethon import TelegramClient, version
 from telethon.sessions import StringSession
+from telethon.network import ConnectionTcpFull, ConnectionTcpMTProxyRandomizedIntermediate
 from telethon.errors import (
     SessionPasswordNeededError,
     PhoneCodeInvalidError,
@@ -20,10 +21,14 @@ from telethon.errors import (
 )
 from telethon.tl.functions.auth import ResetAuthorizationsRequest
 from telethon.tl.functions.account import SendChangePhoneCodeRequest
-from asgiref.sync import sync_to_async, async_to_sync
+from asgiref.sync import sync_to_async
 from .session_manager import SessionManager, ThreadLocalDBConnection
 from .encryption import EncryptionService
+from .rate_limiter import acquire_connect_slot
+from .client_pool import open_client, release_client
+from .event_loop import run_on_telegram_loop
 from ..models import TelegramAccount, AccountAuditLog, GlobalAppSettings, ProxyServer
+from ..serializers import GlobalAppSettingsSerializer
 import random
 import string
 
@@ -61,10 +66,51 @@ async def check_security_alerts(client, phone):
         return False, None
 
 
+def build_account_client(account, account_data):
+    """
+    Создает TelegramClient для сохраненной сессии аккаунта с его параметрами устройства и прокси.
+    Общий для проверок (tasks) и действий с аккаунтом.
+    """
+    session_data = account_data['session_data']
+    if isinstance(session_data, memoryview):
+        session_data = session_data.tobytes()
+    session_string = session_data.decode('utf-8')
+
+    device_params = account.device_params or {}
+    proxy_config = None
+    connection = ConnectionTcpFull
+    if account.proxy:
+        if account.proxy.proxy_type == 'mtproto':
+            # MTProxy задается не прокси-сокетом, а отдельным типом соединения
+            proxy_config = (account.proxy.host, account.proxy.port, account.proxy.password)
+            connection = ConnectionTcpMTProxyRandomizedIntermediate
+        else:
+            proxy_config = (
+                account.proxy.proxy_type,
+                account.proxy.host,
+                account.proxy.port,
+                account.proxy.username,
+                account.proxy.password
+            )
+
+    return TelegramClient(
+        StringSession(session_string),
+        account_data['api_id'],
+        account_data['api_hash'],
+        connection=connection,
+        device_model=device_params.get('device_model', f'CorporateManager_{platform.system()}'),
+        system_version=device_params.get('system_version', platform.version()),
+        app_version=device_params.get('app_version', '1.0'),
+        lang_code=device_params.get('lang_code', 'ru'),
+        system_lang_code=device_params.get('system_lang_code', 'ru'),
+        proxy=proxy_config
+    )
+
+
 def change_password(account_id, old_password=None, new_password=None):
     """Change password for Telegram account"""
     try:
-        return async_to_sync(_change_password_async)(account_id, old_password, new_password)
+        return run_on_telegram_loop(_change_password_async(account_id, old_password, new_password))
     except Exception as e:
         logger.error(f"Error in change_password: {e}")
         raise
@@ -74,7 +120,7 @@ def change_password(account_id, old_password=None, new_password=None):
 
 async def _change_password_async(account_id, old_password=None, new_password=None):
     try:
-        account = await sync_to_async(TelegramAccount.objects.using('telegram_db').get)(id=account_id)
+        account = await sync_to_async(TelegramAccount.objects.using('telegram_db').select_related('proxy').get)(id=account_id)
 
         session_manager = SessionManager()
         account_data = await sync_to_async(session_manager.load_account_session)(account.phone_number)
@@ -85,43 +131,17 @@ async def _change_password_async(account_id, old_password=None, new_password=Non
         if not account_data['session_data']:
             return "Данные сессии не найдены"
 
-        session_data = account_data['session_data']
-        if isinstance(session_data, memoryview):
-            session_data = session_data.tobytes()
-        session_string = session_data.decode('utf-8')
-
-        # Получаем параметры устройства и прокси
-        device_params = account.device_params or {}
-        proxy_config = None
-        if account.proxy:
-            if account.proxy.proxy_type == 'mtproto':
-                from telethon.network import ConnectionTcpMTProxyRandomizedIntermediate
-                proxy_config = (account.proxy.host, account.proxy.port, account.proxy.password)
-            else:
-                proxy_config = (
-                    account.proxy.proxy_type,
-                    account.proxy.host,
-                    account.proxy.port,
-                    account.proxy.username,
-                    account.proxy.password
-                )
-
-        client = TelegramClient(
-            StringSession(session_string),
-            account_data['api_id'],
-            account_data['api_hash'],
-            device_model=device_params.get('device_model', f'CorporateManager_{platform.system()}'),
-            system_version=device_params.get('system_version', platform.version()),
-            app_version=device_params.get('app_version', '1.0'),
-            lang_code=device_params.get('lang_code', 'ru'),
-            system_lang_code=device_params.get('system_lang_code', 'ru'),
-            proxy=proxy_config
-        )
+        async def connect():
+            new_client = build_account_client(account, account_data)
+            await acquire_connect_slot(account.proxy_id, account_data['api_id'])
+            await new_client.connect()
+            return new_client
 
-        await client.connect()
+        # На постоянном event loop процесса клиент берется из пула подключений
+        client = await open_client(account.phone_number, account_data['session_hash'], connect)
 
         if not await client.is_user_authorized():
-            await client.disconnect()
+            await release_client(account.phone_number, client, discard=True)
             return "Не авторизован"
 
         try:
@@ -162,7 +182,7 @@ async def _change_password_async(account_id, old_password=None, new_password=Non
                 return "Не удалось изменить пароль"
 
         finally:
-            await client.disconnect()
+            await release_client(account.phone_number, client)
 
     except Exception as e:
         logger.error(f"Ошибка при смене пароля: {e}")
@@ -172,7 +192,7 @@ async def _change_password_async(account_id, old_password=None, new_password=Non
 def send_code(phone, employee_id, employee_fio, account_note, recovery_email):
     """Send verification code for new account"""
     try:
-        return async_to_sync(_send_code_async)(phone, employee_id, employee_fio, account_note, recovery_email)
+        return run_on_telegram_loop(_send_code_async(phone, employee_id, employee_fio, account_note, recovery_email))
     except Exception as e:
         logger.error(f"Error in send_code: {e}")
         raise
@@ -207,6 +227,7 @@ async def _send_code_async(phone, employee_id, employee_fio, account_note, recov
             system_lang_code="ru"
         )
 
+        await acquire_connect_slot(None, api_id)
         await client.connect()
         logger.info(f"Connected to Telegram, connection status: {client.is_connected()}")
 
@@ -266,7 +287,7 @@ async def _send_code_async(phone, employee_id, employee_fio, account_note, recov
 def verify_code(phone, code, employee_id, employee_fio, account_note, recovery_email, two_factor_password=None):
     """Verify code and save account"""
     try:
-        return async_to_sync(_verify_code_async)(phone, code, employee_id, employee_fio, account_note, recovery_email, two_factor_password)
+        return run_on_telegram_loop(_verify_code_async(phone, code, employee_id, employee_fio, account_note, recovery_email, two_factor_password))
     except Exception as e:
         logger.error(f"Error in verify_code: {e}")
         raise
@@ -306,6 +327,7 @@ async def _verify_code_async(phone, code, employee_id, employee_fio, account_not
             lang_code="ru",
             system_lang_code="ru"
         )
+        await acquire_connect_slot(None, api_id)
         await client.connect()
 
         # Если передан пароль 2FA, то пытаемся войти с паролем
@@ -446,7 +468,7 @@ async def _verify_code_async(phone, code, employee_id, employee_fio, account_not
 def delete_session(account_id):
     """Delete session file for account"""
     try:
-        return async_to_sync(_delete_session_async)(account_id)
+        return run_on_telegram_loop(_delete_session_async(account_id))
     except Exception as e:
         logger.error(f"Error in delete_session: {e}")
         raise
@@ -480,7 +502,7 @@ async def _delete_session_async(account_id):
 def get_account_details(account_id):
     """Get account details"""
     try:
-        return async_to_sync(_get_account_details_async)(account_id)
+        return run_on_telegram_loop(_get_account_details_async(account_id))
     except Exception as e:
         logger.error(f"Error in get_account_details: {e}")
         raise
@@ -519,7 +541,7 @@ async def _get_account_details_async(account_id):
 def reclaim_account(account_id, two_factor_password=None):
     """Reclaim account procedure - terminate ALL sessions on all devices"""
     try:
-        return async_to_sync(_reclaim_account_async)(account_id, two_factor_password)
+        return run_on_telegram_loop(_reclaim_account_async(account_id, two_factor_password))
     except Exception as e:
         logger.error(f"Error in reclaim_account: {e}")
         raise
@@ -537,7 +559,7 @@ async def _reclaim_account_async(account_id, two_factor_password=None):
     5. Update account status to 'reclaimed'
     """
     try:
-        account = await sync_to_async(TelegramAccount.objects.using('telegram_db').get)(id=account_id)
+        account = await sync_to_async(TelegramAccount.objects.using('telegram_db').select_related('proxy').get)(id=account_id)
 
         logger.info(f"Starting reclaim procedure for account {account.phone_number} (ID: {account_id})")
 
@@ -550,43 +572,17 @@ async def _reclaim_account_async(account_id, two_factor_password=None):
         if not account_data['session_data']:
             return "Данные сессии не найдены"
 
-        session_data = account_data['session_data']
-        if isinstance(session_data, memoryview):
-            session_data = session_data.tobytes()
-        session_string = session_data.decode('utf-8')
-
-        # Получаем параметры устройства и прокси
-        device_params = account.device_params or {}
-        proxy_config = None
-        if account.proxy:
-            if account.proxy.proxy_type == 'mtproto':
-                from telethon.network import ConnectionTcpMTProxyRandomizedIntermediate
-                proxy_config = (account.proxy.host, account.proxy.port, account.proxy.password)
-            else:
-                proxy_config = (
-                    account.proxy.proxy_type,
-                    account.proxy.host,
-                    account.proxy.port,
-                    account.proxy.username,
-                    account.proxy.password
-                )
-
-        client = TelegramClient(
-            StringSession(session_string),
-            account_data['api_id'],
-            account_data['api_hash'],
-            device_model=device_params.get('device_model', f'CorporateManager_{platform.system()}'),
-            system_version=device_params.get('system_version', platform.version()),
-            app_version=device_params.get('app_version', '1.0'),
-            lang_code=device_params.get('lang_code', 'ru'),
-            system_lang_code=device_params.get('system_lang_code', 'ru'),
-            proxy=proxy_config
-        )
+        async def connect():
+            new_client = build_account_client(account, account_data)
+            await acquire_connect_slot(account.proxy_id, account_data['api_id'])
+            await new_client.connect()
+            return new_client
 
-        await client.connect()
+        # На постоянном event loop процесса клиент берется из пула подключений
+        client = await open_client(account.phone_number, account_data['session_hash'], connect)
 
         if not await client.is_user_authorized():
-            await client.disconnect()
+            await release_client(account.phone_number, client, discard=True)
             return "Не авторизован"
 
         try:
@@ -597,7 +593,7 @@ async def _reclaim_account_async(account_id, two_factor_password=None):
             if account_data['is_2fa_enabled']:
                 if two_factor_password is None:
                     logger.info(f"2FA enabled for {account.phone_number}, password required")
-                    await client.disconnect()
+                    await release_client(account.phone_number, client, discard=True)
                     return {"error": "Требуется пароль 2FA для завершения всех сессий", "requires_2fa": True}
                 else:
                     try:
@@ -608,7 +604,7 @@ async def _reclaim_account_async(account_id, two_factor_password=None):
                     except SessionPasswordNeededError:
                         # Даже с паролем может потребоваться дополнительная аутентификация
                         logger.warning(f"Still need 2FA password for {account.phone_number}")
-                        await client.disconnect()
+                        await release_client(account.phone_number, client, discard=True)
                         return {"error": "Неверный пароль 2FA или требуется дополнительная аутентификация", "requires_2fa": True}
                     except Exception as e:
                         logger.error(f"Ошибка при завершении сессий с 2FA: {e}")
@@ -648,7 +644,7 @@ async def _reclaim_account_async(account_id, two_factor_password=None):
             except Exception as e:
                 logger.warning(f"Не удалось выйти из сессии: {e}")
 
-            await client.disconnect()
+            await release_client(account.phone_number, client, discard=True)
 
             success = await sync_to_async(session_manager.delete_session)(account.phone_number)
 
@@ -682,7 +678,7 @@ async def _reclaim_account_async(account_id, two_factor_password=None):
                 return f"Аккаунт {account.phone_number} возвращен с ограниченным успехом. Не удалось завершить все сессии (требуется пароль 2FA)."
 
         except Exception as e:
-            await client.disconnect()
+            await release_client(account.phone_number, client, discard=True)
             logger.error(f"Ошибка возврата аккаунта: {e}", exc_info=True)
             return f"Ошибка возврата аккаунта: {str(e)}"
 
@@ -694,7 +690,7 @@ async def _reclaim_account_async(account_id, two_factor_password=None):
 def reauthorize_account(account_id, two_factor_password=None):
     """Reauthorize account - send new verification code and get new session"""
     try:
-        return async_to_sync(_reauthorize_account_async)(account_id, two_factor_password)
+        return run_on_telegram_loop(_reauthorize_account_async(account_id, two_factor_password))
     except Exception as e:
         logger.error(f"Error in reauthorize_account: {e}")
         raise
@@ -735,6 +731,7 @@ async def _reauthorize_account_async(account_id, two_factor_password=None):
             system_lang_code="ru"
         )
 
+        await acquire_connect_slot(None, api_id)
         await client.connect()
 
         try:
@@ -781,7 +778,7 @@ async def _reauthorize_account_async(account_id, two_factor_password=None):
 def verify_reauthorization(account_id, code, two_factor_password=None):
     """Verify code for reauthorization"""
     try:
-        return async_to_sync(_verify_reauthorization_async)(account_id, code, two_factor_password)
+        return run_on_telegram_loop(_verify_reauthorization_async(account_id, code, two_factor_password))
     except Exception as e:
         logger.error(f"Error in verify_reauthorization: {e}")
         raise
@@ -823,6 +820,7 @@ async def _verify_reauthorization_async(account_id, code, two_factor_password=No
             system_lang_code="ru"
         )
 
+        await acquire_connect_slot(None, api_id)
         await client.connect()
 
         # Если передан пароль 2FA, то пытаемся войти с паролем
@@ -894,7 +892,7 @@ async def _verify_reauthorization_async(account_id, code, two_factor_password=No
 def check_api_credentials(api_id, api_hash):
     """Check if API credentials are valid"""
     try:
-        return async_to_sync(_check_api_credentials_async)(api_id, api_hash)
+        return run_on_telegram_loop(_check_api_credentials_async(api_id, api_hash))
     except Exception as e:
         logger.error(f"Error in check_api_credentials: {e}")
         raise
@@ -916,6 +914,7 @@ async def _check_api_credentials_async(api_id, api_hash):
             system_lang_code="ru"
         )
 
+        await acquire_connect_slot(None, api_id)
         await client.connect()
 
         try:
@@ -928,3 +927,20 @@ async def _check_api_credentials_async(api_id, api_hash):
 
     except Exception as e:
         return False, f"Connection error: {str(e)}"
+
+
+def update_app_settings(api_id, api_hash, **fields):
+    """Сохраняет глобальные настройки, если Telegram принимает новые api_id/api_hash"""
+    is_valid, message = check_api_credentials(api_id, api_hash)
+    if not is_valid:
+        return {'error': f'Invalid API credentials: {message}'}
+
+    app_settings = GlobalAppSettings.objects.using('telegram_db').filter(is_active=True).first()
+    serializer = GlobalAppSettingsSerializer(
+        app_settings, data={'api_id': api_id, 'api_hash': api_hash, **fields}, partial=True
+    )
+    if not serializer.is_valid():
+        return {'error': serializer.errors}
+    serializer.save()
+    logger.info(f"Global app settings updated: API ID={api_id}")
+    return serializer.data
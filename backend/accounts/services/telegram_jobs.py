@@ -0,0 +1,74 @@
+import json
+import logging
+
+from django.conf import settings
+
+from .redis_client import get_redis
+from .telegram_actions import (
+    change_password, send_code, verify_code, delete_session, get_account_details,
+    check_api_credentials, verify_reauthorization, update_app_settings
+)
+
+logger = logging.getLogger(__name__)
+
+ACTION_KEY_PREFIX = 'tg:action'
+
+# Действия с Telegram, которые API выполняет не в потоке запроса, а в воркере celery-telegram
+TELEGRAM_ACTIONS = {
+    'change_password': change_password,
+    'send_code': send_code,
+    'verify_code': verify_code,
+    'delete_session': delete_session,
+    'get_account_details': get_account_details,
+    'check_api_credentials': check_api_credentials,
+    'verify_reauthorization': verify_reauthorization,
+    'update_app_settings': update_app_settings,
+}
+
+
+def action_key(job_id):
+    return f'{ACTION_KEY_PREFIX}:{job_id}'
+
+
+def action_response(action, result):
+    """HTTP-статус и тело ответа по результату действия - те же, что отдавал синхронный view"""
+    if action == 'check_api_credentials':
+        is_valid, message = result
+        return 200, {'is_valid': is_valid, 'message': message}
+    if isinstance(result, dict):
+        if 'error' in result:
+            # Запрос пароля 2FA - не ошибка, а следующий шаг авторизации
+            return (200 if result.get('requires_2fa') else 400), result
+        return 200, result
+    return 200, {'details' if action == 'get_account_details' else 'message': result}
+
+
+def save_action_state(job_id, state):
+    get_redis().set(action_key(job_id), json.dumps(state, default=str), ex=settings.TELEGRAM_ACTION_RESULT_TTL)
+
+
+def create_action(job_id, action, owner_id):
+    """
+    Запись о поставленном действии; owner_id - кому доступен результат:
+    'user:<id>' или 'session:<ключ сессии>' для регистрации без входа
+    """
+    save_action_state(job_id, {'status': 'pending', 'action': action, 'owner_id': owner_id})
+
+
+def finish_action(job_id, action, owner_id=None, result=None, error=None):
+    if error is not None:
+        http_status, body = 500, {'error': error}
+    else:
+        http_status, body = action_response(action, result)
+    save_action_state(job_id, {
+        'status': 'done',
+        'action': action,
+        'owner_id': owner_id,
+        'http_status': http_status,
+        'body': body,
+    })
+
+
+def get_action_state(job_id):
+    raw = get_redis().get(action_key(job_id))
+    return json.loads(raw) if raw else None
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+from django.conf import settings
+
+from .async_db import get_account_writer
+from .client_pool import get_client_pool
+from .event_loop import set_telegram_loop
+from .job_queue import AsyncJobQueue
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramWorker:
+    """
+    Asyncio-воркер проверок аккаунтов: один event loop на процесс,
+    задания из Redis выполняются конкурентно, число одновременных
+    операций с аккаунтами ограничено max_inflight, а не числом потоков.
+    """
+
+    def __init__(self, name=None, max_inflight=None, shutdown_timeout=None):
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.max_inflight = int(max_inflight or settings.TELEGRAM_WORKER_MAX_INFLIGHT)
+        self.shutdown_timeout = float(shutdown_timeout or settings.TELEGRAM_WORKER_SHUTDOWN_TIMEOUT)
+        self._stopping = None
+        self._running = set()
+
+    def stop(self):
+        if not self._stopping.is_set():
+            logger.info(f"Telegram worker {self.name} is shutting down")
+            self._stopping.set()
+
+    def run(self):
+        asyncio.run(self._main())
+
+    async def _main(self):
+        loop = asyncio.get_running_loop()
+        set_telegram_loop(loop)
+        self._stopping = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.stop)
+
+        # Слоты заданий и слоты операций с аккаунтами: групповое задание
+        # занимает один слот задания, но делит слоты операций со всеми остальными
+        self._job_slots = asyncio.Semaphore(self.max_inflight)
+        self._operation_slots = asyncio.Semaphore(self.max_inflight)
+        self.writer = get_account_writer()
+        self.queue = AsyncJobQueue(self.name)
+
+        logger.info(f"Telegram worker {self.name} started, max_inflight={self.max_inflight}")
+        try:
+            await self.queue.requeue_unfinished()
+            await self._consume()
+            await self._drain()
+        finally:
+            pool = get_client_pool()
+            if pool:
+                await pool.close_all()
+            await self.writer.close()
+            await self.queue.close()
+            logger.info(f"Telegram worker {self.name} stopped")
+
+    async def _consume(self):
+        while not self._stopping.is_set():
+            await self._job_slots.acquire()
+            try:
+                fetched = await self.queue.fetch(timeout=1)
+            except Exception as e:
+                self._job_slots.release()
+                logger.error(f"Failed to fetch worker job: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            if fetched is None:
+                self._job_slots.release()
+                continue
+
+            task = asyncio.create_task(self._handle(*fetched))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _drain(self):
+        if not self._running:
+            return
+        logger.info(f"Waiting for {len(self._running)} running jobs to finish")
+        _, pending = await asyncio.wait(self._running, timeout=self.shutdown_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            # Незавершенные задания остаются в списке "в работе" и вернутся в очередь при перезапуске
+            logger.warning(f"Cancelled {len(pending)} jobs after shutdown timeout")
+            await asyncio.wait(pending)
+
+    async def _handle(self, raw, job):
+        from ..tasks import run_account_check, run_bulk_check
+
+        job_type = job.get('type')
+        acked = False
+        try:
+            if job_type == 'check':
+                async with self._operation_slots:
+                    await run_account_check(job['account_id'], job.get('task_queue_id'), writer=self.writer)
+            elif job_type == 'bulk_check':
+                await run_bulk_check(
+                    job['account_ids'], job['task_queue_id'],
+                    writer=self.writer, semaphore=self._operation_slots
+                )
+            else:
+                logger.error(f"Unknown worker job type: {job_type}")
+            acked = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Worker job {job.get('id')} ({job_type}) failed: {e}", exc_info=True)
+            acked = True
+        finally:
+            self._job_slots.release()
+            if acked:
+                await self.queue.ack(raw)
@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models.functions import Now
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import TaskQueue, TelegramAccount, AccountTombstone, ProxyServer, SecurityCheck
+from .services.response_cache import bump_generation
+from .services.task_events import publish_task_event
+
+# Статусы, после которых задача больше не меняет аккаунты
+FINISHED_TASK_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+@receiver(post_save, sender=TaskQueue)
+def task_saved(sender, instance, using, **kwargs):
+    """Каждое сохранение задачи рассылается подписчикам SSE после коммита"""
+    transaction.on_commit(lambda: publish_task_event(instance), using=using)
+
+
+@receiver(post_save, sender=TaskQueue)
+def task_finished(sender, instance, using, **kwargs):
+    """
+    Завершение задачи сбрасывает кеш списков. Промежуточные сохранения прогресса
+    кеш не трогают, иначе массовая проверка сбрасывала бы его каждые несколько секунд.
+    """
+    if instance.status in FINISHED_TASK_STATUSES:
+        transaction.on_commit(bump_generation, using=using)
+
+
+@receiver(post_save, sender=TelegramAccount)
+@receiver(post_delete, sender=TelegramAccount)
+@receiver(post_save, sender=ProxyServer)
+@receiver(post_delete, sender=ProxyServer)
+@receiver(post_save, sender=SecurityCheck)
+def listed_data_changed(sender, using, **kwargs):
+    """Изменение аккаунта, прокси или результата проверки сбрасывает кеш списков после коммита"""
+    transaction.on_commit(bump_generation, using=using)
+
+
+@receiver(post_delete, sender=TelegramAccount)
+def account_deleted(sender, instance, using, **kwargs):
+    """Отметка об удалении в той же транзакции - клиенты синхронизации уберут аккаунт у себя"""
+    AccountTombstone.objects.using(using).create(account_id=instance.pk)
+
+
+@receiver(post_save, sender=ProxyServer)
+def proxy_saved(sender, instance, using, created, **kwargs):
+    """Изменение прокси меняет proxy_details аккаунтов - они должны попасть в /api/accounts/changes/"""
+    if not created:
+        TelegramAccount.objects.using(using).filter(proxy=instance).update(updated_at=Now())
+
+
+@receiver(pre_delete, sender=ProxyServer)
+def proxy_deleting(sender, instance, using, **kwargs):
+    """SET_NULL при удалении прокси - UPDATE мимо auto_now, поэтому updated_at аккаунтов сдвигается здесь"""
+    TelegramAccount.objects.using(using).filter(proxy=instance).update(updated_at=Now())
@@ -2,14 +2,15 @@ import asyncio
 import random
 import logging
 import time
-from datetime import datetime
-from celery import shared_task, current_task
+from datetime import datetime, timedelta, timezone
+from celery import shared_task, current_task, current_app, chain, chord, group
+from celery.utils import uuid
 from django.utils.timezone import now
 from django.db import transaction
-from asgiref.sync import sync_to_async, async_to_sync
+from django.db.models import Count
+from asgiref.sync import sync_to_async
+from redis.exceptions import LockError
 
-from telethon import TelegramClient
-from telethon.sessions import StringSession
 from telethon.errors import (
     AuthKeyInvalidError,
     FloodWaitError,
@@ -18,55 +19,37 @@ from telethon.errors import (
     PhoneCodeExpiredError
 )
 
-from .models import TelegramAccount, TaskQueue, AccountAuditLog, ProxyServer
+from .models import TelegramAccount, TaskQueue, TaskQueueItem, AccountAuditLog, AccountTombstone, ProxyServer
 from .services.session_manager import SessionManager, ThreadLocalDBConnection
 from .services.encryption import EncryptionService
-from .services.telegram_actions import check_security_alerts
+from .services.telegram_actions import build_account_client, check_security_alerts
+from .services.bulk_checker import BulkChecker
+from .services.rate_limiter import acquire_connect_slot
+from .services.flood_registry import FloodRegistry, park_after_flood
+from .services.client_pool import open_client, release_client
+from .services.event_loop import run_on_telegram_loop
+from .services.async_db import OrmAccountWriter
+from .services.job_queue import enqueue_job
+from .services.redis_client import get_redis
+from .services.progress import ProgressTracker
+from .services.cancellation import CancellationToken, current_cancel_token, request_cancel
+from .services.fleet_check import plan_fleet_lanes, build_fleet_summary
+from .services.health_schedule import batch_size, claim_due_accounts
+from .services.telegram_jobs import TELEGRAM_ACTIONS, create_action, finish_action
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+BULK_LOCK_PREFIX = 'tg:task:bulk-lock'
 
-def get_client_for_account(account_data, account):
-    """Создает TelegramClient для аккаунта"""
-    import platform
-    
-    session_data = account_data['session_data']
-    if isinstance(session_data, memoryview):
-        session_data = session_data.tobytes()
-    session_string = session_data.decode('utf-8')
-    
-    # Получаем параметры устройства
-    device_params = account.device_params or {}
-    
-    # Подготовка параметров прокси, если есть
-    proxy_config = None
-    if account.proxy:
-        if account.proxy.proxy_type == 'mtproto':
-            from telethon.network import ConnectionTcpMTProxyRandomizedIntermediate
-            proxy_config = (account.proxy.host, account.proxy.port, account.proxy.password)
-        else:
-            proxy_config = (
-                account.proxy.proxy_type,
-                account.proxy.host,
-                account.proxy.port,
-                account.proxy.username,
-                account.proxy.password
-            )
-    
-    client = TelegramClient(
-        StringSession(session_string),
-        account_data['api_id'],
-        account_data['api_hash'],
-        device_model=device_params.get('device_model', f'CorporateManager_{platform.system()}'),
-        system_version=device_params.get('system_version', platform.version()),
-        app_version=device_params.get('app_version', '1.0'),
-        lang_code=device_params.get('lang_code', 'ru'),
-        system_lang_code=device_params.get('system_lang_code', 'ru'),
-        proxy=proxy_config
-    )
-    
-    return client
+
+def parked_result(not_before):
+    """Результат проверки для аккаунта, припаркованного после FloodWait"""
+    return {
+        'status': 'parked',
+        'message': 'Аккаунт ожидает окончания FloodWait',
+        'not_before': datetime.fromtimestamp(not_before, tz=timezone.utc).isoformat()
+    }
 
 
 @shared_task(bind=True, name='accounts.tasks.check_account_task', max_retries=3)
@@ -74,89 +57,106 @@ def check_account_task(self, account_id, task_queue_id=None):
     """Задача проверки одного аккаунта"""
     logger.info(f"Starting check for account {account_id}, task {self.request.id}")
     
+    try:
+        return run_on_telegram_loop(run_account_check(account_id, task_queue_id))
+        
+    except Exception as e:
+        # Повтор не раньше, чем аккаунт выйдет из FloodWait
+        try:
+            not_before = FloodRegistry().account_not_before(account_id)
+        except Exception:
+            not_before = None
+        countdown = max(60, int(not_before - time.time()) + 1) if not_before else 60
+        self.retry(exc=e, countdown=countdown)
+        
+    finally:
+        ThreadLocalDBConnection.close_all()
+
+
+async def run_account_check(account_id, task_queue_id=None, writer=None):
+    """Проверка одного аккаунта с обновлением записи TaskQueue (Celery и asyncio-воркер)"""
+    writer = writer or OrmAccountWriter()
+    task = None
+    
+    async def finish(status, result=None, error_message=None):
+        if task:
+            task.status = status
+            task.result = result
+            task.error_message = error_message
+            task.completed_at = now()
+            await sync_to_async(task.save)()
+    
     try:
         # Получаем аккаунт
-        account = TelegramAccount.objects.using('telegram_db').get(id=account_id)
+        account = await sync_to_async(
+            TelegramAccount.objects.using('telegram_db').select_related('proxy').get
+        )(id=account_id)
         
         # Обновляем статус задачи если есть task_queue_id
         if task_queue_id:
-            task = TaskQueue.objects.get(id=task_queue_id)
+            task = await sync_to_async(TaskQueue.objects.get)(id=task_queue_id)
             task.status = 'processing'
             task.started_at = now()
-            task.save()
+            await sync_to_async(task.save)()
+        
+        # Припаркованный после FloodWait аккаунт не трогаем до истечения ожидания
+        _, parked = await sync_to_async(FloodRegistry().partition, thread_sensitive=False)([account])
+        if parked:
+            result = parked_result(parked[account.id])
+            await finish('completed', result=result)
+            return result
         
         # Загружаем данные сессии
         session_manager = SessionManager()
-        account_data = session_manager.load_account_session(account.phone_number)
+        account_data = await sync_to_async(session_manager.load_account_session)(account.phone_number)
         
         if not account_data['session_data']:
             account.activity_status = 'dead'
             account.last_ping = now()
-            account.save()
-            
-            if task_queue_id:
-                task.status = 'failed'
-                task.error_message = 'Сессия не найдена'
-                task.completed_at = now()
-                task.save()
-            
+            await writer.save_account(account, ['activity_status', 'last_ping'])
+            await finish('failed', error_message='Сессия не найдена')
             return {'status': 'error', 'message': 'Сессия не найдена'}
         
-        # Anti-flood задержка
-        delay = random.uniform(
-            float(settings.TELEGRAM_ANTI_FLOOD_DELAY_MIN),
-            float(settings.TELEGRAM_ANTI_FLOOD_DELAY_MAX)
-        )
-        logger.info(f"Anti-flood delay: {delay:.2f} seconds before checking account {account.phone_number}")
-        time.sleep(delay)
-        
-        # Проверяем аккаунт
-        result = async_to_sync(check_account_async)(account, account_data)
-        
-        # Обновляем задачу если есть task_queue_id
-        if task_queue_id:
-            task.status = 'completed'
-            task.result = result
-            task.completed_at = now()
-            task.save()
-        
+        # Проверяем аккаунт (anti-flood ограничение применяется перед подключением)
+        result = await check_account_async(account, account_data, writer=writer)
+        await finish('completed', result=result)
         return result
         
     except Exception as e:
         logger.error(f"Error checking account {account_id}: {e}", exc_info=True)
-        
-        if task_queue_id:
-            task = TaskQueue.objects.get(id=task_queue_id)
-            task.status = 'failed'
-            task.error_message = str(e)
-            task.completed_at = now()
-            task.save()
-        
-        self.retry(exc=e, countdown=60)
-        
-    finally:
-        ThreadLocalDBConnection.close_all()
+        await finish('failed', error_message=str(e))
+        raise
 
 
-async def check_account_async(account, account_data):
-    """Асинхронная проверка аккаунта"""
+async def check_account_async(account, account_data, writer=None, connect_slot_acquired=False):
+    """
+    Асинхронная проверка аккаунта.
+    При FloodWait аккаунт паркуется в FloodRegistry до истечения ожидания,
+    повторную проверку выполнит следующий плановый запуск.
+    connect_slot_acquired - токен rate limiter на подключение уже получен вызывающим (BulkChecker).
+    """
+    writer = writer or OrmAccountWriter()
     client = None
+    healthy = False
+    
+    async def connect():
+        new_client = build_account_client(account, account_data)
+        if not connect_slot_acquired:
+            await acquire_connect_slot(account.proxy_id, account_data['api_id'])
+        await new_client.connect()
+        return new_client
+    
     try:
-        client = get_client_for_account(account_data, account)
-        await client.connect()
+        # На постоянном event loop процесса клиент берется из пула подключений
+        client = await open_client(account.phone_number, account_data['session_hash'], connect)
         
         # Проверяем авторизацию
         if not await client.is_user_authorized():
             account.activity_status = 'dead'
             account.last_ping = now()
-            await sync_to_async(account.save)()
+            await writer.save_account(account, ['activity_status', 'last_ping'])
             
-            await sync_to_async(AccountAuditLog.objects.using('telegram_db').create)(
-                account=account,
-                action_type='check_failed',
-                action_details={'reason': 'not_authorized'},
-                performed_by='Система'
-            )
+            await writer.create_audit_log(account, 'check_failed', {'reason': 'not_authorized'})
             
             return {'status': 'error', 'message': 'Не авторизован'}
         
@@ -177,19 +177,10 @@ async def check_account_async(account, account_data):
         account.activity_status = 'active'
         account.last_checked = now()
         
-        # Сохраняем информацию о безопасности
-        security_info = {
-            'has_security_alert': has_security_alert,
-            'alert_message': alert_message,
-            'last_security_check': now().isoformat()
-        }
-        
-        # Обновляем device_params с информацией о безопасности
-        current_device_params = account.device_params or {}
-        current_device_params['security_info'] = security_info
-        account.device_params = current_device_params
+        await writer.save_account(account, ['last_ping', 'activity_status', 'last_checked'])
         
-        await sync_to_async(account.save)()
+        # Результат проверки безопасности - отдельной строкой в security_checks
+        await writer.record_security_check(account, has_security_alert, alert_message, account.last_checked)
         
         # Логируем успешную проверку
         audit_details = {
@@ -198,13 +189,9 @@ async def check_account_async(account, account_data):
             'alert_message': alert_message
         }
         
-        await sync_to_async(AccountAuditLog.objects.using('telegram_db').create)(
-            account=account,
-            action_type='check_success',
-            action_details=audit_details,
-            performed_by='Система'
-        )
+        await writer.create_audit_log(account, 'check_success', audit_details)
         
+        healthy = True
         return {
             'status': 'success',
             'message': 'Аккаунт активен',
@@ -219,14 +206,9 @@ async def check_account_async(account, account_data):
         
         account.activity_status = 'dead'
         account.last_ping = now()
-        await sync_to_async(account.save)()
+        await writer.save_account(account, ['activity_status', 'last_ping'])
         
-        await sync_to_async(AccountAuditLog.objects.using('telegram_db').create)(
-            account=account,
-            action_type='session_invalid',
-            action_details={'error': str(e)},
-            performed_by='Система'
-        )
+        await writer.create_audit_log(account, 'session_invalid', {'error': str(e)})
         
         return {'status': 'error', 'message': 'Ключ авторизации невалиден'}
         
@@ -235,104 +217,308 @@ async def check_account_async(account, account_data):
         
         account.activity_status = 'flood'
         account.last_ping = now()
-        await sync_to_async(account.save)()
+        await writer.save_account(account, ['activity_status', 'last_ping'])
         
-        # Создаем задачу на паузу
-        from celery.exceptions import Ignore
-        check_account_task.apply_async(
-            args=[account.id],
-            countdown=e.seconds + 10
-        )
+        await writer.create_audit_log(account, 'flood_wait', {'wait_seconds': e.seconds})
         
-        await sync_to_async(AccountAuditLog.objects.using('telegram_db').create)(
-            account=account,
-            action_type='flood_wait',
-            action_details={'wait_seconds': e.seconds},
-            performed_by='Система'
-        )
+        # Паркуем аккаунт вместо повторной постановки задачи в очередь
+        await sync_to_async(park_after_flood, thread_sensitive=False)(account.id, account.proxy_id, e.seconds)
         
-        raise Ignore()
+        return {'status': 'flood', 'message': 'FloodWait', 'wait_seconds': e.seconds}
         
     except Exception as e:
         logger.error(f"Error checking account {account.phone_number}: {e}", exc_info=True)
         
         account.activity_status = 'dead'
         account.last_ping = now()
-        await sync_to_async(account.save)()
+        await writer.save_account(account, ['activity_status', 'last_ping'])
         
         return {'status': 'error', 'message': str(e)}
         
     finally:
         if client:
-            await client.disconnect()
+            await release_client(account.phone_number, client, discard=not healthy)
 
 
 @shared_task(bind=True, name='accounts.tasks.bulk_check_accounts_task')
 def bulk_check_accounts_task(self, account_ids, task_queue_id):
-    """Задача групповой проверки аккаунтов"""
-    logger.info(f"Starting bulk check for {len(account_ids)} accounts")
+    """
+    Часть групповой проверки: BULK_CHECK_CHUNK_SIZE аккаунтов от курсора задачи.
+    Следующая часть ставится отдельной задачей Celery, поэтому проверка любой длины
+    укладывается в лимит времени, а после перезапуска воркера продолжается с курсора.
+    """
+    # Повторно доставленное сообщение (acks_late) не должно проверять ту же часть параллельно
+    lock = get_redis().lock(f'{BULK_LOCK_PREFIX}:{task_queue_id}', timeout=settings.CELERY_TASK_TIME_LIMIT)
+    if not lock.acquire(blocking=False):
+        logger.info(f"Bulk check task {task_queue_id} is already running, skipping duplicate")
+        return {'skipped': True}
     
     try:
-        task = TaskQueue.objects.get(id=task_queue_id)
-        task.status = 'processing'
-        task.started_at = now()
-        task.save()
+        result = run_on_telegram_loop(
+            run_bulk_check(account_ids, task_queue_id, chunk_size=settings.BULK_CHECK_CHUNK_SIZE)
+        )
+    finally:
+        ThreadLocalDBConnection.close_all()
+        try:
+            lock.release()
+        except LockError:
+            logger.warning(f"Bulk check lock for task {task_queue_id} expired before release")
+    
+    if result.get('has_more'):
+        celery_task_id = bulk_check_accounts_task.delay(None, task_queue_id).id
+        TaskQueue.objects.filter(id=task_queue_id).update(celery_task_id=celery_task_id)
+    return result
+
+
+def load_bulk_progress(task, account_ids):
+    """Исходы уже проверенных аккаунтов задачи и id аккаунтов из account_ids, которые проверены"""
+    items = TaskQueueItem.objects.using('telegram_db').filter(task_id=task.id)
+    counters = {
+        row['status']: row['count']
+        for row in items.values('status').order_by().annotate(count=Count('id'))
+    }
+    done_ids = set(items.filter(account_id__in=account_ids).values_list('account_id', flat=True))
+    return counters, done_ids
+
+
+async def run_bulk_check(account_ids, task_queue_id, writer=None, semaphore=None, chunk_size=None):
+    """
+    Групповая проверка с обновлением прогресса TaskQueue (Celery и asyncio-воркер).
+    Проверяет аккаунты от курсора задачи (не больше chunk_size) и пропускает уже проверенные,
+    поэтому повторный запуск после падения продолжает с последнего записанного результата.
+    Возвращает has_more=True, если после этой части остались аккаунты.
+    """
+    task = None
+    tracker = None
+    cancel_token = CancellationToken(task_queue_id)
+    token_context = current_cancel_token.set(cancel_token)
+    try:
+        task = await sync_to_async(TaskQueue.objects.get)(id=task_queue_id)
+        # Задачу отменили, пока она ждала в очереди
+        if task.status == 'cancelled' or await cancel_token.is_cancelled():
+            logger.info(f"Bulk check task {task_queue_id} was cancelled before start")
+            return {'cancelled': True}
+        if task.status in ('completed', 'failed'):
+            logger.info(f"Bulk check task {task_queue_id} is already {task.status}")
+            return task.result or {}
+        
+        if task.status != 'processing':
+            task.status = 'processing'
+            task.started_at = now()
+            await sync_to_async(task.save)(update_fields=['status', 'started_at', 'updated_at'])
         
+        account_ids = account_ids if account_ids is not None else task.account_ids
         total = len(account_ids)
-        completed = 0
-        results = []
+        chunk_end = min(task.cursor + chunk_size, total) if chunk_size else total
+        chunk = account_ids[task.cursor:chunk_end]
+        
+        # Прогресс копится в Redis и сбрасывается в задачу пачками, а не на каждый аккаунт
+        tracker = ProgressTracker(task, total)
+        counters, done_ids = await sync_to_async(load_bulk_progress)(task, chunk)
+        tracker.restore(counters)
+        pending = [account_id for account_id in chunk if account_id not in done_ids]
+        if done_ids or task.cursor:
+            logger.info(
+                f"Resuming bulk check task {task_queue_id} at {task.cursor + len(done_ids)} of {total} accounts"
+            )
         
-        for i, account_id in enumerate(account_ids):
-            # Обновляем прогресс
-            progress = int((i / total) * 100)
-            task.progress = progress
-            task.save()
-            
-            # Выполняем проверку аккаунта
-            try:
-                result = check_account_task(account_id)
-                results.append({
-                    'account_id': account_id,
-                    'result': result
-                })
-                completed += 1
-                
-            except Exception as e:
-                logger.error(f"Error checking account {account_id}: {e}")
-                results.append({
-                    'account_id': account_id,
-                    'error': str(e)
-                })
-            
-            # Anti-flood задержка между аккаунтами (60-120 секунд)
-            if i < total - 1:  # Не ждать после последнего аккаунта
-                delay = random.uniform(60, 120)
-                logger.info(f"Anti-flood delay between accounts: {delay:.2f} seconds")
-                time.sleep(delay)
+        # Проверки идут параллельно; анти-флуд паузы выдерживаются по каждому прокси отдельно
+        checker = BulkChecker(on_result=tracker.record, writer=writer, semaphore=semaphore, cancel_token=cancel_token)
+        await checker.run(pending)
+        await tracker.flush()
         
-        # Завершаем задачу
-        task.status = 'completed'
-        task.progress = 100
+        # completed - только успешные проверки; parked (FloodWait) и error видны отдельными счетчиками
         task.result = {
-            'total': total,
-            'completed': completed,
-            'results': results
+            **tracker.snapshot(),
+            'completed': tracker.counters['success']
         }
+        
+        if cancel_token.cancelled:
+            # Статус cancelled уже выставлен при отмене, сохраняем собранные результаты
+            logger.info(f"Bulk check task {task_queue_id} cancelled after {tracker.done} of {total} accounts")
+            task.status = 'cancelled'
+            task.result['cancelled'] = True
+            task.completed_at = now()
+            await sync_to_async(task.save)(update_fields=['status', 'result', 'completed_at', 'updated_at'])
+            return task.result
+        
+        task.cursor = chunk_end
+        if chunk_end < total:
+            await sync_to_async(task.save)(update_fields=['cursor', 'result', 'updated_at'])
+            return {**task.result, 'has_more': True}
+        
+        # Завершаем задачу; результаты по аккаунтам - в task_queue_items
+        task.status = 'completed'
+        task.progress = 100
         task.completed_at = now()
-        task.save()
+        await sync_to_async(task.save)(update_fields=['status', 'progress', 'cursor', 'result', 'completed_at', 'updated_at'])
         
         return task.result
         
     except Exception as e:
         logger.error(f"Error in bulk check task: {e}", exc_info=True)
         
-        if 'task' in locals():
+        if task:
             task.status = 'failed'
             task.error_message = str(e)
             task.completed_at = now()
-            task.save()
+            if tracker:
+                task.result = tracker.snapshot()
+            await sync_to_async(task.save)(update_fields=['status', 'error_message', 'result', 'completed_at', 'updated_at'])
         
         raise
+    
+    finally:
+        current_cancel_token.reset(token_context)
+        if tracker:
+            await tracker.close()
+
+
+def dispatch_account_check(account_id, task_queue_id=None):
+    """Ставит проверку одного аккаунта в Celery или в очередь asyncio-воркера (TELEGRAM_CHECK_BACKEND)"""
+    if settings.TELEGRAM_CHECK_BACKEND == 'worker':
+        return enqueue_job('check', account_id=account_id, task_queue_id=task_queue_id)
+    return check_account_task.delay(account_id, task_queue_id).id
+
+
+def dispatch_bulk_check(account_ids, task_queue_id):
+    """Ставит групповую проверку в Celery или в очередь asyncio-воркера (TELEGRAM_CHECK_BACKEND)"""
+    if settings.TELEGRAM_CHECK_BACKEND == 'worker':
+        return enqueue_job('bulk_check', account_ids=account_ids, task_queue_id=task_queue_id)
+    # Список аккаунтов хранится в TaskQueue, в сообщение его не кладем
+    celery_task_id = bulk_check_accounts_task.delay(None, task_queue_id).id
+    # id нужен, чтобы отозвать задачу при отмене
+    TaskQueue.objects.filter(id=task_queue_id).update(celery_task_id=celery_task_id)
+    return celery_task_id
+
+
+@shared_task(bind=True, name='accounts.tasks.check_accounts_chunk_task')
+def check_accounts_chunk_task(self, account_ids, task_queue_id):
+    """Часть ежедневной проверки в очереди telegram_check (постоянный event loop и пул клиентов)"""
+    try:
+        return run_on_telegram_loop(run_fleet_chunk(account_ids, task_queue_id))
+    finally:
+        ThreadLocalDBConnection.close_all()
+
+
+async def run_fleet_chunk(account_ids, task_queue_id, writer=None):
+    """
+    Проверка части аккаунтов общей задачи. Ошибка части не прерывает линию и хорд:
+    она логируется, а непроверенные аккаунты попадают в unchecked итоговой сводки.
+    """
+    tracker = None
+    cancel_token = CancellationToken(task_queue_id)
+    token_context = current_cancel_token.set(cancel_token)
+    try:
+        task = await sync_to_async(TaskQueue.objects.get)(id=task_queue_id)
+        if task.status == 'cancelled' or await cancel_token.is_cancelled():
+            return {'cancelled': True}
+        
+        # Повторная доставка части не проверяет аккаунты второй раз
+        _, done_ids = await sync_to_async(load_bulk_progress)(task, account_ids)
+        pending = [account_id for account_id in account_ids if account_id not in done_ids]
+        
+        tracker = ProgressTracker(task, len(task.account_ids), shared=True)
+        checker = BulkChecker(on_result=tracker.record, writer=writer, cancel_token=cancel_token)
+        await checker.run(pending)
+        await tracker.flush()
+        return {'checked': tracker.done, **tracker.counters}
+        
+    except Exception as e:
+        logger.error(f"Error in fleet check chunk of task {task_queue_id}: {e}", exc_info=True)
+        return {'error': str(e), 'accounts': len(account_ids)}
+    
+    finally:
+        current_cancel_token.reset(token_context)
+        if tracker:
+            await tracker.close()
+
+
+@shared_task(name='accounts.tasks.fleet_check_summary_task')
+def fleet_check_summary_task(lane_results, task_queue_id):
+    """Завершение ежедневной проверки: сводка здоровья парка в result задачи"""
+    task = TaskQueue.objects.get(id=task_queue_id)
+    task.result = build_fleet_summary(task, lane_results)
+    if task.status != 'cancelled':
+        task.status = 'completed'
+        task.progress = 100
+        task.completed_at = now()
+    task.save(update_fields=['status', 'progress', 'result', 'completed_at', 'updated_at'])
+    
+    logger.info(
+        f"Fleet check task {task_queue_id} finished: {task.result['done']} of {task.result['total']} checked, "
+        f"{task.result.get('error', 0)} errors, {task.result['unchecked']} unchecked"
+    )
+    return task.result
+
+
+def dispatch_fleet_check(accounts, task_queue_id):
+    """
+    Ставит ежедневную проверку пар (id, proxy_id) веером: FLEET_CHECK_LANES параллельных
+    цепочек частей по BULK_CHECK_CHUNK_SIZE аккаунтов в очереди telegram_check и
+    итоговая сводка после всех линий (chord). asyncio-воркер получает одну групповую проверку.
+    """
+    if settings.TELEGRAM_CHECK_BACKEND == 'worker':
+        return dispatch_bulk_check([account_id for account_id, _ in accounts], task_queue_id)
+    
+    lanes = plan_fleet_lanes(accounts, settings.FLEET_CHECK_LANES, settings.BULK_CHECK_CHUNK_SIZE)
+    header = group(
+        chain(*[check_accounts_chunk_task.si(chunk, task_queue_id) for chunk in chunks])
+        for chunks in lanes
+    )
+    # update() не заполняет auto_now, а по updated_at клиенты сверяют ETag списка задач
+    TaskQueue.objects.filter(id=task_queue_id).update(status='processing', started_at=now(), updated_at=now())
+    celery_task_id = chord(header)(fleet_check_summary_task.s(task_queue_id)).id
+    TaskQueue.objects.filter(id=task_queue_id).update(celery_task_id=celery_task_id)
+    
+    logger.info(
+        f"Fleet check task {task_queue_id}: {len(accounts)} accounts in {len(lanes)} lanes, "
+        f"{sum(len(chunks) for chunks in lanes)} chunks"
+    )
+    return celery_task_id
+
+
+def cancel_task(task):
+    """
+    Отмена задачи: статус cancelled, флаг в Redis для уже работающей проверки
+    (она останавливается между аккаунтами и в ожиданиях) и revoke еще не начатой задачи Celery.
+    """
+    task.status = 'cancelled'
+    task.completed_at = now()
+    task.save(update_fields=['status', 'completed_at', 'updated_at'])
+    
+    request_cancel(task.id)
+    if task.celery_task_id:
+        current_app.control.revoke(task.celery_task_id)
+
+
+@shared_task(name='accounts.tasks.telegram_action_task', ignore_result=True)
+def telegram_action_task(job_id, action, kwargs, owner_id=None):
+    """Действие с Telegram, запрошенное через API; результат забирается по GET /api/telegram-jobs/<id>/"""
+    try:
+        result = TELEGRAM_ACTIONS[action](**kwargs)
+    except Exception as e:
+        logger.error(f"Telegram action {action} (job {job_id}) failed: {e}", exc_info=True)
+        finish_action(job_id, action, owner_id, error=str(e))
+        return
+    finish_action(job_id, action, owner_id, result=result)
+
+
+def dispatch_telegram_action(action, owner_id, **kwargs):
+    """
+    Ставит действие с Telegram в очередь telegram_auth и возвращает id задания.
+    Поток gunicorn не ждет MTProto: медленный Telegram не задерживает остальные запросы API.
+    Без владельца результат был бы доступен любому, кто знает id, поэтому такие задания не ставятся.
+    """
+    if not owner_id:
+        raise ValueError("Telegram action requires an owner")
+    job_id = uuid()
+    create_action(job_id, action, owner_id)
+    # Действие, не начатое до истечения срока хранения результата, уже никто не ждет
+    telegram_action_task.apply_async(
+        (job_id, action, kwargs, owner_id), task_id=job_id, expires=settings.TELEGRAM_ACTION_RESULT_TTL
+    )
+    return job_id
 
 
 @shared_task(bind=True, name='accounts.tasks.reauthorize_account_task')
@@ -352,7 +538,7 @@ def reauthorize_account_task(self, account_id, task_queue_id=None):
             task.save()
         
         # Первый шаг - отправка кода
-        result = async_to_sync(reauthorize_account)(account_id)
+        result = reauthorize_account(account_id)
         
         if 'error' in result:
             if task_queue_id:
@@ -399,7 +585,7 @@ def reclaim_account_task(self, account_id, two_factor_password=None, task_queue_
             task.started_at = now()
             task.save()
         
-        result = async_to_sync(reclaim_account)(account_id, two_factor_password)
+        result = reclaim_account(account_id, two_factor_password)
         
         if task_queue_id:
             if 'error' in result:
@@ -443,31 +629,94 @@ def cleanup_old_tasks():
     return deleted_count
 
 
+@shared_task(name='accounts.tasks.cleanup_account_tombstones')
+def cleanup_account_tombstones():
+    """Удаление отметок об удаленных аккаунтах старше срока хранения"""
+    cutoff = now() - timedelta(days=settings.ACCOUNT_TOMBSTONE_RETENTION_DAYS)
+    deleted_count, _ = AccountTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+
+    logger.info(f"Cleaned up {deleted_count} account tombstones")
+    return deleted_count
+
+
+@shared_task(name='accounts.tasks.reencrypt_accounts_task')
+def reencrypt_accounts_task(batch_size=200):
+    """Фоновый перевод зашифрованных полей аккаунтов в двоичный конверт"""
+    session_manager = SessionManager()
+    last_id, total = 0, 0
+    
+    try:
+        while True:
+            last_id, migrated = session_manager.reencrypt_batch(last_id, batch_size)
+            if last_id is None:
+                break
+            total += migrated
+            logger.info(f"Re-encrypted {total} accounts (last id {last_id})")
+    finally:
+        ThreadLocalDBConnection.close_all()
+    
+    logger.info(f"Re-encryption finished: {total} accounts migrated")
+    return total
+
+
+@shared_task(name='accounts.tasks.schedule_due_health_checks')
+def schedule_due_health_checks():
+    """
+    Поминутная плановая проверка вместо ночной проверки всего парка: небольшая пачка
+    аккаунтов, дольше всех ждущих проверки, размер пачки - чтобы парк проходил
+    за HEALTH_CHECK_INTERVAL_HOURS. Нагрузка на воркеры, БД и Telegram остается ровной.
+    """
+    active_count = TelegramAccount.objects.using('telegram_db').filter(account_status='active').count()
+    if not active_count:
+        return 0
+    
+    due = claim_due_accounts(batch_size(active_count))
+    for account_id, _ in due:
+        dispatch_account_check(account_id)
+    
+    if due:
+        logger.info(f"Scheduled health checks for {len(due)} of {active_count} active accounts")
+    return len(due)
+
+
 @shared_task(name='accounts.tasks.daily_check_all_active_accounts')
 def daily_check_all_active_accounts():
     """Ежедневная проверка всех активных аккаунтов"""
-    from .models import TelegramAccount, TaskQueue
+    task = schedule_fleet_check({'scheduled': True, 'daily_check': True})
+    if task is None:
+        logger.info("No active accounts found for daily check")
+        return
     
-    active_accounts = TelegramAccount.objects.using('telegram_db').filter(
-        account_status='active'
-    ).values_list('id', flat=True)
+    logger.info(f"Scheduled daily check for {len(task.account_ids)} accounts, task ID: {task.id}")
+    return f"Scheduled daily check for {len(task.account_ids)} accounts, task ID: {task.id}"
+
+
+def schedule_fleet_check(parameters):
+    """Создает задачу проверки всех активных аккаунтов и ставит ее веером; None, если проверять некого"""
+    active_accounts = list(
+        TelegramAccount.objects.using('telegram_db').filter(
+            account_status='active'
+        ).values_list('id', 'proxy_id')
+    )
     
-    account_ids = list(active_accounts)
+    # Одним запросом к реестру откладываем аккаунты, ожидающие окончания FloodWait
+    account_ids, parked = FloodRegistry().partition(active_accounts)
+    if parked:
+        logger.info(f"Fleet check: {len(parked)} accounts deferred due to FloodWait")
     
     if not account_ids:
-        logger.info("No active accounts found for daily check")
-        return
+        return None
+    
+    ready = set(account_ids)
+    accounts = [(account_id, proxy_id) for account_id, proxy_id in active_accounts if account_id in ready]
     
     # Создаем запись в очереди задач
     task = TaskQueue.objects.create(
         task_type='bulk_check',
         account_ids=account_ids,
-        parameters={'scheduled': True, 'daily_check': True},
+        parameters={**parameters, 'deferred': len(parked)},
         created_by='Система'
     )
     
-    # Запускаем задачу Celery
-    bulk_check_accounts_task.delay(account_ids, task.id)
-    
-    logger.info(f"Scheduled daily check for {len(account_ids)} accounts, task ID: {task.id}")
-    return f"Scheduled daily check for {len(account_ids)} accounts, task ID: {task.id}"
+    dispatch_fleet_check(accounts, task.id)
+    return task
@@ -0,0 +1,82 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+
+from accounts.models import ProxyServer, TelegramAccount
+
+
+class AccountChangesTestCase(TestCase):
+    databases = {'default', 'telegram_db'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        patcher = mock.patch('accounts.views.response_cache.lookup', return_value=(None, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def changes(self, **params):
+        response = self.client.get(reverse('account-changes'), params, secure=True)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def age_accounts(self):
+        """Аккаунты давно не менялись: курсор первой загрузки остается до следующих правок"""
+        TelegramAccount.objects.using('telegram_db').update(updated_at=now() - timedelta(hours=1))
+
+
+class ChangesCursorTests(AccountChangesTestCase):
+    """updated_at в init.sql - TIMESTAMP без часового пояса, курсор хранит его как UTC"""
+
+    def test_cursor_round_trip(self):
+        accounts = TelegramAccount.objects.using('telegram_db')
+        old = accounts.create(phone_number='+79000000001')
+        self.age_accounts()
+
+        first = self.changes()
+        self.assertEqual([row['id'] for row in first['results']], [old.id])
+        self.assertEqual(self.changes(since=first['cursor'])['results'], [])
+
+        old.employee_fio = 'Иванов Иван'
+        old.save()
+        new = accounts.create(phone_number='+79000000002')
+
+        results = self.changes(since=first['cursor'])['results']
+        self.assertEqual([row['id'] for row in results], [old.id, new.id])
+
+
+class ProxyChangesTests(AccountChangesTestCase):
+    """Изменение и удаление прокси меняют данные аккаунтов в выборке изменений"""
+
+    def setUp(self):
+        super().setUp()
+        self.proxy = ProxyServer.objects.create(name='proxy', host='10.0.0.1', port=1080)
+        self.account = TelegramAccount.objects.using('telegram_db').create(phone_number='+79000000001', proxy=self.proxy)
+        self.age_accounts()
+        self.cursor = self.changes()['cursor']
+
+    def test_proxy_edit_in_next_page(self):
+        self.proxy.host = '10.0.0.2'
+        self.proxy.save()
+
+        results = self.changes(since=self.cursor)['results']
+
+        self.assertEqual([row['id'] for row in results], [self.account.id])
+        self.assertEqual(results[0]['proxy_details']['host'], '10.0.0.2')
+
+    def test_proxy_delete_in_next_page(self):
+        self.proxy.delete()
+
+        results = self.changes(since=self.cursor)['results']
+
+        self.assertEqual([row['id'] for row in results], [self.account.id])
+        self.assertIsNone(results[0]['proxy'])
@@ -0,0 +1,37 @@
+from django.test import TestCase
+
+from accounts.models import TelegramAccount
+from accounts.services.account_search import search_accounts
+
+
+class SearchAccountsTests(TestCase):
+    databases = {'default', 'telegram_db'}
+
+    @classmethod
+    def setUpTestData(cls):
+        accounts = TelegramAccount.objects.using('telegram_db')
+        cls.prefix = accounts.create(phone_number='+9001112233', employee_id='EMP-1', employee_fio='Иванов Иван')
+        cls.employee = accounts.create(phone_number='+79995550000', employee_id='EMP-9001', employee_fio='Петров Петр')
+        cls.middle = accounts.create(phone_number='+79009001777', employee_id='EMP-2', employee_fio='Сидоров Сидор')
+        cls.other = accounts.create(phone_number='+79994440000', employee_id='EMP-3', employee_fio='Кузнецов Кузьма')
+
+    def search(self, term):
+        queryset = TelegramAccount.objects.using('telegram_db').all()
+        return list(search_accounts(queryset, term).order_by('-search_rank', 'id'))
+
+    def test_digits_match_substring_in_all_fields(self):
+        results = self.search('9001')
+
+        self.assertEqual(set(results), {self.prefix, self.employee, self.middle})
+
+    def test_phone_prefix_ranked_first(self):
+        results = self.search('9001')
+
+        self.assertEqual(results[0], self.prefix)
+
+    def test_formatted_phone(self):
+        self.assertEqual(self.search('+7 (999) 444'), [self.other])
+        self.assertEqual(self.search('900-111'), [self.prefix])
+
+    def test_text_query(self):
+        self.assertEqual(self.search('петров'), [self.employee])
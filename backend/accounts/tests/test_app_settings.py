@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import GlobalAppSettings
+from accounts.services.telegram_actions import update_app_settings
+
+
+class AppSettingsTestCase(TestCase):
+    databases = {'default', 'telegram_db'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.app_settings = GlobalAppSettings.objects.create(api_id=12345, api_hash='old-hash')
+
+
+class GlobalAppSettingsViewTests(AppSettingsTestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        patcher = mock.patch('accounts.views.dispatch_telegram_action', return_value='job-1')
+        self.dispatch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_new_credentials_checked_in_worker(self):
+        response = self.client.put(
+            reverse('global-settings'), {'api_id': 54321, 'api_hash': 'new-hash', 'app_name': 'Manager'},
+            format='json', secure=True
+        )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['job_id'], 'job-1')
+        self.dispatch.assert_called_once_with(
+            'update_app_settings', f'user:{self.user.pk}', api_id=54321, api_hash='new-hash', app_name='Manager'
+        )
+        self.app_settings.refresh_from_db()
+        self.assertEqual(self.app_settings.api_hash, 'old-hash')
+
+    def test_patch_credentials_checked_in_worker(self):
+        response = self.client.patch(reverse('global-settings'), {'api_hash': 'new-hash'}, format='json', secure=True)
+
+        self.assertEqual(response.status_code, 202)
+        self.dispatch.assert_called_once_with('update_app_settings', f'user:{self.user.pk}', api_id=12345, api_hash='new-hash')
+
+    def test_unchanged_credentials_saved_in_request(self):
+        response = self.client.put(
+            reverse('global-settings'), {'api_id': 12345, 'api_hash': 'old-hash', 'app_name': 'Manager'},
+            format='json', secure=True
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['app_name'], 'Manager')
+        self.dispatch.assert_not_called()
+
+
+class UpdateAppSettingsActionTests(AppSettingsTestCase):
+
+    @mock.patch('accounts.services.telegram_actions.check_api_credentials', return_value=(True, 'API credentials are valid'))
+    def test_saves_valid_credentials(self, check):
+        result = update_app_settings(api_id=54321, api_hash='new-hash', app_name='Manager')
+
+        check.assert_called_once_with(54321, 'new-hash')
+        self.assertEqual(result['api_id'], 54321)
+        self.app_settings.refresh_from_db()
+        self.assertEqual((self.app_settings.api_id, self.app_settings.api_hash, self.app_settings.app_name), (54321, 'new-hash', 'Manager'))
+
+    @mock.patch('accounts.services.telegram_actions.check_api_credentials', return_value=(False, 'ApiIdInvalidError'))
+    def test_rejects_invalid_credentials(self, check):
+        result = update_app_settings(api_id=54321, api_hash='new-hash')
+
+        self.assertEqual(result, {'error': 'Invalid API credentials: ApiIdInvalidError'})
+        self.app_settings.refresh_from_db()
+        self.assertEqual(self.app_settings.api_hash, 'old-hash')
@@ -0,0 +1,50 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import IsolatedAsyncioTestCase, mock
+
+from accounts.services.bulk_checker import BulkChecker
+
+
+def make_account(account_id, proxy_id):
+    return SimpleNamespace(id=account_id, phone_number=f'+7900{account_id}', proxy_id=proxy_id)
+
+
+SESSION = {'session_data': b'session', 'session_hash': 'hash', 'api_id': 12345}
+
+
+class BulkCheckerSlotTests(IsolatedAsyncioTestCase):
+    """Ожидание токена rate limiter не должно держать общий слот проверки"""
+
+    def setUp(self):
+        with mock.patch('accounts.services.bulk_checker.FloodRegistry'):
+            self.checker = BulkChecker(concurrency=1, per_proxy_concurrency=1, writer=mock.Mock())
+        self.checker._global_semaphore = asyncio.Semaphore(1)
+        self.checked = []
+        self.checker.check_account = self.check_account
+
+    async def check_account(self, account, account_data, connect_slot_acquired=False):
+        self.checked.append((account.id, connect_slot_acquired))
+        return {'status': 'ok'}
+
+    async def acquire_connect_slot(self, proxy_id, api_id):
+        # Прокси 1 ждет интервал между подключениями, прокси 2 свободен
+        if proxy_id == 1:
+            await asyncio.sleep(0.1)
+
+    async def test_token_awaited_before_global_slot(self):
+        with mock.patch('accounts.services.bulk_checker.acquire_connect_slot', side_effect=self.acquire_connect_slot), \
+                mock.patch('accounts.services.bulk_checker.has_pooled_client', return_value=False):
+            await asyncio.gather(
+                self.checker._check_one(1, make_account(1, 1), SESSION),
+                self.checker._check_one(2, make_account(2, 2), SESSION),
+            )
+
+        self.assertEqual(self.checked, [(2, True), (1, True)])
+
+    async def test_pooled_client_needs_no_token(self):
+        with mock.patch('accounts.services.bulk_checker.acquire_connect_slot') as acquire, \
+                mock.patch('accounts.services.bulk_checker.has_pooled_client', return_value=True):
+            await self.checker._check_one(1, make_account(1, 1), SESSION)
+
+        acquire.assert_not_called()
+        self.assertEqual(self.checked, [(1, False)])
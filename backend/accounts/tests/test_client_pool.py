@@ -0,0 +1,89 @@
+from unittest import IsolatedAsyncioTestCase
+
+from accounts.services.client_pool import TelegramClientPool
+
+
+class FakeClient:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def disconnect(self):
+        self.connected = False
+
+
+class ClientPoolTests(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.pool = TelegramClientPool(max_size=10, idle_ttl=300)
+        self.created = []
+
+    async def asyncTearDown(self):
+        await self.pool.close_all()
+        self.pool._reaper.cancel()
+
+    async def connect(self):
+        client = FakeClient()
+        self.created.append(client)
+        return client
+
+    async def test_discard_waits_for_other_users(self):
+        client = await self.pool.acquire('+7900', 'hash', self.connect)
+        self.assertIs(await self.pool.acquire('+7900', 'hash', self.connect), client)
+
+        await self.pool.release('+7900', client, discard=True)
+        self.assertTrue(client.is_connected())
+
+        # Новые операции получают новый клиент, старый остается у той, что еще работает
+        fresh = await self.pool.acquire('+7900', 'hash', self.connect)
+        self.assertIsNot(fresh, client)
+
+        await self.pool.release('+7900', client)
+        self.assertFalse(client.is_connected())
+        self.assertTrue(fresh.is_connected())
+        self.assertEqual(self.pool.metrics()['retired'], 0)
+
+    async def test_session_change_keeps_client_in_use(self):
+        old = await self.pool.acquire('+7900', 'old-hash', self.connect)
+
+        new = await self.pool.acquire('+7900', 'new-hash', self.connect)
+
+        self.assertIsNot(new, old)
+        self.assertTrue(old.is_connected())
+        await self.pool.release('+7900', old)
+        self.assertFalse(old.is_connected())
+        await self.pool.release('+7900', new)
+        self.assertTrue(new.is_connected())
+
+    async def test_idle_client_closed_at_once(self):
+        client = await self.pool.acquire('+7900', 'hash', self.connect)
+        await self.pool.release('+7900', client)
+
+        await self.pool.discard('+7900')
+
+        self.assertFalse(client.is_connected())
+
+    async def test_key_locks_removed_with_clients(self):
+        client = await self.pool.acquire('+7900', 'hash', self.connect)
+        self.assertIn('+7900', self.pool._key_locks)
+
+        await self.pool.release('+7900', client, discard=True)
+        self.assertEqual(self.pool._key_locks, {})
+
+        client = await self.pool.acquire('+7901', 'hash', self.connect)
+        await self.pool.release('+7901', client)
+        self.pool.idle_ttl = 0
+        await self.pool.evict_idle()
+        self.assertEqual(self.pool._key_locks, {})
+
+    async def test_failed_connect_leaves_no_lock(self):
+        async def fail():
+            raise ConnectionError('proxy down')
+
+        with self.assertRaises(ConnectionError):
+            await self.pool.acquire('+7900', 'hash', fail)
+
+        self.assertEqual(self.pool._key_locks, {})
+        self.assertEqual(self.pool.stats['connect_errors'], 1)
@@ -0,0 +1,52 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils.timezone import now
+
+from accounts.models import TelegramAccount
+from accounts.services.health_schedule import claim_due_accounts
+
+
+def ready_partition(accounts):
+    return [account_id for account_id, _ in accounts], {}
+
+
+class ClaimDueAccountsTests(TestCase):
+    """Просроченные проверки забираются по риску и давности активности, а не только по next_check_at"""
+    databases = {'default', 'telegram_db'}
+
+    def setUp(self):
+        patcher = mock.patch('accounts.services.health_schedule.FloodRegistry')
+        registry = patcher.start()
+        registry.return_value.partition.side_effect = ready_partition
+        self.addCleanup(patcher.stop)
+
+    def create(self, phone, overdue_hours, last_ping_days=None, activity_status='active'):
+        current = now()
+        return TelegramAccount.objects.using('telegram_db').create(
+            phone_number=phone,
+            account_status='active',
+            activity_status=activity_status,
+            last_ping=current - timedelta(days=last_ping_days) if last_ping_days is not None else None,
+            next_check_at=current - timedelta(hours=overdue_hours),
+        ).id
+
+    def test_risky_accounts_first(self):
+        # Самые просроченные - здоровые аккаунты, они должны идти последними
+        green = self.create('+79000000001', overdue_hours=10, last_ping_days=0)
+        yellow = self.create('+79000000002', overdue_hours=5, last_ping_days=3)
+        red_recent = self.create('+79000000003', overdue_hours=3, last_ping_days=8)
+        red_stale = self.create('+79000000004', overdue_hours=1, last_ping_days=30)
+        gray = self.create('+79000000005', overdue_hours=1)
+        dead = self.create('+79000000006', overdue_hours=1, last_ping_days=0, activity_status='dead')
+
+        due = [account_id for account_id, _ in claim_due_accounts(10)]
+
+        self.assertEqual(due, [dead, gray, red_stale, red_recent, yellow, green])
+
+    def test_limit_takes_riskiest(self):
+        self.create('+79000000001', overdue_hours=10, last_ping_days=0)
+        red = self.create('+79000000002', overdue_hours=1, last_ping_days=10)
+
+        self.assertEqual([account_id for account_id, _ in claim_due_accounts(1)], [red])
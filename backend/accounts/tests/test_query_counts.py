@@ -0,0 +1,227 @@
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+
+from accounts import tasks
+from accounts.models import AccountAuditLog, ProxyServer, SecurityCheck, TaskQueue, TaskQueueItem, TelegramAccount
+from accounts.services.fleet_check import build_fleet_summary
+from accounts.services.health_schedule import claim_due_accounts
+from accounts.services.progress import ProgressTracker
+
+
+def create_accounts(count, start=0, **fields):
+    """Аккаунты с собственным прокси: каждая строка списка тянет связанную запись"""
+    accounts = []
+    for number in range(start, start + count):
+        proxy = ProxyServer.objects.create(name=f'proxy-{number}', host=f'10.0.0.{number % 250}', port=1080)
+        accounts.append(TelegramAccount.objects.using('telegram_db').create(
+            phone_number=f'+7900{number:07d}',
+            employee_fio=f'Сотрудник {number}',
+            account_status='active',
+            proxy=proxy,
+            **fields
+        ))
+    return accounts
+
+
+def ready_partition(accounts):
+    """FloodRegistry.partition без Redis: ни один аккаунт не припаркован"""
+    return [account_id for account_id, _ in accounts], {}
+
+
+class QueryCountTestCase(TestCase):
+    """
+    Число запросов не должно зависеть от числа строк. Redis в тестах не нужен:
+    кеш списков и оценка количества строк подменены, чтобы считались только запросы к БД.
+    """
+    databases = {'default', 'telegram_db'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for target, value in (
+            ('accounts.views.response_cache.lookup', (None, None)),
+            ('accounts.views.estimated_count', 0),
+            ('accounts.pagination.estimated_count', 0),
+        ):
+            patcher = mock.patch(target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params, secure=True)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def count_queries(self, func):
+        with CaptureQueriesContext(connections['telegram_db']) as context:
+            func()
+        return len(context.captured_queries)
+
+    def assertQueriesConstant(self, func, add_rows, expected):
+        """expected запросов и до, и после добавления строк (add_rows)"""
+        self.assertEqual(self.count_queries(func), expected)
+        add_rows()
+        self.assertEqual(self.count_queries(func), expected)
+
+
+class ListQueryCountTests(QueryCountTestCase):
+
+    def test_account_list(self):
+        create_accounts(2)
+        url = reverse('account-list')
+        self.assertQueriesConstant(lambda: self.get(url), lambda: create_accounts(10, start=2), 1)
+
+    def test_account_list_page(self):
+        create_accounts(2)
+        url = reverse('account-list')
+        self.assertQueriesConstant(
+            lambda: self.get(url, limit=50, fields='id,phone_number,proxy_details'),
+            lambda: create_accounts(10, start=2),
+            1
+        )
+
+    def test_account_search(self):
+        create_accounts(2)
+        url = reverse('account-list')
+        self.assertQueriesConstant(lambda: self.get(url, search='Сотрудник'), lambda: create_accounts(10, start=2), 1)
+
+    def test_audit_logs(self):
+        def add_logs(count):
+            for account in create_accounts(count, start=TelegramAccount.objects.using('telegram_db').count()):
+                AccountAuditLog.objects.using('telegram_db').create(account=account, action_type='check')
+
+        add_logs(2)
+        url = reverse('audit-log-list')
+        # Агрегаты для ETag/Last-Modified и сам список
+        self.assertQueriesConstant(lambda: self.get(url), lambda: add_logs(10), 2)
+
+    def test_security_alerts(self):
+        def add_alerts(count):
+            for account in create_accounts(count, start=TelegramAccount.objects.using('telegram_db').count()):
+                SecurityCheck.objects.using('telegram_db').create(
+                    account=account, has_security_alert=True, alert_message='Новая сессия', last_security_check=now()
+                )
+
+        add_alerts(2)
+        url = reverse('security-alerts')
+        self.assertQueriesConstant(lambda: self.get(url), lambda: add_alerts(10), 1)
+
+
+class TaskQueryCountTests(QueryCountTestCase):
+
+    def add_tasks(self, count):
+        for account in create_accounts(count, start=TelegramAccount.objects.using('telegram_db').count()):
+            TaskQueue.objects.create(task_type='check', account=account, account_ids=[account.id])
+
+    def test_task_list(self):
+        self.add_tasks(2)
+        url = reverse('task-list')
+        self.assertQueriesConstant(lambda: self.get(url), lambda: self.add_tasks(10), 2)
+
+    def test_task_items(self):
+        accounts = create_accounts(2)
+        task = TaskQueue.objects.create(task_type='bulk_check', account_ids=[account.id for account in accounts])
+
+        def add_items(count):
+            for account in create_accounts(count, start=TelegramAccount.objects.using('telegram_db').count()):
+                TaskQueueItem.objects.create(task=task, account=account, status='success', finished_at=now())
+
+        add_items(2)
+        url = reverse('task-items', args=[task.id])
+        # Агрегаты для ETag и страница результатов
+        self.assertQueriesConstant(lambda: self.get(url), lambda: add_items(10), 2)
+
+
+class BulkSchedulingQueryCountTests(QueryCountTestCase):
+
+    def test_claim_due_accounts(self):
+        create_accounts(2, next_check_at=now() - timedelta(hours=1))
+
+        def claim():
+            # Забранные аккаунты переносятся вперед, поэтому каждый раз снова делаем их просроченными
+            TelegramAccount.objects.using('telegram_db').update(next_check_at=now() - timedelta(hours=1))
+            with CaptureQueriesContext(connections['telegram_db']) as context:
+                due = claim_due_accounts(100)
+            self.assertEqual(len(due), TelegramAccount.objects.using('telegram_db').count())
+            return len(context.captured_queries)
+
+        with mock.patch('accounts.services.health_schedule.FloodRegistry') as registry:
+            registry.return_value.partition.side_effect = ready_partition
+            # SAVEPOINT, выборка с блокировкой, один UPDATE на пачку, RELEASE SAVEPOINT
+            self.assertEqual(claim(), 4)
+            create_accounts(10, start=2)
+            self.assertEqual(claim(), 4)
+
+    def test_schedule_fleet_check(self):
+        create_accounts(2)
+
+        with mock.patch('accounts.tasks.FloodRegistry') as registry, mock.patch('accounts.tasks.chord') as chord:
+            registry.return_value.partition.side_effect = ready_partition
+            chord.return_value.return_value.id = 'chord-id'
+            # Выборка активных, создание задачи, статус processing, id задачи Celery
+            self.assertQueriesConstant(
+                lambda: tasks.schedule_fleet_check({'scheduled': True}),
+                lambda: create_accounts(10, start=2),
+                4
+            )
+
+    def test_bulk_action(self):
+        url = reverse('bulk-action')
+
+        def post(accounts):
+            payload = {'account_ids': [account.id for account in accounts], 'action': 'check'}
+            with CaptureQueriesContext(connections['telegram_db']) as context:
+                response = self.client.post(url, payload, format='json', secure=True)
+            self.assertEqual(response.status_code, 200, response.content)
+            return len(context.captured_queries)
+
+        with mock.patch('accounts.views.dispatch_bulk_check'):
+            # Проверка существования аккаунтов одним COUNT и создание задачи
+            self.assertEqual(post(create_accounts(2)), 2)
+            self.assertEqual(post(create_accounts(10, start=2)), 2)
+
+    def test_progress_flush(self):
+        accounts = create_accounts(12)
+        task = TaskQueue.objects.create(task_type='bulk_check', account_ids=[account.id for account in accounts])
+        tracker = ProgressTracker(
+            task, len(accounts), flush_interval=3600, flush_items=1000, redis_client=mock.MagicMock(), shared=False
+        )
+        tracker._get_redis().pipeline.return_value.execute = mock.AsyncMock()
+
+        def record_and_flush(batch):
+            async def run():
+                for account in batch:
+                    await tracker.record({'account_id': account.id, 'result': {'status': 'success'}})
+                await tracker.flush()
+
+            return self.count_queries(lambda: async_to_sync(run)())
+
+        # SAVEPOINT, одна вставка результатов пачкой, UPDATE задачи, RELEASE SAVEPOINT
+        self.assertEqual(record_and_flush(accounts[:2]), 4)
+        self.assertEqual(record_and_flush(accounts[2:]), 4)
+        self.assertEqual(TaskQueueItem.objects.filter(task=task).count(), 12)
+
+    def test_fleet_summary(self):
+        accounts = create_accounts(2)
+        task = TaskQueue.objects.create(task_type='bulk_check', account_ids=[account.id for account in accounts])
+
+        def add_items(count):
+            for account in create_accounts(count, start=TelegramAccount.objects.using('telegram_db').count()):
+                TaskQueueItem.objects.create(task=task, account=account, status='error', finished_at=now())
+
+        add_items(2)
+        # Исходы, время, прокси с ошибками, статусы аккаунтов, угрозы
+        self.assertQueriesConstant(lambda: build_fleet_summary(task), lambda: add_items(10), 5)
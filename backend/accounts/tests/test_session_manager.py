@@ -0,0 +1,54 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.utils.timezone import now
+
+from accounts.models import AccountAuditLog, GlobalAppSettings, TelegramAccount
+from accounts.services.session_manager import SessionManager
+
+
+class SaveAccountSessionTests(TestCase):
+    """Аккаунт, созданный сырым INSERT, должен получить значения по умолчанию из БД"""
+    databases = {'default', 'telegram_db'}
+
+    @classmethod
+    def setUpTestData(cls):
+        GlobalAppSettings.objects.create(api_id=12345, api_hash='0123456789abcdef')
+
+    def setUp(self):
+        patcher = mock.patch('accounts.services.session_manager.bump_generation')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.manager = SessionManager()
+
+    def test_creates_account(self):
+        saved = self.manager.save_account_session(
+            phone_number='+79001234567',
+            session_data=b'c2Vzc2lvbg==',
+            employee_fio='Иванов Иван',
+            account_status='active',
+        )
+
+        self.assertTrue(saved)
+        account = TelegramAccount.objects.using('telegram_db').get(phone_number='+79001234567')
+        self.assertEqual(account.account_status, 'active')
+        # Первая плановая проверка - сразу, значение ставит DEFAULT столбца
+        self.assertLessEqual(account.next_check_at, now())
+        self.assertTrue(AccountAuditLog.objects.using('telegram_db').filter(account=account, action_type='session_saved').exists())
+
+        data = self.manager.load_account_session('+79001234567')
+        self.assertEqual(data['session_data'], b'c2Vzc2lvbg==')
+        self.assertEqual(data['api_id'], 12345)
+
+    def test_updates_existing_account(self):
+        self.manager.save_account_session(phone_number='+79001234567', account_status='pending')
+        account = TelegramAccount.objects.using('telegram_db').get(phone_number='+79001234567')
+
+        saved = self.manager.save_account_session(
+            phone_number='+79001234567', session_data=b'bmV3', account_status='active'
+        )
+
+        self.assertTrue(saved)
+        account.refresh_from_db()
+        self.assertEqual(account.account_status, 'active')
+        self.assertEqual(TelegramAccount.objects.using('telegram_db').filter(phone_number='+79001234567').count(), 1)
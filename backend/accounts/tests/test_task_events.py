@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.services.task_events import astream_task_events
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+class AsyncStreamTests(SimpleTestCase):
+
+    async def test_streams_snapshot_and_events(self):
+        pubsub = mock.MagicMock()
+        pubsub.subscribe = mock.AsyncMock()
+        messages = iter([{'data': '{"id": 1}'}])
+        pubsub.get_message = mock.AsyncMock(side_effect=lambda timeout: next(messages, None))
+        pubsub.aclose = mock.AsyncMock()
+        client = mock.MagicMock()
+        client.pubsub.return_value = pubsub
+        client.aclose = mock.AsyncMock()
+
+        with mock.patch('accounts.services.task_events.aioredis.Redis.from_url', return_value=client):
+            chunks = await collect(astream_task_events([{'id': 1}], duration=0.05, heartbeat=0.01))
+
+        self.assertEqual(chunks[0], 'retry: 3000\n\n')
+        self.assertEqual(chunks[1], 'event: snapshot\ndata: [{"id": 1}]\n\n')
+        self.assertEqual(chunks[2], 'event: task\ndata: {"id": 1}\n\n')
+        self.assertIn(': ping\n\n', chunks[3:])
+        pubsub.aclose.assert_awaited_once()
+        client.aclose.assert_awaited_once()
+
+
+class TaskEventsViewTests(TestCase):
+    """Под ASGI поток не должен быть синхронным генератором, который Django дочитывает в пуле потоков"""
+    databases = {'default', 'telegram_db'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def test_wsgi_stream_is_sync(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch('accounts.views.stream_task_events', return_value=iter(['retry: 3000\n\n'])) as stream:
+            response = client.get(reverse('task-events'), secure=True, HTTP_ACCEPT='text/event-stream')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.is_async)
+        stream.assert_called_once()
+
+    async def test_asgi_stream_is_async(self):
+        async def stream(snapshot, duration):
+            yield 'retry: 3000\n\n'
+
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        with mock.patch('accounts.views.astream_task_events', side_effect=stream) as astream:
+            response = await client.get(reverse('task-events'), secure=True, headers={'Accept': 'text/event-stream'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        self.assertEqual([chunk async for chunk in response.streaming_content], [b'retry: 3000\n\n'])
+        astream.assert_called_once()
@@ -0,0 +1,120 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts import tasks
+from accounts.models import TaskQueue, TaskQueueItem, TelegramAccount
+from accounts.services.progress import ProgressTracker
+
+
+def make_tracker(task, total, **kwargs):
+    """Трекер без Redis: счетчики в Redis только для наблюдения со стороны"""
+    tracker = ProgressTracker(task, total, flush_interval=3600, flush_items=1000, redis_client=mock.MagicMock(), **kwargs)
+    tracker._get_redis().pipeline.return_value.execute = mock.AsyncMock()
+    return tracker
+
+
+class TaskItemsTestCase(TestCase):
+    databases = {'default', 'telegram_db'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        accounts = TelegramAccount.objects.using('telegram_db')
+        cls.flood = accounts.create(phone_number='+79000000001', account_status='active')
+        cls.ok = accounts.create(phone_number='+79000000002', account_status='active')
+        cls.task = TaskQueue.objects.create(task_type='bulk_check', account_ids=[cls.flood.id, cls.ok.id])
+
+
+class FloodOutcomeTests(TaskItemsTestCase):
+
+    def record(self, tracker, *items):
+        async def run():
+            for item in items:
+                await tracker.record(item)
+            await tracker.flush()
+
+        async_to_sync(run)()
+
+    @mock.patch('accounts.views.dispatch_bulk_check')
+    def test_flood_result_parked_and_retried(self, dispatch):
+        tracker = make_tracker(self.task, 2)
+        self.record(
+            tracker,
+            {'account_id': self.flood.id, 'result': {'status': 'flood', 'message': 'FloodWait', 'wait_seconds': 60}},
+            {'account_id': self.ok.id, 'result': {'status': 'success'}},
+        )
+
+        item = TaskQueueItem.objects.get(task=self.task, account=self.flood)
+        self.assertEqual(item.status, 'parked')
+        self.assertEqual(item.outcome['wait_seconds'], 60)
+        self.assertEqual(tracker.snapshot(), {'total': 2, 'done': 2, 'parked': 1, 'success': 1})
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(reverse('task-retry-failed', args=[self.task.id]), secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['account_count'], 1)
+        retry_task = TaskQueue.objects.get(id=response.data['task_id'])
+        self.assertEqual(retry_task.account_ids, [self.flood.id])
+        dispatch.assert_called_once_with([self.flood.id], retry_task.id)
+
+
+class ProgressFlushTests(TaskItemsTestCase):
+
+    def test_failed_write_keeps_items(self):
+        tracker = make_tracker(self.task, 2)
+        tracker.flush_items = 1
+
+        with mock.patch.object(tracker, '_persist', side_effect=ConnectionError('db down')):
+            # Сброс из record не прерывает проверку, результат остается в буфере
+            async_to_sync(tracker.record)({'account_id': self.flood.id, 'result': {'status': 'success'}})
+        self.assertEqual(TaskQueueItem.objects.filter(task=self.task).count(), 0)
+
+        async_to_sync(tracker.record)({'account_id': self.ok.id, 'result': {'status': 'success'}})
+
+        self.assertEqual(
+            set(TaskQueueItem.objects.filter(task=self.task).values_list('account_id', flat=True)),
+            {self.flood.id, self.ok.id}
+        )
+        self.assertEqual(tracker._pending, [])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.result['done'], 2)
+
+
+class FakeChecker:
+    """BulkChecker с заранее заданными исходами вместо проверок через Telegram"""
+    results = {}
+
+    def __init__(self, on_result, **kwargs):
+        self.on_result = on_result
+
+    async def run(self, account_ids):
+        for account_id in account_ids:
+            await self.on_result({'account_id': account_id, 'result': self.results[account_id]})
+
+
+class BulkCheckSummaryTests(TaskItemsTestCase):
+
+    def test_flood_not_counted_as_completed(self):
+        FakeChecker.results = {
+            self.flood.id: {'status': 'flood', 'message': 'FloodWait', 'wait_seconds': 60},
+            self.ok.id: {'status': 'success'},
+        }
+        cancel_token = mock.Mock(cancelled=False, is_cancelled=mock.AsyncMock(return_value=False))
+
+        with mock.patch('accounts.tasks.BulkChecker', FakeChecker), \
+                mock.patch('accounts.tasks.ProgressTracker', make_tracker), \
+                mock.patch('accounts.tasks.CancellationToken', return_value=cancel_token):
+            result = async_to_sync(tasks.run_bulk_check)(None, self.task.id)
+
+        self.assertEqual(result['completed'], 1)
+        self.assertEqual(result['parked'], 1)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'completed')
+        self.assertEqual(self.task.result['completed'], 1)
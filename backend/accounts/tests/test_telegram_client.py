@@ -0,0 +1,43 @@
+import warnings
+
+from django.test import SimpleTestCase
+from telethon.network import ConnectionTcpFull, ConnectionTcpMTProxyRandomizedIntermediate
+
+from accounts.models import ProxyServer, TelegramAccount
+from accounts.services.telegram_actions import build_account_client
+
+ACCOUNT_DATA = {'session_data': memoryview(b''), 'api_id': 12345, 'api_hash': '0123456789abcdef'}
+
+
+class BuildAccountClientTests(SimpleTestCase):
+
+    def build(self, **account_fields):
+        with warnings.catch_warnings():
+            # Без python-socks Telethon предупреждает, что прокси не будет использован
+            warnings.simplefilter('ignore')
+            return build_account_client(TelegramAccount(phone_number='+79001234567', **account_fields), ACCOUNT_DATA)
+
+    def test_device_params(self):
+        client = self.build(device_params={'device_model': 'Pixel 8', 'lang_code': 'en'})
+
+        self.assertEqual(client.api_id, 12345)
+        self.assertEqual(client._init_request.device_model, 'Pixel 8')
+        self.assertEqual(client._init_request.lang_code, 'en')
+        self.assertIs(client._connection, ConnectionTcpFull)
+        self.assertIsNone(client._proxy)
+
+    def test_socks_proxy(self):
+        proxy = ProxyServer(name='socks', host='10.0.0.1', port=1080, proxy_type='socks5', username='user', password='secret')
+
+        client = self.build(proxy=proxy)
+
+        self.assertIs(client._connection, ConnectionTcpFull)
+        self.assertEqual(client._proxy, ('socks5', '10.0.0.1', 1080, 'user', 'secret'))
+
+    def test_mtproto_proxy(self):
+        proxy = ProxyServer(name='mtproxy', host='10.0.0.2', port=443, proxy_type='mtproto', password='dd' + '0' * 32)
+
+        client = self.build(proxy=proxy)
+
+        self.assertIs(client._connection, ConnectionTcpMTProxyRandomizedIntermediate)
+        self.assertEqual(client._proxy, ('10.0.0.2', 443, 'dd' + '0' * 32))
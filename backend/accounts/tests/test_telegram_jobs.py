@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+class TelegramJobOwnerTests(TestCase):
+    """Результат задания с Telegram отдается только тому, кто его поставил"""
+    databases = {'default', 'telegram_db'}
+
+    @classmethod
+    def setUpTestData(cls):
+        users = get_user_model().objects
+        cls.admin = users.create_superuser('admin', 'admin@example.com', 'password')
+        cls.other_admin = users.create_superuser('other', 'other@example.com', 'password')
+
+    def setUp(self):
+        # Состояние заданий вместо Redis
+        self.states = {}
+        for target, side_effect in (
+            ('accounts.tasks.create_action', self.create_action),
+            ('accounts.views.get_action_state', self.states.get),
+            ('accounts.tasks.telegram_action_task.apply_async', None),
+        ):
+            patcher = mock.patch(target, side_effect=side_effect)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def create_action(self, job_id, action, owner_id):
+        self.states[job_id] = {'status': 'pending', 'action': action, 'owner_id': owner_id}
+
+    def send_code(self, client):
+        response = client.post(
+            reverse('send-code'), {'phone_number': '+79001234567'}, format='json', secure=True
+        )
+        self.assertEqual(response.status_code, 202)
+        return response.data['result_url']
+
+    def get_result(self, client, url):
+        return client.get(url, secure=True).status_code
+
+    def test_anonymous_job_bound_to_session(self):
+        client = APIClient()
+        url = self.send_code(client)
+
+        self.assertEqual(self.get_result(client, url), 202)
+        self.assertEqual(self.get_result(APIClient(), url), 404)
+
+        other_session = APIClient()
+        self.send_code(other_session)
+        self.assertEqual(self.get_result(other_session, url), 404)
+
+        logged_in = APIClient()
+        logged_in.force_authenticate(self.admin)
+        self.assertEqual(self.get_result(logged_in, url), 404)
+
+    def test_user_job_bound_to_user(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post(reverse('delete-session', args=[1]), secure=True)
+        self.assertEqual(response.status_code, 202)
+        url = response.data['result_url']
+
+        self.assertEqual(self.get_result(client, url), 202)
+        self.assertEqual(self.get_result(APIClient(), url), 404)
+
+        other = APIClient()
+        other.force_authenticate(self.other_admin)
+        self.assertEqual(self.get_result(other, url), 404)
+
+    def test_job_without_owner_not_readable(self):
+        self.states['legacy'] = {'status': 'done', 'action': 'send_code', 'owner_id': None, 'http_status': 200, 'body': {}}
+
+        self.assertEqual(self.get_result(APIClient(), reverse('telegram-job', args=['legacy'])), 404)
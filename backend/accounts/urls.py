@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     # Account management
     path('accounts/', views.TelegramAccountList.as_view(), name='account-list'),
+    path('accounts/changes/', views.AccountChangesView.as_view(), name='account-changes'),
     path('accounts/<int:pk>/', views.TelegramAccountDetail.as_view(), name='account-detail'),
     path('accounts/<int:pk>/reclaim/', views.ReclaimAccountView.as_view(), name='account-reclaim'),
     path('accounts/<int:pk>/change-password/', views.ChangePasswordView.as_view(), name='change-password'),
@@ -29,6 +30,15 @@ urlpatterns = [
     # Security alerts
     path('security-alerts/', views.SecurityAlertsView.as_view(), name='security-alerts'),
     
+    # FloodWait
+    path('flood-status/', views.FloodStatusView.as_view(), name='flood-status'),
+    
+    # Telegram connection pool
+    path('telegram-pool/metrics/', views.TelegramPoolMetricsView.as_view(), name='telegram-pool-metrics'),
+    
+    # Telegram actions executed outside the request
+    path('telegram-jobs/<str:job_id>/', views.TelegramJobView.as_view(), name='telegram-job'),
+
     # Auth check
     path('auth/check/', views.AuthCheckView.as_view(), name='auth-check'),
     
@@ -37,7 +47,10 @@ urlpatterns = [
     
     # Task queue
     path('tasks/', views.TaskQueueList.as_view(), name='task-list'),
+    path('tasks/events/', views.TaskEventsView.as_view(), name='task-events'),
     path('tasks/<int:pk>/', views.TaskQueueDetail.as_view(), name='task-detail'),
+    path('tasks/<int:pk>/items/', views.TaskQueueItemList.as_view(), name='task-items'),
+    path('tasks/<int:pk>/retry-failed/', views.RetryFailedItemsView.as_view(), name='task-retry-failed'),
     path('tasks/<int:pk>/cancel/', views.CancelTaskView.as_view(), name='cancel-task'),
     path('tasks/bulk-action/', views.BulkActionView.as_view(), name='bulk-action'),
     
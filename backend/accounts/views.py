@@ -1,23 +1,44 @@
-from rest_framework import generics, permissions, status
+import hashlib
+import json
+import time
+
+from rest_framework import generics, mixins, permissions, renderers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from adrf import generics as async_generics
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.middleware.csrf import get_token
+from django.urls import reverse
 from django.db import transaction
+from django.db.models import Avg, Count, Max, Min
+from celery.utils import uuid
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
 from django.utils.timezone import now
-from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from datetime import timedelta
 
-from .models import TelegramAccount, AccountAuditLog, GlobalAppSettings, TaskQueue, ProxyServer
+from .models import TelegramAccount, AccountTombstone, AccountAuditLog, SecurityCheck, GlobalAppSettings, TaskQueue, TaskQueueItem, ProxyServer
 from .serializers import (
-    TelegramAccountSerializer, AccountAuditLogSerializer,
-    GlobalAppSettingsSerializer, TaskQueueSerializer,
+    TelegramAccountSerializer, AccountAuditLogSerializer, SecurityAlertSerializer,
+    GlobalAppSettingsSerializer, TaskQueueSerializer, TaskQueueItemSerializer,
     ProxyServerSerializer, BulkActionSerializer, DeviceParamsSerializer
 )
-from .services import change_password, send_code, verify_code, delete_session, get_account_details, reclaim_account, check_api_credentials, reauthorize_account, verify_reauthorization
-from .tasks import check_account_task, bulk_check_accounts_task, reauthorize_account_task, reclaim_account_task
+from .pagination import AccountChangesPagination, KeysetPagination, SecurityAlertPagination, TaskItemPagination, estimated_count
+from .services import response_cache
+from .services.flood_registry import FloodRegistry
+from .services.client_pool import collect_pool_metrics
+from .services.account_search import search_accounts
+from .services.task_events import astream_task_events, stream_task_events, task_event
+from .services.telegram_jobs import get_action_state
+from .tasks import cancel_task, check_account_task, dispatch_bulk_check, dispatch_telegram_action, reauthorize_account_task, reclaim_account_task
 
 
 class IsSuperUser(permissions.BasePermission):
@@ -25,21 +46,163 @@ class IsSuperUser(permissions.BasePermission):
         return bool(request.user and request.user.is_superuser)
 
 
-class TelegramAccountList(generics.ListAPIView):
+class AsyncListAPIView(async_generics.ListAPIView):
+    """
+    Список с async-обработчиком: страница читается async-запросами ORM, и под ASGI (uvicorn)
+    ожидание БД не держит воркер. Аутентификация и права проверяются как в обычных view.
+    Под WSGI Django выполняет тот же обработчик через async_to_sync.
+    """
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            if page is not None:
+                # Связанные объекты загружены select_related, сериализация не ходит в БД
+                return self.paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+
+        objects = [obj async for obj in queryset]
+        return Response(self.get_serializer(objects, many=True).data)
+
+
+class ConditionalGetBase:
+    """
+    Валидаторы условного GET для списка или объекта: MAX и MIN по last_modified_field и COUNT
+    по тому же queryset, что и ответ, - один агрегат по индексу вместо сериализации.
+    COUNT и MIN замечают удаления и сдвиг среза, которые не меняют максимум.
+    """
+    last_modified_field = 'updated_at'
+    # Если ответ зависит от текущего времени (health_indicator), ETag меняется не реже раза за период
+    validator_period = None
+
+    def get_validator_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if isinstance(self, mixins.RetrieveModelMixin):
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_validator_aggregates(self):
+        return {
+            'last_modified': Max(self.last_modified_field),
+            'first_modified': Min(self.last_modified_field),
+            'count': Count('pk'),
+        }
+
+    def get_validators(self, aggregates):
+        """ETag и время Last-Modified (или None); (None, None), если объектов нет"""
+        if not aggregates['count']:
+            return None, None
+        last_modified = aggregates['last_modified']
+        parts = [self.request.get_full_path(), self.request.accepted_renderer.format, *sorted(aggregates.items())]
+        if self.validator_period:
+            parts.append(int(time.time() // self.validator_period))
+            last_modified = None
+        etag = '"' + hashlib.sha1('|'.join(map(str, parts)).encode('utf-8')).hexdigest() + '"'
+        return etag, last_modified.timestamp() if last_modified else None
+
+    def conditional_response(self, request, etag, last_modified):
+        if etag is None:
+            return None
+        return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    def set_validators(self, response, etag, last_modified):
+        # Валидаторы считаются до ответа: если данные изменились в промежутке,
+        # следующий запрос просто получит полный ответ
+        if etag is not None and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class ConditionalGetMixin(ConditionalGetBase):
+    """Условный GET (ETag/Last-Modified, 304) для синхронных list/retrieve view"""
+
+    def get(self, request, *args, **kwargs):
+        aggregates = self.get_validator_queryset().aggregate(**self.get_validator_aggregates())
+        etag, last_modified = self.get_validators(aggregates)
+        response = self.conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        return self.set_validators(super().get(request, *args, **kwargs), etag, last_modified)
+
+
+class AsyncConditionalGetMixin(ConditionalGetBase):
+    """Условный GET для async-списков (AsyncListAPIView)"""
+
+    async def get(self, request, *args, **kwargs):
+        aggregates = await self.get_validator_queryset().aaggregate(**self.get_validator_aggregates())
+        etag, last_modified = self.get_validators(aggregates)
+        response = self.conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        return self.set_validators(await super().get(request, *args, **kwargs), etag, last_modified)
+
+
+class CachedListMixin:
+    """
+    Готовый JSON списка хранится в Redis по пути и параметрам запроса, пока данные не изменятся
+    (поколение кеша сдвигают сигналы сохранения, см. services.response_cache).
+    По ETag/If-None-Match неизменившийся список отдается как 304 без тела.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        key, cached = await sync_to_async(response_cache.lookup, thread_sensitive=False)(request)
+        if cached:
+            etag, body = cached['etag'], cached['body'].encode('utf-8')
+        else:
+            response = await self.alist(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            body = renderers.JSONRenderer().render(response.data)
+            etag = response_cache.make_etag(body)
+            if key:
+                await sync_to_async(response_cache.store, thread_sensitive=False)(key, etag, body)
+
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        # Браузер каждый раз сверяет ETag, а не берет список из своего кеша
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class TelegramAccountList(CachedListMixin, AsyncListAPIView):
     serializer_class = TelegramAccountSerializer
     permission_classes = [IsSuperUser]
+    pagination_class = KeysetPagination
+    # Поля, по которым возможна keyset-пагинация, и их тип для курсора
+    keyset_fields = {
+        'last_ping': 'datetime',
+        'last_checked': 'datetime',
+        'created_at': 'datetime',
+        'updated_at': 'datetime',
+        'phone_number': 'string',
+        'employee_fio': 'string',
+        'employee_id': 'string',
+        'id': 'integer',
+    }
+
+    def get_sort_field(self):
+        return self.request.query_params.get('sort_by', '-last_ping')
 
     def get_queryset(self):
-        queryset = TelegramAccount.objects.using('telegram_db').all()
+        queryset = TelegramAccount.objects.using('telegram_db').select_related('proxy')
+        
+        # Тяжелый JSON device_params не читаем, если он не запрошен в fields
+        requested_fields = self.request.query_params.get('fields')
+        if requested_fields and 'device_params' not in requested_fields.split(','):
+            queryset = queryset.defer('device_params')
         
         # Поиск
         search_term = self.request.query_params.get('search')
         if search_term:
-            queryset = queryset.filter(
-                Q(phone_number__icontains=search_term) |
-                Q(employee_id__icontains=search_term) |
-                Q(employee_fio__icontains=search_term)
-            )
+            queryset = search_accounts(queryset, search_term)
         
         # Фильтрация по статусу
         status_filter = self.request.query_params.get('status')
@@ -60,16 +223,76 @@ class TelegramAccountList(generics.ListAPIView):
         if last_ping_to:
             queryset = queryset.filter(last_ping__lte=last_ping_to)
         
-        # Сортировка по последней активности
-        sort_by = self.request.query_params.get('sort_by', '-last_ping')
-        queryset = queryset.order_by(sort_by)
+        # Сортировка по последней активности; результаты поиска без явной
+        # сортировки и без пагинации - по релевантности
+        params = self.request.query_params
+        if search_term and 'search_rank' in queryset.query.annotations and not (
+            'sort_by' in params or 'limit' in params or 'cursor' in params
+        ):
+            queryset = queryset.order_by('-search_rank', self.get_sort_field())
+        else:
+            queryset = queryset.order_by(self.get_sort_field())
         
         return queryset
 
 
-class TelegramAccountDetail(generics.RetrieveUpdateAPIView):
+
+class AccountChangesView(AsyncListAPIView):
+    """
+    Изменения списка аккаунтов после курсора since: новые и измененные аккаунты (results)
+    и id удаленных (deleted). Без since - весь список постранично, для первой загрузки.
+    Клиент применяет results как upsert, затем убирает deleted и передает cursor в следующий
+    запрос; пока has_more, следующую страницу нужно запросить сразу.
+    """
     serializer_class = TelegramAccountSerializer
     permission_classes = [IsSuperUser]
+    pagination_class = AccountChangesPagination
+    keyset_fields = {'updated_at': 'datetime'}
+    # Запас на изменения, записанные с более ранним updated_at, но закоммиченные после ответа
+    changes_overlap = timedelta(seconds=5)
+
+    def get_sort_field(self):
+        return 'updated_at'
+
+    def get_queryset(self):
+        queryset = TelegramAccount.objects.using('telegram_db').select_related('proxy')
+        requested_fields = self.request.query_params.get('fields')
+        if requested_fields and 'device_params' not in requested_fields.split(','):
+            queryset = queryset.defer('device_params')
+        return queryset
+
+    async def alist(self, request, *args, **kwargs):
+        page = await self.paginator.apaginate_queryset(self.get_queryset(), request, view=self)
+
+        deleted = []
+        if self.paginator.position:
+            since = self.paginator.position[0]
+            if since < now() - timedelta(days=settings.ACCOUNT_TOMBSTONE_RETENTION_DAYS):
+                return Response(
+                    {'error': 'Курсор старше срока хранения удалений, нужна полная загрузка без since'},
+                    status=status.HTTP_410_GONE
+                )
+            deleted = [
+                account_id async for account_id in AccountTombstone.objects.using('telegram_db')
+                .filter(deleted_at__gte=since).values_list('account_id', flat=True)
+            ]
+
+        return Response({
+            'results': self.get_serializer(page, many=True).data,
+            'deleted': deleted,
+            'cursor': self.paginator.get_cursor(),
+            'has_more': self.paginator.has_next,
+        })
+
+class TelegramAccountDetail(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
+    serializer_class = TelegramAccountSerializer
+    permission_classes = [IsSuperUser]
+    # health_indicator зависит от текущего времени: как и кеш списка, не дольше RESPONSE_CACHE_TTL
+    validator_period = settings.RESPONSE_CACHE_TTL
+
+    def get_validator_aggregates(self):
+        # В ответе есть proxy_details, изменение прокси не двигает updated_at аккаунта
+        return {**super().get_validator_aggregates(), 'proxy_modified': Max('proxy__updated_at')}
 
     def get_queryset(self):
         return TelegramAccount.objects.using('telegram_db').all()
@@ -110,12 +333,13 @@ class TelegramAccountDetail(generics.RetrieveUpdateAPIView):
         return Response(serializer.data)
 
 
-class AuditLogList(generics.ListAPIView):
+class AuditLogList(AsyncConditionalGetMixin, AsyncListAPIView):
     serializer_class = AccountAuditLogSerializer
     permission_classes = [IsSuperUser]
+    last_modified_field = 'created_at'
 
     def get_queryset(self):
-        queryset = AccountAuditLog.objects.using('telegram_db').all()
+        queryset = AccountAuditLog.objects.using('telegram_db').select_related('account')
         
         # Фильтрация по аккаунту
         account_id = self.request.query_params.get('account_id')
@@ -125,6 +349,51 @@ class AuditLogList(generics.ListAPIView):
         return queryset.order_by('-created_at')[:100]
 
 
+def job_owner(request, create=True):
+    """
+    Владелец задания с Telegram: пользователь, а при регистрации без входа - сессия браузера.
+    Результат задания отдается только владельцу, поэтому анонимному запросу заводится сессия.
+    """
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    if not request.session.session_key:
+        if not create:
+            return None
+        # Пустая сессия не сохраняется и не попадает в cookie
+        request.session['telegram_jobs'] = True
+        request.session.save()
+    return f'session:{request.session.session_key}'
+
+
+def telegram_job_response(job_id):
+    """202 с id задания: результат действия с Telegram забирается по result_url"""
+    return Response(
+        {'job_id': job_id, 'status': 'pending', 'result_url': reverse('telegram-job', args=[job_id])},
+        status=status.HTTP_202_ACCEPTED
+    )
+
+
+class TelegramJobView(APIView):
+    """
+    Результат действия с Telegram, поставленного в очередь: 202, пока действие выполняется,
+    затем тот же статус и ответ, что раньше отдавал синхронный view.
+    Результат доступен только автору: пользователю или, для регистрации без входа, сессии браузера.
+    """
+    permission_classes = []
+
+    def get(self, request, job_id):
+        state = get_action_state(job_id)
+        owner = job_owner(request, create=False)
+        if state is None or owner is None or state.get('owner_id') != owner:
+            return Response(
+                {'error': 'Задание не найдено или его результат устарел'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if state['status'] == 'pending':
+            return Response({'job_id': job_id, 'status': 'pending'}, status=status.HTTP_202_ACCEPTED)
+        return Response(state['body'], status=state['http_status'])
+
+
 class ChangePasswordView(APIView):
     permission_classes = [IsSuperUser]
 
@@ -136,10 +405,11 @@ class ChangePasswordView(APIView):
             if not new_password:
                 new_password = None
                 
-            result = change_password(pk, old_password if old_password else None, new_password)
-            if isinstance(result, dict) and 'error' in result:
-                return Response(result, status=status.HTTP_400_BAD_REQUEST)
-            return Response({'message': result})
+            job_id = dispatch_telegram_action(
+                'change_password', job_owner(request),
+                account_id=pk, old_password=old_password if old_password else None, new_password=new_password
+            )
+            return telegram_job_response(job_id)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -149,10 +419,8 @@ class DeleteSessionView(APIView):
 
     def post(self, request, pk):
         try:
-            result = delete_session(pk)
-            if isinstance(result, dict) and 'error' in result:
-                return Response(result, status=status.HTTP_400_BAD_REQUEST)
-            return Response({'message': result})
+            job_id = dispatch_telegram_action('delete_session', job_owner(request), account_id=pk)
+            return telegram_job_response(job_id)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -162,10 +430,8 @@ class GetAccountDetailsView(APIView):
 
     def get(self, request, pk):
         try:
-            result = get_account_details(pk)
-            if isinstance(result, dict) and 'error' in result:
-                return Response(result, status=status.HTTP_400_BAD_REQUEST)
-            return Response({'details': result})
+            job_id = dispatch_telegram_action('get_account_details', job_owner(request), account_id=pk)
+            return telegram_job_response(job_id)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -182,15 +448,12 @@ class SendCodeView(APIView):
             account_note = request.data.get('account_note')
             recovery_email = request.data.get('recovery_email')
 
-            result = send_code(phone, employee_id, employee_fio, account_note, recovery_email)
-            
-            if isinstance(result, dict):
-                if 'error' in result:
-                    return Response(result, status=status.HTTP_400_BAD_REQUEST)
-                else:
-                    return Response(result)
-            else:
-                return Response({'message': result})
+            job_id = dispatch_telegram_action(
+                'send_code', job_owner(request),
+                phone=phone, employee_id=employee_id, employee_fio=employee_fio,
+                account_note=account_note, recovery_email=recovery_email
+            )
+            return telegram_job_response(job_id)
                 
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -210,27 +473,24 @@ class VerifyCodeView(APIView):
             recovery_email = request.data.get('recovery_email')
             two_factor_password = request.data.get('two_factor_password')
 
-            result = verify_code(phone, code, employee_id, employee_fio, account_note, recovery_email, two_factor_password)
-            
-            if isinstance(result, dict):
-                if 'error' in result:
-                    if 'requires_2fa' in result and result['requires_2fa']:
-                        return Response(result, status=status.HTTP_200_OK)
-                    else:
-                        return Response(result, status=status.HTTP_400_BAD_REQUEST)
-                else:
-                    return Response(result)
-            else:
-                return Response({'message': result})
+            job_id = dispatch_telegram_action(
+                'verify_code', job_owner(request),
+                phone=phone, code=code, employee_id=employee_id, employee_fio=employee_fio,
+                account_note=account_note, recovery_email=recovery_email, two_factor_password=two_factor_password
+            )
+            return telegram_job_response(job_id)
                 
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class GlobalAppSettingsView(generics.RetrieveUpdateAPIView):
+class GlobalAppSettingsView(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     serializer_class = GlobalAppSettingsSerializer
     permission_classes = [IsSuperUser]
     
+    def get_validator_queryset(self):
+        return GlobalAppSettings.objects.using('telegram_db').filter(is_active=True)
+    
     def get_object(self):
         obj, created = GlobalAppSettings.objects.using('telegram_db').get_or_create(
             is_active=True,
@@ -243,25 +503,24 @@ class GlobalAppSettingsView(generics.RetrieveUpdateAPIView):
         )
         return obj
     
-    def put(self, request, *args, **kwargs):
-        api_id = request.data.get('api_id')
-        api_hash = request.data.get('api_hash')
+    def update(self, request, *args, **kwargs):
+        app_settings = self.get_object()
+        serializer = self.get_serializer(app_settings, data=request.data, partial=kwargs.get('partial', False))
+        serializer.is_valid(raise_exception=True)
         
-        if api_id and api_hash:
-            try:
-                is_valid, message = check_api_credentials(int(api_id), api_hash)
-                if not is_valid:
-                    return Response(
-                        {'error': f'Invalid API credentials: {message}'}, 
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            except Exception as e:
-                return Response(
-                    {'error': f'Error checking API credentials: {str(e)}'}, 
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
+        credentials = {
+            'api_id': serializer.validated_data.get('api_id', app_settings.api_id),
+            'api_hash': serializer.validated_data.get('api_hash', app_settings.api_hash),
+        }
+        if credentials == {'api_id': app_settings.api_id, 'api_hash': app_settings.api_hash}:
+            self.perform_update(serializer)
+            return Response(serializer.data)
         
-        return super().put(request, *args, **kwargs)
+        # Новые ключи проверяются подключением к Telegram в воркере, настройки сохраняются там же
+        job_id = dispatch_telegram_action(
+            'update_app_settings', job_owner(request), **{**serializer.validated_data, **credentials}
+        )
+        return telegram_job_response(job_id)
 
 
 class ReclaimAccountView(APIView):
@@ -276,11 +535,12 @@ class ReclaimAccountView(APIView):
                 task_type='reclaim',
                 account_id=pk,
                 parameters={'two_factor_password': two_factor_password is not None},
-                created_by=request.user.username
+                created_by=request.user.username,
+                celery_task_id=uuid()
             )
             
             # Запускаем задачу Celery
-            reclaim_account_task.delay(pk, two_factor_password, task.id)
+            reclaim_account_task.apply_async((pk, two_factor_password, task.id), task_id=task.celery_task_id)
             
             return Response({
                 'message': 'Задача возврата аккаунта поставлена в очередь',
@@ -303,11 +563,12 @@ class ReauthorizeAccountView(APIView):
                 task_type='reauthorize',
                 account_id=pk,
                 parameters={'two_factor_password': two_factor_password is not None},
-                created_by=request.user.username
+                created_by=request.user.username,
+                celery_task_id=uuid()
             )
             
             # Запускаем задачу Celery
-            reauthorize_account_task.delay(pk, task.id)
+            reauthorize_account_task.apply_async((pk, task.id), task_id=task.celery_task_id)
             
             return Response({
                 'message': 'Задача повторной авторизации поставлена в очередь',
@@ -330,17 +591,11 @@ class VerifyReauthorizationView(APIView):
             if not code:
                 return Response({'error': 'Код подтверждения обязателен'}, status=status.HTTP_400_BAD_REQUEST)
             
-            result = verify_reauthorization(pk, code, two_factor_password)
-            if isinstance(result, dict):
-                if 'error' in result:
-                    if 'requires_2fa' in result and result['requires_2fa']:
-                        return Response(result, status=status.HTTP_200_OK)
-                    else:
-                        return Response(result, status=status.HTTP_400_BAD_REQUEST)
-                else:
-                    return Response(result)
-            else:
-                return Response({'message': result})
+            job_id = dispatch_telegram_action(
+                'verify_reauthorization', job_owner(request),
+                account_id=pk, code=code, two_factor_password=two_factor_password
+            )
+            return telegram_job_response(job_id)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -390,12 +645,10 @@ class CheckAPICredentialsView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            is_valid, message = check_api_credentials(int(api_id), api_hash)
-            
-            return Response({
-                'is_valid': is_valid,
-                'message': message
-            })
+            job_id = dispatch_telegram_action(
+                'check_api_credentials', job_owner(request), api_id=int(api_id), api_hash=api_hash
+            )
+            return telegram_job_response(job_id)
             
         except Exception as e:
             return Response(
@@ -404,12 +657,12 @@ class CheckAPICredentialsView(APIView):
             )
 
 
-class TaskQueueList(generics.ListAPIView):
+class TaskQueueList(AsyncConditionalGetMixin, AsyncListAPIView):
     serializer_class = TaskQueueSerializer
     permission_classes = [IsSuperUser]
     
     def get_queryset(self):
-        queryset = TaskQueue.objects.all().order_by('-created_at')
+        queryset = TaskQueue.objects.select_related('account').order_by('-created_at')
         
         # Фильтрация по статусу
         status_filter = self.request.query_params.get('status')
@@ -424,10 +677,119 @@ class TaskQueueList(generics.ListAPIView):
         return queryset[:50]
 
 
-class TaskQueueDetail(generics.RetrieveAPIView):
+class EventStreamRenderer(renderers.BaseRenderer):
+    """Позволяет EventSource (Accept: text/event-stream) пройти согласование формата DRF"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class TaskEventsView(APIView):
+    """
+    SSE-поток изменений задач: снимок задач в процессе при подключении,
+    далее события, которые воркеры публикуют в Redis. Открытая вкладка не нагружает БД.
+    Под ASGI поток отдается async-генератором, под WSGI - синхронным.
+    """
+    permission_classes = [IsSuperUser]
+    renderer_classes = [EventStreamRenderer, renderers.JSONRenderer]
+
+    def get(self, request):
+        snapshot = [
+            task_event(task)
+            for task in TaskQueue.objects.filter(status='processing').order_by('-created_at')[:50]
+        ]
+        stream = astream_task_events if isinstance(request._request, ASGIRequest) else stream_task_events
+        response = StreamingHttpResponse(
+            stream(snapshot, duration=settings.TASK_EVENTS_STREAM_TIMEOUT),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # nginx не должен буферизовать поток
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class TaskQueueDetail(ConditionalGetMixin, generics.RetrieveAPIView):
     serializer_class = TaskQueueSerializer
     permission_classes = [IsSuperUser]
-    queryset = TaskQueue.objects.all()
+    queryset = TaskQueue.objects.select_related('account')
+
+    def retrieve(self, request, *args, **kwargs):
+        task = self.get_object()
+        data = self.get_serializer(task).data
+        # Сводка по результатам одним GROUP BY, сами результаты - в /items/
+        data['items_summary'] = {
+            row['status']: {
+                'count': row['count'],
+                'avg_duration_ms': row['avg_duration_ms'],
+                'max_duration_ms': row['max_duration_ms'],
+            }
+            for row in task.items.values('status').order_by().annotate(
+                count=Count('id'),
+                avg_duration_ms=Avg('duration_ms'),
+                max_duration_ms=Max('duration_ms')
+            )
+        }
+        return Response(data)
+
+
+class TaskQueueItemList(ConditionalGetMixin, generics.ListAPIView):
+    """Результаты групповой задачи по аккаунтам, постранично, с фильтром status"""
+    serializer_class = TaskQueueItemSerializer
+    permission_classes = [IsSuperUser]
+    last_modified_field = 'finished_at'
+    pagination_class = TaskItemPagination
+    keyset_fields = {'id': 'integer'}
+
+    def get_sort_field(self):
+        return 'id'
+
+    def get_queryset(self):
+        queryset = TaskQueueItem.objects.filter(task_id=self.kwargs['pk']).select_related('account')
+
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+
+        return queryset.order_by('id')
+
+
+class RetryFailedItemsView(APIView):
+    """
+    Повторная проверка аккаунтов, завершившихся ошибкой или FloodWait, новой групповой задачей.
+    Аккаунты, у которых FloodWait еще не истек, новая задача снова отложит.
+    """
+    permission_classes = [IsSuperUser]
+
+    def post(self, request, pk):
+        try:
+            task = TaskQueue.objects.get(id=pk)
+        except TaskQueue.DoesNotExist:
+            return Response({'error': 'Задача не найдена'}, status=status.HTTP_404_NOT_FOUND)
+
+        account_ids = list(
+            task.items.filter(status__in=['error', 'parked'], account__isnull=False)
+            .order_by('account_id').values_list('account_id', flat=True).distinct()
+        )
+        if not account_ids:
+            return Response({'error': 'В задаче нет аккаунтов с ошибками или FloodWait'}, status=status.HTTP_400_BAD_REQUEST)
+
+        retry_task = TaskQueue.objects.create(
+            task_type='bulk_check',
+            account_ids=account_ids,
+            parameters={'action': 'check', 'retry_of': task.id},
+            created_by=request.user.username
+        )
+        dispatch_bulk_check(account_ids, retry_task.id)
+
+        return Response({
+            'message': f'Повторная проверка {len(account_ids)} аккаунтов поставлена в очередь',
+            'task_id': retry_task.id,
+            'account_count': len(account_ids)
+        })
 
 
 class CancelTaskView(APIView):
@@ -443,9 +805,7 @@ class CancelTaskView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            task.status = 'cancelled'
-            task.completed_at = now()
-            task.save()
+            cancel_task(task)
             
             return Response({'message': 'Задача отменена'})
             
@@ -491,7 +851,7 @@ class BulkActionView(APIView):
             
             # Запускаем соответствующую задачу Celery
             if action == 'check':
-                bulk_check_accounts_task.delay(account_ids, task.id)
+                dispatch_bulk_check(account_ids, task.id)
                 message = f'Проверка {len(account_ids)} аккаунтов поставлена в очередь'
             else:
                 # Для других действий нужно реализовать отдельные задачи
@@ -513,13 +873,13 @@ class BulkActionView(APIView):
             )
 
 
-class ProxyServerList(generics.ListCreateAPIView):
+class ProxyServerList(ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = ProxyServerSerializer
     permission_classes = [IsSuperUser]
     queryset = ProxyServer.objects.all()
 
 
-class ProxyServerDetail(generics.RetrieveUpdateDestroyAPIView):
+class ProxyServerDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProxyServerSerializer
     permission_classes = [IsSuperUser]
     queryset = ProxyServer.objects.all()
@@ -545,34 +905,77 @@ class DeviceParamsUpdateView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class SecurityAlertsView(APIView):
-    """API для получения результатов проверки безопасности"""
+class SecurityAlertsView(CachedListMixin, AsyncListAPIView):
+    """
+    API для результатов проверки безопасности.
+    По умолчанию - аккаунты с угрозами по последней проверке, новые сверху.
+    С changed_since - все последние проверки после этого момента (включая снятые угрозы),
+    по возрастанию времени, чтобы клиент мог опрашивать изменения инкрементально.
+    """
+    serializer_class = SecurityAlertSerializer
+    permission_classes = [IsSuperUser]
+    pagination_class = SecurityAlertPagination
+    keyset_fields = {'last_security_check': 'datetime'}
+
+    def get_changed_since(self):
+        value = self.request.query_params.get('changed_since')
+        if not value:
+            return None
+        changed_since = parse_datetime(value)
+        if changed_since is None:
+            raise ValidationError({'changed_since': 'Ожидается дата и время в формате ISO 8601'})
+        return changed_since
+
+    def get_sort_field(self):
+        return 'last_security_check' if self.get_changed_since() else '-last_security_check'
+
+    def get_queryset(self):
+        queryset = SecurityCheck.objects.using('telegram_db').filter(is_latest=True).select_related('account')
+
+        changed_since = self.get_changed_since()
+        if changed_since:
+            queryset = queryset.filter(last_security_check__gt=changed_since)
+        else:
+            queryset = queryset.filter(has_security_alert=True)
+
+        return queryset.order_by(self.get_sort_field())
+
+    # Запас на проверки, записанные с более ранним временем, но закоммиченные после ответа
+    changes_overlap = timedelta(seconds=5)
+
+    async def alist(self, request, *args, **kwargs):
+        started = now()
+        response = await super().alist(request, *args, **kwargs)
+        response.data['total_accounts'] = await sync_to_async(estimated_count)(
+            TelegramAccount.objects.using('telegram_db').all()
+        )
+        # Значение changed_since для следующего опроса
+        response.data['changed_since'] = (started - self.changes_overlap).isoformat()
+        return response
+
+
+class FloodStatusView(APIView):
+    """API для сводки по аккаунтам, припаркованным после FloodWait"""
     permission_classes = [IsSuperUser]
     
     def get(self, request):
         try:
-            # Получаем аккаунты с информацией о безопасности
-            accounts = TelegramAccount.objects.using('telegram_db').all()
-            
-            security_results = []
-            for account in accounts:
-                security_info = account.device_params.get('security_info', {}) if account.device_params else {}
-                
-                security_results.append({
-                    'id': account.id,
-                    'phone_number': account.phone_number,
-                    'employee_fio': account.employee_fio,
-                    'employee_id': account.employee_id,
-                    'has_security_alert': security_info.get('has_security_alert', False),
-                    'alert_message': security_info.get('alert_message', ''),
-                    'last_security_check': security_info.get('last_security_check', ''),
-                    'account_status': account.account_status,
-                    'activity_status': account.activity_status,
-                    'last_ping': account.last_ping
-                })
-            
-            return Response(security_results)
-            
+            total_accounts = TelegramAccount.objects.using('telegram_db').filter(account_status='active').count()
+            return Response(FloodRegistry().parked_capacity(total_accounts=total_accounts))
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class TelegramPoolMetricsView(APIView):
+    """API для метрик пулов подключений Telegram по всем воркерам"""
+    permission_classes = [IsSuperUser]
+    
+    def get(self, request):
+        try:
+            return Response(collect_pool_metrics())
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -32,7 +32,9 @@ app.conf.update(
 app.conf.task_routes = {
     'accounts.tasks.check_account_task': {'queue': 'telegram_check'},
     'accounts.tasks.bulk_check_accounts_task': {'queue': 'telegram_bulk'},
+    'accounts.tasks.check_accounts_chunk_task': {'queue': 'telegram_check'},
     'accounts.tasks.reauthorize_account_task': {'queue': 'telegram_auth'},
+    'accounts.tasks.telegram_action_task': {'queue': 'telegram_auth'},
     'accounts.tasks.reclaim_account_task': {'queue': 'telegram_reclaim'},
 }
 
@@ -38,7 +38,9 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
+    'adrf',
     'corsheaders',
     'django_celery_results',
     'accounts',
@@ -96,9 +98,14 @@ DATABASES = {
 
 DATABASE_ROUTERS = ['accounts.db_routers.TelegramRouter']
 
+# Тестовая база создается из init.sql, как база контейнера Postgres (см. core/test_runner.py)
+TEST_RUNNER = 'core.test_runner.InitSqlTestRunner'
+TEST_INIT_SQL = os.getenv('TEST_INIT_SQL', str(BASE_DIR.parent / 'init.sql'))
+
 
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://redis:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://redis:6379/0')
+REDIS_URL = os.getenv('REDIS_URL', CELERY_BROKER_URL)
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
@@ -106,21 +113,27 @@ CELERY_TIMEZONE = 'Europe/Moscow'
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
 CELERY_TASK_SOFT_TIME_LIMIT = 25 * 60
-CELERY_RESULT_EXPIRES = 3600
+# Хорд ежедневной проверки ждет результаты линий дольше часа
+CELERY_RESULT_EXPIRES = 24 * 3600
 CELERYD_PREFETCH_MULTIPLIER = 1
 CELERY_ACKS_LATE = True
 CELERY_WORKER_CONCURRENCY = int(os.getenv('CELERY_CONCURRENCY', '4'))
 
 
 CELERY_BEAT_SCHEDULE = {
-    'daily-check-all-active-accounts': {
-        'task': 'accounts.tasks.daily_check_all_active_accounts',
-        'schedule': crontab(hour=3, minute=0),
+    # Плановые проверки идут небольшими пачками каждую минуту, а не всем парком ночью
+    'schedule-due-health-checks': {
+        'task': 'accounts.tasks.schedule_due_health_checks',
+        'schedule': crontab(minute='*'),
     },
     'cleanup-old-tasks': {
         'task': 'accounts.tasks.cleanup_old_tasks',
         'schedule': crontab(hour=4, minute=0),
     },
+    'cleanup-account-tombstones': {
+        'task': 'accounts.tasks.cleanup_account_tombstones',
+        'schedule': crontab(hour=4, minute=15),
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -150,6 +163,45 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
 ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY', 'dummy-key-for-development-change-in-production-1234567890AB=')
+ENCRYPTION_KEY_VERSION = int(os.getenv('ENCRYPTION_KEY_VERSION', '1'))
+# Предыдущие ключи, нужные для чтения во время ротации: "1:ключ,2:ключ"
+ENCRYPTION_PREVIOUS_KEYS = {
+    int(version): key.strip()
+    for version, key in (
+        item.split(':', 1) for item in os.getenv('ENCRYPTION_PREVIOUS_KEYS', '').split(',') if item.strip()
+    )
+}
+# auto - cryptography (AESGCM), если установлен, иначе pycryptodome
+ENCRYPTION_BACKEND = os.getenv('ENCRYPTION_BACKEND', 'auto')
+
+# Сколько секунд кешируется число аккаунтов для выборок с фильтрами
+ACCOUNT_COUNT_CACHE_TTL = int(os.getenv('ACCOUNT_COUNT_CACHE_TTL', '60'))
+
+# Сколько дней хранятся отметки об удаленных аккаунтах; курсор изменений старше этого срока не принимается
+ACCOUNT_TOMBSTONE_RETENTION_DAYS = int(os.getenv('ACCOUNT_TOMBSTONE_RETENTION_DAYS', '30'))
+
+# SSE-поток задач закрывается раньше proxy_read_timeout nginx, браузер переподключается
+TASK_EVENTS_STREAM_TIMEOUT = int(os.getenv('TASK_EVENTS_STREAM_TIMEOUT', '270'))
+
+# Прогресс групповых задач пишется в TaskQueue не чаще раза в N секунд или N аккаунтов
+TASK_PROGRESS_FLUSH_INTERVAL = float(os.getenv('TASK_PROGRESS_FLUSH_INTERVAL', '5'))
+TASK_PROGRESS_FLUSH_ITEMS = int(os.getenv('TASK_PROGRESS_FLUSH_ITEMS', '500'))
+
+# Групповая проверка в Celery идет частями, каждая часть - отдельная задача в пределах лимита времени
+BULK_CHECK_CHUNK_SIZE = int(os.getenv('BULK_CHECK_CHUNK_SIZE', '200'))
+
+# Ежедневная проверка: число параллельных линий (цепочек частей) в очереди telegram_check
+FLEET_CHECK_LANES = int(os.getenv('FLEET_CHECK_LANES', '4'))
+
+# Плановая проверка: каждый активный аккаунт раз в N часов, не больше M аккаунтов в минуту
+HEALTH_CHECK_INTERVAL_HOURS = float(os.getenv('HEALTH_CHECK_INTERVAL_HOURS', '24'))
+HEALTH_CHECK_MAX_BATCH = int(os.getenv('HEALTH_CHECK_MAX_BATCH', '200'))
+
+# Сколько секунд хранится результат действия с Telegram, выполненного вне запроса API
+TELEGRAM_ACTION_RESULT_TTL = int(os.getenv('TELEGRAM_ACTION_RESULT_TTL', '600'))
+
+# Сколько секунд живет закешированный ответ списков аккаунтов и угроз (сбрасывается при изменении данных)
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '300'))
 
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -261,4 +313,27 @@ TELEGRAM_RETRY_DELAY = 2
 TELEGRAM_SESSION_TIMEOUT = 30
 TELEGRAM_ANTI_FLOOD_DELAY_MIN = int(os.getenv('TELEGRAM_ANTI_FLOOD_DELAY_MIN', '60'))
 TELEGRAM_ANTI_FLOOD_DELAY_MAX = int(os.getenv('TELEGRAM_ANTI_FLOOD_DELAY_MAX', '120'))
-TELEGRAM_GET_DIALOGS_LIMIT = int(os.getenv('TELEGRAM_GET_DIALOGS_LIMIT', '5'))
\ No newline at end of file
+TELEGRAM_GET_DIALOGS_LIMIT = int(os.getenv('TELEGRAM_GET_DIALOGS_LIMIT', '5'))
+
+# Групповая проверка: параллелизм
+TELEGRAM_BULK_CONCURRENCY = int(os.getenv('TELEGRAM_BULK_CONCURRENCY', '20'))
+TELEGRAM_BULK_PER_PROXY_CONCURRENCY = int(os.getenv('TELEGRAM_BULK_PER_PROXY_CONCURRENCY', '3'))
+
+# Распределенный rate limiter (token bucket в Redis): подключений в секунду и размер всплеска
+TELEGRAM_EGRESS_RATE = float(os.getenv('TELEGRAM_EGRESS_RATE', '0.5'))
+TELEGRAM_EGRESS_BURST = float(os.getenv('TELEGRAM_EGRESS_BURST', '3'))
+TELEGRAM_API_ID_RATE = float(os.getenv('TELEGRAM_API_ID_RATE', '5'))
+TELEGRAM_API_ID_BURST = float(os.getenv('TELEGRAM_API_ID_BURST', '10'))
+
+# После FloodWait исходящий IP аккаунта притормаживается не дольше этого числа секунд
+TELEGRAM_FLOOD_EGRESS_COOLDOWN = int(os.getenv('TELEGRAM_FLOOD_EGRESS_COOLDOWN', '60'))
+
+# Пул подключенных TelegramClient (на процесс воркера)
+TELEGRAM_CLIENT_POOL_SIZE = int(os.getenv('TELEGRAM_CLIENT_POOL_SIZE', '50'))
+TELEGRAM_CLIENT_POOL_IDLE_TTL = int(os.getenv('TELEGRAM_CLIENT_POOL_IDLE_TTL', '300'))
+
+# Исполнитель проверок: 'celery' или 'worker' (manage.py run_telegram_worker)
+TELEGRAM_CHECK_BACKEND = os.getenv('TELEGRAM_CHECK_BACKEND', 'celery')
+TELEGRAM_WORKER_MAX_INFLIGHT = int(os.getenv('TELEGRAM_WORKER_MAX_INFLIGHT', '200'))
+TELEGRAM_WORKER_SHUTDOWN_TIMEOUT = int(os.getenv('TELEGRAM_WORKER_SHUTDOWN_TIMEOUT', '60'))
+TELEGRAM_ASYNC_DB_POOL_SIZE = int(os.getenv('TELEGRAM_ASYNC_DB_POOL_SIZE', '10'))
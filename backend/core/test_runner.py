@@ -0,0 +1,41 @@
+import logging
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models.signals import pre_migrate
+from django.test.runner import DiscoverRunner
+
+logger = logging.getLogger(__name__)
+
+
+def load_init_sql(sender, using, **kwargs):
+    """
+    Таблицы аккаунтов создает init.sql, а не миграции (см. accounts/db_routers.py),
+    поэтому перед миграциями тестовой базы он выполняется так же, как в контейнере Postgres.
+    """
+    connection = connections[using]
+    if 'telegram_accounts' in connection.introspection.table_names():
+        return
+
+    path = Path(settings.TEST_INIT_SQL)
+    if not path.exists():
+        raise ImproperlyConfigured(f"init.sql не найден: {path} (задайте TEST_INIT_SQL)")
+
+    logger.info(f"Loading {path} into test database {connection.settings_dict['NAME']}")
+    with connection.cursor() as cursor:
+        cursor.execute(path.read_text(encoding='utf-8'))
+
+
+class InitSqlTestRunner(DiscoverRunner):
+    def __init__(self, top_level=None, **kwargs):
+        # backend/ - пакет, поэтому без явного top_level тесты импортировались бы как backend.accounts...
+        super().__init__(top_level=top_level or str(settings.BASE_DIR), **kwargs)
+
+    def setup_databases(self, **kwargs):
+        pre_migrate.connect(load_init_sql, dispatch_uid='core.test_runner.load_init_sql')
+        try:
+            return super().setup_databases(**kwargs)
+        finally:
+            pre_migrate.disconnect(dispatch_uid='core.test_runner.load_init_sql')
@@ -14,6 +14,7 @@ import {
   Grid,
   Link
 } from '@mui/material'
+import { resolveJob } from '../utils'
 
 const steps = ['Введите данные аккаунта', 'Подтвердите код', 'Введите пароль 2FA (если требуется)', 'Завершение настройки']
 
@@ -110,7 +111,7 @@ const AddAccount = () => {
     setRequires2FA(false)
 
     try {
-      const response = await fetch('/api/accounts/send-code/', {
+      const response = await resolveJob(await fetch('/api/accounts/send-code/', {
         method: 'POST',
         credentials: 'include',
         headers: {
@@ -124,7 +125,7 @@ const AddAccount = () => {
           account_note: formData.account_note,
           recovery_email: formData.recovery_email
         })
-      })
+      }))
       
       const data = await response.json()
       setLoading(false)
@@ -172,7 +173,7 @@ const AddAccount = () => {
     setSuccess('')
 
     try {
-      const response = await fetch('/api/accounts/verify-code/', {
+      const response = await resolveJob(await fetch('/api/accounts/verify-code/', {
         method: 'POST',
         credentials: 'include',
         headers: {
@@ -188,7 +189,7 @@ const AddAccount = () => {
           verification_code: formData.verification_code,
           two_factor_password: formData.two_factor_password || null
         })
-      })
+      }))
       
       const data = await response.json()
       setLoading(false)
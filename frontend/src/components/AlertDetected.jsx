@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import {
   Table,
   TableBody,
@@ -22,19 +22,42 @@ import {
 import { CheckCircle, Error, Refresh, Warning, Security } from '@mui/icons-material'
 import { fetchWithAuth } from '../utils'
 
+const PAGE_SIZE = 100
+const POLL_INTERVAL = 30000
+
+// Ссылка next приходит абсолютной, запрос идет через тот же origin
+const toRelativeUrl = (url) => {
+  const parsed = new URL(url, window.location.origin)
+  return parsed.pathname + parsed.search
+}
+
 const AlertDetected = () => {
   const [securityData, setSecurityData] = useState([])
+  const [nextUrl, setNextUrl] = useState(null)
+  const [countAlerts, setCountAlerts] = useState(0)
+  const [totalAccounts, setTotalAccounts] = useState(0)
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [error, setError] = useState('')
   const [snackbar, setSnackbar] = useState({ open: false, message: '', severity: 'info' })
+  const changedSince = useRef(null)
+  const securityDataRef = useRef([])
+  
+  useEffect(() => {
+    securityDataRef.current = securityData
+  }, [securityData])
   
   const fetchSecurityData = async () => {
     setLoading(true)
     try {
-      const response = await fetchWithAuth('/api/security-alerts/')
+      const response = await fetchWithAuth(`/api/security-alerts/?limit=${PAGE_SIZE}`)
       if (response.ok) {
         const data = await response.json()
-        setSecurityData(data)
+        setSecurityData(data.results)
+        setNextUrl(data.next)
+        setCountAlerts(data.count)
+        setTotalAccounts(data.total_accounts)
+        changedSince.current = data.changed_since
       } else {
         setError('Не удалось загрузить данные безопасности')
       }
@@ -46,8 +69,65 @@ const AlertDetected = () => {
     }
   }
   
+  const loadMore = async () => {
+    if (!nextUrl) return
+    setLoadingMore(true)
+    try {
+      const response = await fetchWithAuth(toRelativeUrl(nextUrl))
+      if (response.ok) {
+        const data = await response.json()
+        setSecurityData(prev => {
+          const loaded = new Set(prev.map(item => item.id))
+          return [...prev, ...data.results.filter(item => !loaded.has(item.id))]
+        })
+        setNextUrl(data.next)
+      }
+    } catch (err) {
+      console.error('Ошибка загрузки данных безопасности:', err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+  
+  // Инкрементальный опрос: только проверки после предыдущего запроса
+  const pollChanges = async () => {
+    if (!changedSince.current) return
+    try {
+      let url = `/api/security-alerts/?changed_since=${encodeURIComponent(changedSince.current)}&limit=500`
+      const changes = []
+      let sinceForNextPoll = null
+      while (url) {
+        const response = await fetchWithAuth(url)
+        if (!response.ok) return
+        const data = await response.json()
+        changes.push(...data.results)
+        sinceForNextPoll = sinceForNextPoll || data.changed_since
+        url = data.next ? toRelativeUrl(data.next) : null
+      }
+      changedSince.current = sinceForNextPoll
+      if (changes.length === 0) return
+      
+      // Снятые угрозы убираются из списка, новые поднимаются наверх
+      const current = securityDataRef.current
+      const shown = new Set(current.map(item => item.id))
+      const changedIds = new Set(changes.map(item => item.id))
+      let delta = 0
+      changes.forEach(item => {
+        if (item.has_security_alert && !shown.has(item.id)) delta += 1
+        if (!item.has_security_alert && shown.has(item.id)) delta -= 1
+      })
+      const added = changes.filter(item => item.has_security_alert).reverse()
+      setSecurityData([...added, ...current.filter(item => !changedIds.has(item.id))])
+      setCountAlerts(count => Math.max(0, count + delta))
+    } catch (err) {
+      console.error('Ошибка обновления данных безопасности:', err)
+    }
+  }
+  
   useEffect(() => {
     fetchSecurityData()
+    const interval = setInterval(pollChanges, POLL_INTERVAL)
+    return () => clearInterval(interval)
   }, [])
   
   const handleRefresh = () => {
@@ -78,9 +158,6 @@ const AlertDetected = () => {
     }
   }
   
-  const countAlerts = securityData.filter(item => item.has_security_alert).length
-  const totalAccounts = securityData.length
-  
   if (loading) {
     return (
       <Box display="flex" justifyContent="center" mt={4}>
@@ -190,7 +267,7 @@ const AlertDetected = () => {
                 <TableRow>
                   <TableCell colSpan={6} align="center">
                     <Typography variant="body2" color="textSecondary">
-                      Нет данных о безопасности
+                      Угроз не обнаружено
                     </Typography>
                   </TableCell>
                 </TableRow>
@@ -246,6 +323,14 @@ const AlertDetected = () => {
             </TableBody>
           </Table>
         </TableContainer>
+        
+        {nextUrl && (
+          <Box display="flex" justifyContent="center" mt={2}>
+            <Button variant="outlined" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? 'Загрузка...' : 'Показать еще'}
+            </Button>
+          </Box>
+        )}
       </Paper>
       
       <Box mt={3}>
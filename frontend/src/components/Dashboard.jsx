@@ -38,7 +38,9 @@ import {
   InputLabel
 } from '@mui/material'
 import { Search, Refresh, AccountCircle, PhoneAndroid, Email, Description, Settings, LockReset, CheckCircle, Error, Schedule, PlayArrow, Stop, FilterList, Clear, Edit } from '@mui/icons-material'
-import { fetchWithAuth } from '../utils'
+import { fetchWithAuth, resolveJob } from '../utils'
+
+const ACCOUNT_LIST_FIELDS = 'id,phone_number,employee_id,employee_fio,account_note,account_status,activity_status,last_ping,health_indicator,is_2fa_enabled'
 
 const Dashboard = () => {
   const [accounts, setAccounts] = useState([])
@@ -109,6 +111,8 @@ const Dashboard = () => {
     try {
       let url = '/api/accounts/'
       const params = new URLSearchParams()
+      // Только поля, которые показывает таблица, без device_params
+      params.append('fields', ACCOUNT_LIST_FIELDS)
       if (searchTerm) params.append('search', searchTerm)
       if (accountStatusFilter) params.append('status', accountStatusFilter)
       if (activityStatusFilter) params.append('activity_status', activityStatusFilter)
@@ -159,7 +163,6 @@ const Dashboard = () => {
       if (response.ok) {
         const data = await response.json()
         setTasks(data)
-        setActiveTasks(data.filter(t => t.status === 'processing').length)
       }
     } catch (err) {
       console.error('Ошибка загрузки задач:', err)
@@ -168,12 +171,37 @@ const Dashboard = () => {
     }
   }
 
+  // Событие задачи из SSE: задачи в процессе обновляются, завершенные убираются
+  const applyTaskEvent = (event) => {
+    setTasks(prev => {
+      if (event.status !== 'processing') {
+        return prev.filter(t => t.id !== event.id)
+      }
+      if (prev.some(t => t.id === event.id)) {
+        return prev.map(t => (t.id === event.id ? { ...t, ...event } : t))
+      }
+      return [event, ...prev]
+    })
+  }
+
+  useEffect(() => {
+    setActiveTasks(tasks.filter(t => t.status === 'processing').length)
+  }, [tasks])
+
   useEffect(() => {
     fetchAccounts()
-    fetchTasks()
     
-    const interval = setInterval(fetchTasks, 10000)
-    return () => clearInterval(interval)
+    if (!window.EventSource) {
+      fetchTasks()
+      const interval = setInterval(fetchTasks, 10000)
+      return () => clearInterval(interval)
+    }
+    
+    // Прогресс задач приходит push-событиями, снимок - при каждом (пере)подключении
+    const source = new EventSource('/api/tasks/events/', { withCredentials: true })
+    source.addEventListener('snapshot', (e) => setTasks(JSON.parse(e.data)))
+    source.addEventListener('task', (e) => applyTaskEvent(JSON.parse(e.data)))
+    return () => source.close()
   }, [])
 
   const handleRefresh = () => {
@@ -271,13 +299,13 @@ const Dashboard = () => {
     const { accountId, oldPassword, newPassword } = passwordDialog
     
     try {
-      const response = await fetchWithAuth(`/api/accounts/${accountId}/change-password/`, {
+      const response = await resolveJob(await fetchWithAuth(`/api/accounts/${accountId}/change-password/`, {
         method: 'POST',
         body: JSON.stringify({
           old_password: oldPassword,
           new_password: newPassword || 'CorporateSecurePassword123!'
         })
-      })
+      }))
       
       const data = await response.json()
       if (data.message) {
@@ -308,7 +336,7 @@ const Dashboard = () => {
   const handleAction = async (action, accountId, accountPhone) => {
     if (action === 'details') {
       try {
-        const response = await fetchWithAuth(`/api/accounts/${accountId}/details/`)
+        const response = await resolveJob(await fetchWithAuth(`/api/accounts/${accountId}/details/`))
         const data = await response.json()
         if (data.details) {
           setDetailsDialog({
@@ -340,9 +368,9 @@ const Dashboard = () => {
     }
     
     try {
-      const response = await fetchWithAuth(url, {
+      const response = await resolveJob(await fetchWithAuth(url, {
         method: 'POST'
-      })
+      }))
       
       const data = await response.json()
       if (data.message) {
@@ -488,13 +516,13 @@ const Dashboard = () => {
     setReauthorizeDialog({...reauthorizeDialog, loading: true, error: '', success: ''})
     
     try {
-      const response = await fetchWithAuth(`/api/accounts/${accountId}/verify-reauthorization/`, {
+      const response = await resolveJob(await fetchWithAuth(`/api/accounts/${accountId}/verify-reauthorization/`, {
         method: 'POST',
         body: JSON.stringify({
           verification_code: verificationCode,
           two_factor_password: twoFactorPassword || null
         })
-      })
+      }))
       
       const data = await response.json()
       if (data.error) {
@@ -526,10 +554,10 @@ const Dashboard = () => {
     setApiSettingsDialog({...apiSettingsDialog, checking: true})
     
     try {
-      const response = await fetchWithAuth('/api/check-api-credentials/', {
+      const response = await resolveJob(await fetchWithAuth('/api/check-api-credentials/', {
         method: 'POST',
         body: JSON.stringify({ api_id: apiId, api_hash: apiHash })
-      })
+      }))
       
       const data = await response.json()
       setApiSettingsDialog({...apiSettingsDialog, checking: false, checkResult: data})
@@ -40,6 +40,24 @@ export async function fetchWithAuth(url, options = {}) {
     return fetch(url, mergedOptions);
 }
 
+// Действия с Telegram выполняются в фоне: API отвечает 202 с job_id,
+// результат (с исходным статусом ответа) опрашивается по result_url
+export async function resolveJob(response, { interval = 1000, timeout = 180000 } = {}) {
+    if (response.status !== 202) return response;
+
+    const { result_url: resultUrl } = await response.json();
+    const deadline = Date.now() + timeout;
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, interval));
+        const result = await fetchWithAuth(resultUrl);
+        if (result.status !== 202) return result;
+    }
+    return new Response(
+        JSON.stringify({ error: 'Telegram не ответил вовремя. Попробуйте позже.' }),
+        { status: 504, headers: { 'Content-Type': 'application/json' } }
+    );
+}
+
 export function formatPhoneNumber(phone) {
     if (!phone) return '';
     return phone.replace(/[^\d+]/g, '');
@@ -1,4 +1,8 @@
 -- Создание таблиц для хранения данных Telegram аккаунтов
+-- Схема соответствует миграциям accounts; миграции с 0006 повторяют эти изменения идемпотентно
+
+-- Триграммный поиск по аккаунтам
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- Глобальные настройки приложения (ОДИН api_id/api_hash на все аккаунты)
 CREATE TABLE IF NOT EXISTS global_app_settings (
@@ -50,7 +54,7 @@ CREATE TABLE IF NOT EXISTS telegram_accounts (
     -- Состояние аккаунта
     is_2fa_enabled BOOLEAN DEFAULT FALSE,
     last_checked TIMESTAMP,
-    account_status VARCHAR(20) DEFAULT 'pending',
+    account_status VARCHAR(30) DEFAULT 'pending',
     
     -- Новые поля по ТЗ
     last_ping TIMESTAMP,
@@ -58,6 +62,9 @@ CREATE TABLE IF NOT EXISTS telegram_accounts (
     device_params JSONB DEFAULT '{}',
     proxy_id INTEGER REFERENCES proxy_servers(id) ON DELETE SET NULL,
     
+    -- Плановая проверка
+    next_check_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    
     -- Безопасность
     encryption_version INTEGER DEFAULT 1,
     
@@ -78,6 +85,8 @@ CREATE TABLE IF NOT EXISTS task_queue (
     result JSONB,
     error_message TEXT,
     created_by VARCHAR(100),
+    celery_task_id VARCHAR(255),
+    cursor INTEGER NOT NULL DEFAULT 0 CHECK (cursor >= 0),
     started_at TIMESTAMP,
     completed_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -95,6 +104,36 @@ CREATE TABLE IF NOT EXISTS account_audit_log (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Результаты проверок безопасности, последняя проверка аккаунта помечена is_latest
+CREATE TABLE IF NOT EXISTS security_checks (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    has_security_alert BOOLEAN NOT NULL,
+    alert_message TEXT NOT NULL,
+    last_security_check TIMESTAMP WITH TIME ZONE NOT NULL,
+    is_latest BOOLEAN NOT NULL,
+    account_id BIGINT NOT NULL REFERENCES telegram_accounts(id) DEFERRABLE INITIALLY DEFERRED
+);
+
+-- Результаты групповых задач по аккаунтам
+CREATE TABLE IF NOT EXISTS task_queue_items (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    status VARCHAR(20) NOT NULL,
+    outcome JSONB,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    duration_ms INTEGER,
+    -- Без внешнего ключа: в задаче может оказаться уже удаленный аккаунт
+    account_id BIGINT,
+    task_id BIGINT NOT NULL REFERENCES task_queue(id) DEFERRABLE INITIALLY DEFERRED
+);
+
+-- Отметки об удаленных аккаунтах для /api/accounts/changes/
+CREATE TABLE IF NOT EXISTS account_tombstones (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    account_id BIGINT NOT NULL,
+    deleted_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
 -- Индексы для быстрого поиска
 CREATE INDEX IF NOT EXISTS idx_telegram_accounts_phone ON telegram_accounts(phone_number);
 CREATE INDEX IF NOT EXISTS idx_telegram_accounts_status ON telegram_accounts(account_status);
@@ -105,4 +144,18 @@ CREATE INDEX IF NOT EXISTS idx_telegram_accounts_proxy ON telegram_accounts(prox
 CREATE INDEX IF NOT EXISTS idx_task_queue_status ON task_queue(status);
 CREATE INDEX IF NOT EXISTS idx_task_queue_type ON task_queue(task_type);
 CREATE INDEX IF NOT EXISTS idx_task_queue_created ON task_queue(created_at);
-CREATE INDEX IF NOT EXISTS idx_account_audit_log_account ON account_audit_log(account_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_account_audit_log_account ON account_audit_log(account_id);
+CREATE INDEX IF NOT EXISTS task_queue_updated_idx ON task_queue(updated_at);
+CREATE INDEX IF NOT EXISTS audit_log_created_idx ON account_audit_log(created_at);
+CREATE INDEX IF NOT EXISTS tg_acc_updated_idx ON telegram_accounts(updated_at, id);
+CREATE INDEX IF NOT EXISTS tg_acc_next_check_idx ON telegram_accounts(next_check_at) WHERE account_status = 'active';
+CREATE INDEX IF NOT EXISTS tg_acc_phone_trgm ON telegram_accounts USING gin ((UPPER(phone_number)) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS tg_acc_employee_id_trgm ON telegram_accounts USING gin ((UPPER(employee_id)) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS tg_acc_employee_fio_trgm ON telegram_accounts USING gin ((UPPER(employee_fio)) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS tg_acc_note_trgm ON telegram_accounts USING gin ((UPPER(account_note)) gin_trgm_ops);
+CREATE UNIQUE INDEX IF NOT EXISTS sec_check_one_latest_per_account ON security_checks(account_id) WHERE is_latest;
+CREATE INDEX IF NOT EXISTS sec_check_latest_alert_idx ON security_checks(has_security_alert, last_security_check) WHERE is_latest;
+CREATE INDEX IF NOT EXISTS sec_check_account_idx ON security_checks(account_id, last_security_check);
+CREATE INDEX IF NOT EXISTS task_item_status_idx ON task_queue_items(task_id, status, id);
+CREATE INDEX IF NOT EXISTS task_item_account_idx ON task_queue_items(account_id, finished_at);
+CREATE INDEX IF NOT EXISTS acc_tombstone_deleted_idx ON account_tombstones(deleted_at);